@@ -0,0 +1,84 @@
+"""
+bench_openai_batch.py
+
+Measures OpenAIAdapter.batch_generate throughput offline against a local
+OpenAI-compatible stand-in server with a fixed per-request latency.
+
+Usage:
+    python benchmarks/bench_openai_batch.py --requests 500 --latency 0.05 --concurrency 1 16 64
+
+To benchmark against another OpenAI-compatible server instead, pass --base_url.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from promptoptimizerscai.adapters.openai_adapter import OpenAIAdapter
+
+
+def make_handler(latency):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            data = json.dumps({
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": 0,
+                "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "ok"}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return StandInHandler
+
+def start_standin_server(latency):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1"
+
+def run(base_url, n_requests, concurrency, rpm=None, tpm=None):
+    adapter = OpenAIAdapter(api_key="bench", model="stand-in", base_url=base_url,
+                            max_concurrency=concurrency, rpm=rpm, tpm=tpm)
+    prompts = [f"Extract entities from sentence {i}." for i in range(n_requests)]
+    start = time.perf_counter()
+    outputs = adapter.batch_generate(prompts, max_tokens=16)
+    elapsed = time.perf_counter() - start
+    assert len(outputs) == n_requests
+    return {"concurrency": concurrency, "requests": n_requests,
+            "seconds": round(elapsed, 3), "requests_per_second": round(n_requests / elapsed, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OpenAIAdapter.batch_generate throughput.")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in server latency per request (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--rpm", type=int, default=None)
+    parser.add_argument("--tpm", type=int, default=None)
+    parser.add_argument("--base_url", default=None, help="Use an existing OpenAI-compatible server")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_standin_server(args.latency)
+    try:
+        for concurrency in args.concurrency:
+            print(json.dumps(run(base_url, args.requests, concurrency, args.rpm, args.tpm)))
+    finally:
+        if server is not None:
+            server.shutdown()
@@ -0,0 +1,188 @@
+"""
+bench_optimizer.py
+
+Deterministic benchmark suite for the optimizer loop. Uses SyntheticAdapter (simulated
+latency, token cost, failures and concurrency limits) on synthetic SciERC-shaped data,
+so results are reproducible offline and don't depend on real models.
+
+Benchmarks, run for every dataset size:
+- evaluate_prompt:  one minibatch through evaluate_prompt per step
+- collect_errors:   the whole dataset's predictions through collect_errors (best of
+                    COLLECT_REPEATS runs, since one run takes well under a millisecond)
+- optimize_step:    PromptOptimizer.optimize_step on a minibatch
+- beam_search_step: PromptOptimizer.beam_search_step on a minibatch
+
+Each reports throughput, p50/p95/p99 step latency, model calls per step and peak
+traced memory as JSON, from the median of --repeats runs. Timings below MIN_COMPARED_MS in the baseline are too noisy to
+gate on and are left out of the baseline comparison, as is p95 latency over fewer than
+MIN_P95_STEPS steps (where it is just the slowest step).
+
+Usage:
+    python benchmarks/bench_optimizer.py --sizes 100 1000 100000 --output bench.json
+    python benchmarks/bench_optimizer.py --baseline benchmarks/baseline.json      # exit 1 on regression
+    python benchmarks/bench_optimizer.py --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from promptoptimizerscai.adapters.synthetic_adapter import SyntheticAdapter, SyntheticAdapterError, make_scierc_dataset
+from promptoptimizerscai.core.evaluation import evaluate_prompt, collect_errors
+from promptoptimizerscai.core.optimizer import PromptOptimizer
+
+PROMPT = "Extract all entities and their types."
+# Metric -> True if higher is better
+COMPARED_METRICS = {
+    "throughput_examples_per_s": True,
+    "latency_p50_ms": False,
+    "latency_p95_ms": False,
+    "model_calls_per_step": False,
+    "peak_memory_mb": False,
+}
+TIMING_METRICS = {"throughput_examples_per_s", "latency_p50_ms", "latency_p95_ms"}
+MIN_COMPARED_MS = 1.0
+MIN_P95_STEPS = 20
+COLLECT_REPEATS = 20
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+def _summary(name, size, latencies, examples_per_step, calls, peak_bytes, failures):
+    total = sum(latencies)
+    return {
+        "benchmark": name,
+        "dataset_size": size,
+        "steps": len(latencies),
+        "throughput_examples_per_s": round(examples_per_step * len(latencies) / total, 1) if total else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "model_calls_per_step": round(calls / len(latencies), 1),
+        "peak_memory_mb": round(peak_bytes / 1024 / 1024, 3),
+        "failures": failures,
+    }
+
+def _measure(step_fn, steps):
+    """Run step_fn(i) `steps` times; return (latencies, failures, peak traced bytes)."""
+    latencies, failures = [], 0
+    tracemalloc.start()
+    for i in range(steps):
+        start = time.perf_counter()
+        try:
+            step_fn(i)
+        except SyntheticAdapterError:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return latencies, failures, peak
+
+def run_benchmarks(sizes, steps=5, minibatch=32, latency=0.001, latency_per_token=0.0,
+                   cost_per_1k_tokens=0.0, failure_rate=0.0, max_concurrency=8, seed=0, repeats=3):
+    results = []
+    for size in sizes:
+        dataset = make_scierc_dataset(size, seed)
+        golds = [gold for _, gold in dataset]
+        rng = random.Random(seed)
+        batches = [rng.sample(dataset, min(minibatch, size)) for _ in range(steps)]
+
+        def new_adapter():
+            return SyntheticAdapter(golds, latency=latency, latency_per_token=latency_per_token,
+                                    cost_per_1k_tokens=cost_per_1k_tokens, failure_rate=failure_rate,
+                                    max_concurrency=max_concurrency, seed=seed)
+
+        def model_benchmark(name, make_step):
+            """The run with the median p50 out of `repeats` runs, each on a fresh adapter."""
+            summaries = []
+            for _ in range(repeats):
+                adapter = new_adapter()
+                latencies, failures, peak = _measure(make_step(adapter), steps)
+                summaries.append(_summary(name, size, latencies, len(batches[0]),
+                                          adapter.stats["calls"], peak, failures))
+            return sorted(summaries, key=lambda r: r["latency_p50_ms"])[len(summaries) // 2]
+
+        def optimize_step(adapter):
+            optimizer = PromptOptimizer(adapter, seed=seed)
+            return lambda i: optimizer.optimize_step(PROMPT, batches[i])
+
+        def beam_search_step(adapter):
+            optimizer = PromptOptimizer(adapter, seed=seed)
+            return lambda i: optimizer.beam_search_step(PROMPT, batches[i], beam_width=3)
+
+        results.append(model_benchmark(
+            "evaluate_prompt", lambda adapter: lambda i: evaluate_prompt(PROMPT, [x for x, _ in batches[i]], adapter)))
+
+        # CPU-only: predictions for the whole dataset are computed up front
+        predictions = [gold if i % 3 else gold + "x" for i, gold in enumerate(golds)]
+        latencies, failures, peak = _measure(lambda i: collect_errors(predictions, golds, dataset), COLLECT_REPEATS)
+        results.append(_summary("collect_errors", size, [min(latencies)], size, 0, peak, failures))
+
+        results.append(model_benchmark("optimize_step", optimize_step))
+        results.append(model_benchmark("beam_search_step", beam_search_step))
+    return results
+
+def compare_to_baseline(results, baseline, tolerance=0.25):
+    """List of human-readable regressions beyond `tolerance` (relative) against the baseline."""
+    previous = {(r["benchmark"], r["dataset_size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get((result["benchmark"], result["dataset_size"]))
+        if old is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = old[metric], result[metric]
+            if not before or (metric in TIMING_METRICS and old["latency_p50_ms"] < MIN_COMPARED_MS):
+                continue
+            if metric == "latency_p95_ms" and min(old["steps"], result["steps"]) < MIN_P95_STEPS:
+                continue
+            change = (after - before) / before
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append(f"{result['benchmark']}[{result['dataset_size']}] {metric}: "
+                                   f"{before} -> {after} ({change:+.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the prompt optimizer loop with a synthetic model.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--minibatch", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.001, help="Simulated seconds per call")
+    parser.add_argument("--latency_per_token", type=float, default=0.0)
+    parser.add_argument("--cost_per_1k_tokens", type=float, default=0.0)
+    parser.add_argument("--failure_rate", type=float, default=0.0)
+    parser.add_argument("--max_concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per benchmark; the median is reported")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Compare against this JSON report; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", dest="save_baseline", help="Also write the report as a baseline")
+    args = parser.parse_args()
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline")}
+    report = {"config": config, "results": run_benchmarks(
+        args.sizes, args.steps, args.minibatch, args.latency, args.latency_per_token,
+        args.cost_per_1k_tokens, args.failure_rate, args.max_concurrency, args.seed, args.repeats)}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(report["results"], json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
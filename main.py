@@ -1,4 +1,299 @@
-print("hello world!")
+"""
+main.py
+
+Command-line batch jobs for PromptOptimizer. Inputs are JSONL files (or stdin, "-"),
+one object per line with an input field and optionally a gold field; results are
+written as JSONL as they are produced, so memory stays bounded by
+--batch-size x --concurrency lines whatever the size of the input.
+
+Modes:
+- evaluate: run a prompt over every input line; one output line per input
+  ({"index", "input", "prediction"} plus "gold"/"correct" when the input has a gold field).
+  --concurrency N runs N batches at once on N adapter instances (N models loaded for
+  huggingface, N separate rate limits for openai, which already parallelizes a batch)
+- optimize: ProTeGi beam search on minibatches sampled from the inputs;
+  one output line per step ({"step", "beam"})
+
+Usage:
+    python main.py evaluate data.jsonl --adapter openai --adapter-arg api_key=sk-... \\
+        --prompt "Extract all entities." --output preds.jsonl --batch-size 64
+    cat data.jsonl | python main.py evaluate - --adapter synthetic --prompt "..." > preds.jsonl
+    python main.py optimize train.jsonl --adapter huggingface --model gpt2 \\
+        --prompt "Extract all entities." --steps 5 --output beams.jsonl --cache-dir .cache
 
+--resume continues a job whose --output file already has results: evaluate skips the
+inputs already written (a truncated last line is discarded), optimize continues from
+the beam of the last recorded step.
 """
-"""
\ No newline at end of file
+
+import argparse
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from promptoptimizerscai.adapters.registry import available_adapters, create_adapter, get_adapter_class
+
+
+def parse_adapter_args(pairs):
+    """["key=value", ...] -> dict; values are parsed as JSON when possible."""
+    kwargs = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected key=value, got {pair!r}")
+        try:
+            kwargs[key] = json.loads(value)
+        except json.JSONDecodeError:
+            kwargs[key] = value
+    return kwargs
+
+def build_adapter(args):
+    """Create the --adapter from the registry, passing the options its constructor accepts."""
+    kwargs = parse_adapter_args(args.adapter_arg)
+    accepted = inspect.signature(get_adapter_class(args.adapter)).parameters
+    if args.model:
+        kwargs.setdefault("model_name" if "model_name" in accepted else "model", args.model)
+    if args.task and "task" in accepted:
+        kwargs.setdefault("task", args.task)
+    if "api_key" in accepted and "api_key" not in kwargs and os.environ.get("OPENAI_API_KEY"):
+        kwargs["api_key"] = os.environ["OPENAI_API_KEY"]
+    adapter = create_adapter(args.adapter, **kwargs)
+    if args.cache_dir:
+        from promptoptimizerscai.adapters.caching_adapter import CachingAdapter
+        adapter = CachingAdapter(adapter, cache_dir=args.cache_dir)
+    return adapter
+
+def iter_records(paths, input_field="text", gold_field="label"):
+    """Stream (input, gold) pairs from JSONL files ("-" is stdin); gold is None when absent."""
+    for path in paths:
+        stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+        try:
+            for line in stream:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    yield record.get(input_field), record.get(gold_field)
+                else:
+                    yield record, None
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+def _complete_prefix(path):
+    """(number, total bytes) of the complete JSON lines at the start of an output file."""
+    count, good_bytes = 0, 0
+    if not os.path.exists(path):
+        return count, good_bytes
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            count += 1
+            good_bytes += len(line)
+    return count, good_bytes
+
+def completed_lines(path):
+    """Number of complete JSON lines at the start of an output file."""
+    return _complete_prefix(path)[0]
+
+def discard_partial_lines(path):
+    """Cut an output file back to its complete JSON lines (e.g. after a killed job) before appending."""
+    good_bytes = _complete_prefix(path)[1]
+    if os.path.exists(path) and good_bytes < os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_bytes)
+
+def last_record(path):
+    """Last complete JSON line of an output file, or None."""
+    n = completed_lines(path)
+    if not n:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in islice(f, n - 1, n):
+            return json.loads(line)
+
+def _open_output(path, append):
+    if path is None or path == "-":
+        return sys.stdout
+    return open(path, "a" if append else "w", encoding="utf-8")
+
+def _batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+def run_evaluate(args, new_adapter, out):
+    """
+    Evaluate args.prompt on every input, keeping at most `concurrency` batches in flight.
+    Each worker thread runs its batches on its own adapter from `new_adapter()`: adapters
+    keep per-call state (tokenizer padding and prefix cache, rate limiters, stats) that
+    is not safe to share between threads.
+    """
+    from promptoptimizerscai.core.evaluation import evaluate_prompt
+
+    skip = completed_lines(args.output) if args.resume and args.output not in (None, "-") else 0
+    records = islice(iter_records(args.inputs, args.input_field, args.gold_field), skip, None)
+    totals = {"evaluated": 0, "correct": 0, "labeled": 0, "skipped": skip}
+    local = threading.local()
+
+    def evaluate(batch):
+        if not hasattr(local, "adapter"):
+            local.adapter = new_adapter()
+        return evaluate_prompt(args.prompt, [inp for inp, _ in batch], local.adapter)
+
+    def write(start, batch, preds):
+        for offset, ((inp, gold), pred) in enumerate(zip(batch, preds)):
+            row = {"index": start + offset, "input": inp, "prediction": pred}
+            if gold is not None:
+                row["gold"] = gold
+                row["correct"] = pred == gold
+                totals["labeled"] += 1
+                totals["correct"] += row["correct"]
+            out.write(json.dumps(row) + "\n")
+        out.flush()
+        totals["evaluated"] += len(batch)
+
+    pending, index = deque(), skip
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for batch in _batches(records, args.batch_size):
+            if len(pending) >= args.concurrency:
+                write(*pending[0][:2], pending[0][2].result())
+                pending.popleft()
+            future = pool.submit(evaluate, batch)
+            pending.append((index, batch, future))
+            index += len(batch)
+        while pending:
+            start, batch, future = pending.popleft()
+            write(start, batch, future.result())
+    if totals["labeled"]:
+        totals["accuracy"] = totals["correct"] / totals["labeled"]
+    return totals
+
+def _dataset_path(paths):
+    """A single JSONL file to memory-map; stdin or several files are spooled to a temp file."""
+    if len(paths) == 1 and paths[0] != "-":
+        return paths[0], False
+    spool = tempfile.NamedTemporaryFile("wb", suffix=".jsonl", delete=False)
+    with spool:
+        for path in paths:
+            if path == "-":
+                shutil.copyfileobj(sys.stdin.buffer, spool)
+            else:
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, spool)
+            # Empty lines are skipped, so this only guards against a missing final newline
+            spool.write(b"\n")
+    return spool.name, True
+
+def run_optimize(args, adapter, out):
+    """Beam search over minibatches sampled from the inputs; writes the beam after each step."""
+    from promptoptimizerscai.core.budget import TokenBudget
+    from promptoptimizerscai.core.dataset import JsonlDataset
+    from promptoptimizerscai.core.optimizer import PromptOptimizer
+
+    budget = None
+    if args.max_tokens is not None or args.max_cost is not None:
+        budget = TokenBudget(max_tokens=args.max_tokens, max_cost=args.max_cost)
+    optimizer = PromptOptimizer(adapter, seed=args.seed, budget=budget)
+    beam, start = [args.prompt], 0
+    last = last_record(args.output) if args.resume and args.output not in (None, "-") else None
+    if last is not None:
+        beam, start = last["beam"], last["step"] + 1
+        if budget is not None and "spend" in last:
+            # The report also has derived fields (remaining_fraction, ...); keep the counters
+            budget.spent.update({k: last["spend"][k] for k in budget.spent if k in last["spend"]})
+    completed = []
+
+    def write_step(step, beam):
+        row = {"step": step, "beam": beam}
+        if budget is not None:
+            row["spend"] = budget.report()
+        out.write(json.dumps(row) + "\n")
+        out.flush()
+        completed.append(step)
+
+    path, spooled = _dataset_path(args.inputs)
+    try:
+        # The line index is cached in --cache-dir, never next to the user's input
+        dataset = JsonlDataset(path, fields=(args.input_field, args.gold_field), index_dir=args.cache_dir,
+                               cache_index=args.cache_dir is not None and not spooled)
+        beam = optimizer.run(beam, lambda step: dataset.sample(args.batch_size, seed=args.seed + step), args.steps,
+                             beam_width=args.beam_width, start=start, on_step=write_step)
+    finally:
+        if spooled:
+            os.unlink(path)
+    return {"steps": len(completed), "beam": beam}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate or optimize prompts over JSONL inputs.")
+    parser.add_argument("mode", choices=["evaluate", "optimize"])
+    parser.add_argument("inputs", nargs="*", default=["-"], help="JSONL files; '-' or nothing reads stdin")
+    parser.add_argument("--adapter", required=True, help=f"One of: {', '.join(available_adapters())}")
+    parser.add_argument("--adapter-arg", dest="adapter_arg", action="append", default=[],
+                        help="Extra adapter constructor argument as key=value (repeatable)")
+    parser.add_argument("--model", help="Model name passed to the adapter")
+    parser.add_argument("--task", help="Pipeline task for the huggingface adapter")
+    parser.add_argument("--prompt", required=True)
+    parser.add_argument("--output", help="Output JSONL file (default: stdout)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the results already in --output")
+    parser.add_argument("--batch-size", dest="batch_size", type=int, default=32,
+                        help="Inputs per adapter batch (evaluate) or minibatch size (optimize)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Batches in flight at once, each on its own adapter instance (evaluate)")
+    parser.add_argument("--cache-dir", dest="cache_dir", help="Cache responses (CachingAdapter) and the optimize dataset index on disk")
+    parser.add_argument("--input-field", dest="input_field", default="text")
+    parser.add_argument("--gold-field", dest="gold_field", default="label")
+    parser.add_argument("--steps", type=int, default=3, help="Beam search steps (optimize)")
+    parser.add_argument("--beam-width", dest="beam_width", type=int, default=3)
+    parser.add_argument("--max-tokens", dest="max_tokens", type=int, help="Token budget for the run (optimize)")
+    parser.add_argument("--max-cost", dest="max_cost", type=float, help="Cost budget for the run (optimize)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.batch_size < 1 or args.concurrency < 1:
+        parser.error("--batch-size and --concurrency must be at least 1")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    adapters = []
+
+    def new_adapter():
+        adapter = build_adapter(args)
+        adapters.append(adapter)
+        return adapter
+
+    if args.resume and args.output not in (None, "-"):
+        discard_partial_lines(args.output)
+    out = _open_output(args.output, append=args.resume)
+    try:
+        if args.mode == "evaluate":
+            summary = run_evaluate(args, new_adapter, out)
+        else:
+            summary = run_optimize(args, new_adapter(), out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        for adapter in adapters:
+            if hasattr(adapter, "close"):
+                adapter.close()
+    print(json.dumps(summary), file=sys.stderr)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,23 @@
 from abc import ABC, abstractmethod
 
+# Meta-prompts for adapters without their own gradient/edit implementation (ProTeGi style)
+GRADIENT_PROMPT = (
+    "I'm trying to write a prompt for a language model.\n"
+    "My current prompt is:\n\"{prompt}\"\n"
+    "But this prompt gets the following examples wrong:\n{errors}\n"
+    "Give one reason why the prompt could have gotten these examples wrong. Reply with the reason only."
+)
+EDIT_PROMPT = (
+    "I'm trying to write a prompt for a language model.\n"
+    "My current prompt is:\n\"{prompt}\"\n"
+    "It has this problem:\n{gradient}\n"
+    "Write an improved prompt that fixes the problem. Reply with the new prompt only."
+)
+
+def _format_error(error):
+    inp, gold, pred = error
+    return f"Input: {inp}\nExpected: {gold}\nPredicted: {pred}"
+
 class ModelAdapter(ABC):
     """Abstract base class for all model adapters."""
 
@@ -13,17 +31,35 @@ class ModelAdapter(ABC):
         # Default: loop over generate
         return [self.generate(prompt, **kwargs) for prompt in prompts]
 
-    # Optional methods for ProTeGi-style optimization
+    def batch_generate_with_prefix(self, prefix: str, inputs: list, separator: str = " ", **kwargs) -> list:
+        """
+        Generate responses for `prefix + separator + input` for every input.
+        Default: join and call batch_generate. Adapters that can reuse work on the
+        shared prefix (e.g. a KV cache) override this.
+        """
+        return self.batch_generate([prefix + separator + x for x in inputs], **kwargs)
+
+    # ProTeGi-style optimization; adapters with a dedicated implementation override these
     def generate_gradient(self, prompt: str, errors: list, **kwargs) -> list:
         """
-        Given a prompt and list of errors, generate feedback (gradient).
-        Override in subclasses or mock in tests.
+        Given a prompt and list of (input, gold, prediction) errors, generate feedback (gradient).
+        Default: ask the model itself, through generate, with GRADIENT_PROMPT.
         """
-        raise NotImplementedError("Gradient feedback not implemented for this adapter.")
+        errors_text = "\n\n".join(_format_error(e) for e in errors)
+        gradient = self._reply(GRADIENT_PROMPT.format(prompt=prompt, errors=errors_text), **kwargs)
+        return [gradient] if gradient else []
 
     def edit_prompt(self, prompt: str, gradient: str, **kwargs) -> list:
         """
         Given a prompt and gradient, return improved prompt(s).
-        Override in subclasses or mock in tests.
+        Default: ask the model itself, through generate, with EDIT_PROMPT.
         """
-        raise NotImplementedError("Prompt editing not implemented for this adapter.")
\ No newline at end of file
+        edited = self._reply(EDIT_PROMPT.format(prompt=prompt, gradient=gradient), **kwargs).strip('"')
+        return [edited] if edited else []
+
+    def _reply(self, request, **kwargs):
+        text = self.generate(request, **kwargs)
+        # Completion models (e.g. text-generation pipelines) echo the request first
+        if text.startswith(request):
+            text = text[len(request):]
+        return text.strip()
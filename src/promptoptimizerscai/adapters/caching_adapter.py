@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .base import ModelAdapter
+
+# Returned by _get on a cache miss; None is a valid cached response
+_MISS = object()
+
+
+class CachingAdapter(ModelAdapter):
+    """
+    Wraps any ModelAdapter with a content-addressed response cache.
+
+    Responses are keyed by a hash of (adapter class, model, prompt, generation kwargs).
+    Lookups go through an in-memory LRU first, then an on-disk SQLite store that
+    survives restarts and is evicted least-recently-used once it exceeds max_disk_bytes.
+    With deterministic_only=True only greedy calls (temperature=0 or do_sample=False)
+    are cached.
+    """
+
+    def __init__(self, adapter, cache_dir: str = None, max_memory_entries: int = 4096,
+                 max_disk_bytes: int = 512 * 1024 * 1024, deterministic_only: bool = False):
+        self.adapter = adapter
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.deterministic_only = deterministic_only
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "uncached": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(cache_dir, "responses.sqlite"), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def __getattr__(self, name):
+        # Anything not cached (model name, tokenizer, ...) comes from the wrapped adapter
+        if name == "adapter":
+            raise AttributeError(name)
+        return getattr(self.adapter, name)
+
+    @property
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else 0.0
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        if not self._cacheable(kwargs):
+            self.stats["uncached"] += 1
+            return self.adapter.generate(prompt, **kwargs)
+        key = self.cache_key(prompt, **kwargs)
+        value = self._get(key)
+        if value is _MISS:
+            value = self.adapter.generate(prompt, **kwargs)
+            self._put(key, value)
+        return value
+
+    def batch_generate(self, prompts: list, **kwargs) -> list:
+        """Serve hits from the cache and send only the misses to the wrapped adapter in one batch."""
+        if not self._cacheable(kwargs):
+            self.stats["uncached"] += len(prompts)
+            return self.adapter.batch_generate(prompts, **kwargs)
+        keys = [self.cache_key(p, **kwargs) for p in prompts]
+        results = [self._get(key) for key in keys]
+        # Repeated prompts inside one batch are sent upstream once
+        missing = OrderedDict()
+        for i, value in enumerate(results):
+            if value is _MISS:
+                missing.setdefault(keys[i], []).append(i)
+        if missing:
+            first = [indices[0] for indices in missing.values()]
+            outputs = self.adapter.batch_generate([prompts[i] for i in first], **kwargs)
+            for (key, indices), value in zip(missing.items(), outputs):
+                self._put(key, value)
+                for i in indices:
+                    results[i] = value
+        return results
+
+    def generate_gradient(self, prompt: str, errors: list, **kwargs) -> list:
+        return self.adapter.generate_gradient(prompt, errors, **kwargs)
+
+    def edit_prompt(self, prompt: str, gradient: str, **kwargs) -> list:
+        return self.adapter.edit_prompt(prompt, gradient, **kwargs)
+
+    def cache_key(self, prompt: str, **kwargs) -> str:
+        model = getattr(self.adapter, "model", None) or getattr(self.adapter, "model_name", None)
+        payload = json.dumps(
+            [type(self.adapter).__name__, str(model), prompt, kwargs], sort_keys=True, default=repr
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _cacheable(self, kwargs):
+        if not self.deterministic_only:
+            return True
+        return kwargs.get("temperature") == 0 or kwargs.get("do_sample") is False
+
+    def _get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self.stats["disk_hits"] += 1
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    return value
+            self.stats["misses"] += 1
+            return _MISS
+
+    def _put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+            data = json.dumps(value)
+            size = len(data.encode("utf-8"))
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, size, time.time()),
+            )
+            self._disk_bytes += size - (old[0] if old else 0)
+            self._evict_disk()
+            self._db.commit()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.max_disk_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._disk_bytes -= size
+                self.stats["evictions"] += 1
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
@@ -1,14 +1,173 @@
-from transformers import pipeline
+import copy
+from collections import OrderedDict
+
 from .base import ModelAdapter
 
+# Tasks whose pipelines accept a list of plain strings and batch them
+BATCHED_TASKS = {"text-generation", "text2text-generation", "summarization", "translation"}
+# Fallback activation/KV-cache estimate when the model config doesn't expose its size
+DEFAULT_BYTES_PER_TOKEN = 64 * 1024
+
+def pipeline(*args, **kwargs):
+    """transformers.pipeline, imported on first use so loading this module stays cheap."""
+    from transformers import pipeline as hf_pipeline
+    return hf_pipeline(*args, **kwargs)
+
+def _repeat_cache(past_key_values, repeats):
+    """Repeat a batch-of-one prefix cache along the batch dimension."""
+    if repeats == 1:
+        return past_key_values
+    if hasattr(past_key_values, "batch_repeat_interleave"):
+        past_key_values.batch_repeat_interleave(repeats)
+        return past_key_values
+    # Legacy tuple-of-tuples cache
+    return tuple(tuple(t.repeat_interleave(repeats, dim=0) for t in layer) for layer in past_key_values)
+
 class HuggingFaceAdapter(ModelAdapter):
-    def __init__(self, model_name: str, task: str = "text-generation", device: int = -1, **kwargs):
+    def __init__(self, model_name: str, task: str = "text-generation", device: int = -1,
+                 memory_budget_mb: int = 1024, max_batch_size: int = 64, prefix_cache_size: int = 8, **kwargs):
         self.task = task
         self.model_name = model_name
+        self.memory_budget_mb = memory_budget_mb
+        self.max_batch_size = max_batch_size
+        # Past key/values of recent prompt prefixes (e.g. the current beam candidates), LRU
+        self.prefix_cache_size = prefix_cache_size
+        self._prefix_cache = OrderedDict()
         self.pipeline = pipeline(task=task, model=model_name, device=device, **kwargs)
 
+    @property
+    def max_tokens_arg(self):
+        # Output-length argument for SchedulingAdapter; other tasks have no output length
+        return "max_new_tokens" if self.task in ("text-generation", "text2text-generation") else None
+
     def generate(self, prompt: str, **kwargs) -> str:
         result = self.pipeline(prompt, **kwargs)
+        return self._to_text(result)
+
+    def batch_generate(self, prompts: list, **kwargs) -> list:
+        """
+        Batched inference: inputs are sorted by token length, cut into buckets that fit
+        the memory budget, run through the pipeline in batch mode and put back in input order.
+        """
+        if self.task not in BATCHED_TASKS or len(prompts) < 2:
+            return super().batch_generate(prompts, **kwargs)
+        self._enable_padding()
+        lengths = [len(ids) for ids in self.pipeline.tokenizer(list(prompts))["input_ids"]]
+        extra_tokens = kwargs.get("max_new_tokens", 0)
+        results = [None] * len(prompts)
+        for bucket in self._length_buckets(lengths, extra_tokens):
+            outputs = self.pipeline([prompts[i] for i in bucket], batch_size=len(bucket), **kwargs)
+            for i, out in zip(bucket, outputs):
+                # Batched calls return one item per input; wrap it like a single call's result
+                results[i] = self._to_text(out if isinstance(out, list) else [out])
+        return results
+
+    def batch_generate_with_prefix(self, prefix: str, inputs: list, separator: str = " ", **kwargs) -> list:
+        """
+        Encode the shared prefix once, keep its past key/values in an LRU and only run the
+        suffixes through the model: inputs whose full texts have the same token length are
+        generated as one batch (no padding) on the repeated prefix cache. When that takes
+        more model calls than the length buckets of batch_generate, batch_generate is used.
+        Generation uses the pipeline's generation config and call defaults, as generate does.
+        """
+        if self.task != "text-generation" or not self.prefix_cache_size:
+            return super().batch_generate_with_prefix(prefix, inputs, separator, **kwargs)
+        import torch
+
+        tokenizer, model = self.pipeline.tokenizer, self.pipeline.model
+        texts = [prefix + separator + inp for inp in inputs]
+        prefix_ids = tokenizer(prefix, return_tensors="pt")["input_ids"]
+        prefix_len = prefix_ids.shape[1]
+        encoded = tokenizer(texts)["input_ids"] if texts else []
+        # The cache is only valid if the prefix tokenizes the same inside the full text
+        by_length, plain = {}, []
+        for i, ids in enumerate(encoded):
+            if prefix_len and len(ids) > prefix_len and list(ids[:prefix_len]) == prefix_ids[0].tolist():
+                by_length.setdefault(len(ids), []).append(i)
+            else:
+                plain.append(i)
+        groups = [indices[start:start + self.max_batch_size]
+                  for indices in by_length.values() for start in range(0, len(indices), self.max_batch_size)]
+        if not groups:
+            return self.batch_generate(texts, **kwargs)
+        if len(texts) > 1:
+            buckets = self._length_buckets([len(ids) for ids in encoded], kwargs.get("max_new_tokens", 0))
+            if len(groups) + len(plain) > len(buckets):
+                return self.batch_generate(texts, **kwargs)
+
+        generate_kwargs = {**getattr(self.pipeline, "_forward_params", {}), **kwargs}
+        generation_config = getattr(self.pipeline, "generation_config", None)
+        if generation_config is not None:
+            generate_kwargs.setdefault("generation_config", generation_config)
+        results = [None] * len(texts)
+        for i in plain:
+            results[i] = self.generate(texts[i], **kwargs)
+        for indices in groups:
+            input_ids = torch.tensor([encoded[i] for i in indices])
+            past_key_values = _repeat_cache(copy.deepcopy(self._cached_prefix(prefix, prefix_ids)), len(indices))
+            with torch.no_grad():
+                output = model.generate(
+                    input_ids=input_ids.to(model.device),
+                    attention_mask=torch.ones_like(input_ids).to(model.device),
+                    past_key_values=past_key_values,
+                    **generate_kwargs,
+                )
+            for row, i in enumerate(indices):
+                # Same text assembly as the text-generation pipeline (return_full_text=True)
+                results[i] = texts[i] + tokenizer.decode(output[row, input_ids.shape[1]:], skip_special_tokens=True,
+                                                         clean_up_tokenization_spaces=True)
+        return results
+
+    def _cached_prefix(self, prefix, prefix_ids):
+        if prefix in self._prefix_cache:
+            self._prefix_cache.move_to_end(prefix)
+            return self._prefix_cache[prefix]
+        import torch
+
+        model = self.pipeline.model
+        with torch.no_grad():
+            past_key_values = model(input_ids=prefix_ids.to(model.device), use_cache=True).past_key_values
+        self._prefix_cache[prefix] = past_key_values
+        while len(self._prefix_cache) > self.prefix_cache_size:
+            self._prefix_cache.popitem(last=False)
+        return past_key_values
+
+    def _length_buckets(self, lengths, extra_tokens=0):
+        """Group input indices (shortest first) so each padded batch stays within the memory budget."""
+        max_batch_tokens = max(1, self.memory_budget_mb * 1024 * 1024 // self._bytes_per_token())
+        buckets, current = [], []
+        for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            # Sorted ascending, so the newest item sets the padded length of the batch
+            padded_len = lengths[i] + extra_tokens
+            if current and ((len(current) + 1) * padded_len > max_batch_tokens
+                            or len(current) >= self.max_batch_size):
+                buckets.append(current)
+                current = []
+            current.append(i)
+        if current:
+            buckets.append(current)
+        return buckets
+
+    def _bytes_per_token(self):
+        # Keys + values for every layer, doubled as headroom for activations
+        config = getattr(self.pipeline.model, "config", None)
+        layers = getattr(config, "num_hidden_layers", None)
+        hidden = getattr(config, "hidden_size", None)
+        if not isinstance(layers, int) or not isinstance(hidden, int):
+            return DEFAULT_BYTES_PER_TOKEN
+        element_size = getattr(getattr(self.pipeline.model, "dtype", None), "itemsize", 4)
+        return 2 * 2 * layers * hidden * element_size
+
+    def _enable_padding(self):
+        tokenizer = self.pipeline.tokenizer
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        if self.task == "text-generation":
+            # Decoder-only models must be padded on the left to continue the prompt
+            tokenizer.padding_side = "left"
+
+    @staticmethod
+    def _to_text(result):
         if isinstance(result, list) and "generated_text" in result[0]:
             return result[0]["generated_text"]
-        return str(result)
\ No newline at end of file
+        return str(result)
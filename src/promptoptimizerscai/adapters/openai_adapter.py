@@ -1,21 +1,133 @@
-import openai
+import asyncio
+import random
+import threading
+import time
+
+from ..core.tokens import count_tokens
 from .base import ModelAdapter
+from .rate_limiter import RateLimiter
+
+RETRY_STATUS_CODES = {408, 409, 429}
+
+def _openai():
+    """The openai module, imported on first use so loading this module stays cheap."""
+    import openai
+    return openai
+
 
 class OpenAIAdapter(ModelAdapter):
-    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
-        openai.api_key = api_key
+    """
+    Chat completions through one pooled AsyncOpenAI client.
+
+    The client lives on a background event loop owned by the adapter, so generate,
+    batch_generate and abatch_generate (from any thread or event loop) share its
+    connection pool, concurrency limit and rate limits. Call close() when done.
+    """
+
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo", base_url: str = None,
+                 max_concurrency: int = 16, rpm: int = None, tpm: int = None,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 max_tokens: int = 512):
+        self.api_key = api_key
         self.model = model
+        # Default output limit; a max_tokens kwarg (e.g. from SchedulingAdapter) overrides it
+        self.max_tokens = max_tokens
+        # base_url lets the adapter target any OpenAI-compatible server (e.g. a local stand-in)
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = RateLimiter(rpm=rpm, tpm=tpm)
+        # Seconds spent waiting on rate limits/concurrency, and token usage reported by the API
+        self.stats = {"queue_wait": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._lock = threading.Lock()
 
     def generate(self, prompt: str, **kwargs) -> str:
-        response = openai.ChatCompletion.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=kwargs.get("temperature", 1.0),
-            max_tokens=kwargs.get("max_tokens", 512),
-        )
-        return response['choices'][0]['message']['content']
+        return self.batch_generate([prompt], **kwargs)[0]
 
     def batch_generate(self, prompts: list, **kwargs) -> list:
-        # OpenAI's API does not natively support batch, so we loop
-        return [self.generate(prompt, **kwargs) for prompt in prompts]
-    
\ No newline at end of file
+        """Blocking batch on the adapter's loop; results are in input order."""
+        return asyncio.run_coroutine_threadsafe(self._abatch(prompts, **kwargs), self._get_loop()).result()
+
+    async def abatch_generate(self, prompts: list, **kwargs) -> list:
+        """
+        Send all prompts concurrently through the pooled client.
+        At most `max_concurrency` requests are in flight, the rpm/tpm budgets are respected
+        and 429/5xx responses are retried with jittered exponential backoff.
+        """
+        loop = self._get_loop()
+        if asyncio.get_running_loop() is loop:
+            return await self._abatch(prompts, **kwargs)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._abatch(prompts, **kwargs), loop))
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), loop).result()
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="openai-adapter-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _abatch(self, prompts, **kwargs):
+        # Runs on the adapter's loop, where the client and semaphore live
+        if self._client is None:
+            self._client = _openai().AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [self._agenerate(self._client, self._semaphore, prompt, **kwargs) for prompt in prompts]
+        return list(await asyncio.gather(*tasks))
+
+    async def _agenerate(self, client, semaphore, prompt, **kwargs):
+        openai = _openai()
+        max_tokens = kwargs.get("max_tokens", self.max_tokens)
+        # Locally counted prompt tokens plus the completion allowance
+        estimated_tokens = count_tokens(prompt, self.model) + max_tokens
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            await self.rate_limiter.acquire(estimated_tokens)
+            try:
+                async with semaphore:
+                    self.stats["queue_wait"] += time.perf_counter() - queued
+                    response = await client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=kwargs.get("temperature", 1.0),
+                        max_tokens=max_tokens,
+                    )
+                if response.usage is not None:
+                    self.stats["prompt_tokens"] += response.usage.prompt_tokens
+                    self.stats["completion_tokens"] += response.usage.completion_tokens
+                return response.choices[0].message.content
+            except openai.APIStatusError as e:
+                retryable = e.status_code in RETRY_STATUS_CODES or e.status_code >= 500
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt, e.response.headers.get("retry-after"))
+            except openai.APIConnectionError:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than a server-sent Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        try:
+            return max(delay, float(retry_after)) if retry_after is not None else delay
+        except ValueError:
+            return delay
@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from collections import deque
+
+from .base import ModelAdapter
+
+
+def _worker_main(worker_id, adapter_factory, threads, task_queue, result_queue):
+    """Build the adapter once, then serve (job, chunk, method, args, kwargs) tasks until None."""
+    if threads:
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ[var] = str(threads)
+    adapter = adapter_factory()
+    if threads and "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        job_id, chunk_id, method, args, kwargs = task
+        try:
+            result = getattr(adapter, method)(*args, **kwargs)
+            result_queue.put((job_id, chunk_id, worker_id, True, result))
+        except Exception as e:
+            result_queue.put((job_id, chunk_id, worker_id, False, f"{type(e).__name__}: {e}"))
+
+
+class ProcessPoolAdapter(ModelAdapter):
+    """
+    ModelAdapter backed by a pool of worker processes, each holding its own copy of the model.
+
+    adapter_factory: picklable zero-argument callable returning a ModelAdapter; it runs once
+        in every worker (e.g. functools.partial(HuggingFaceAdapter, model_name="gpt2")).
+    threads_per_worker: intra-op threads each worker may use (torch/BLAS).
+    batch_generate splits its inputs into chunks of `chunk_size`, hands one chunk at a time
+    to each idle worker over multiprocessing queues and reassembles the results in order.
+    A worker that dies is restarted and its chunk is retried up to `max_chunk_retries` times.
+    """
+
+    def __init__(self, adapter_factory, num_workers: int = None, threads_per_worker: int = 1,
+                 chunk_size: int = 16, max_chunk_retries: int = 2, mp_context: str = "spawn"):
+        self.adapter_factory = adapter_factory
+        self.threads_per_worker = threads_per_worker
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 1) // max(1, threads_per_worker))
+        self.chunk_size = chunk_size
+        self.max_chunk_retries = max_chunk_retries
+        self.restarts = 0
+        self._ctx = multiprocessing.get_context(mp_context)
+        self._result_queue = self._ctx.Queue()
+        self._workers = {}
+        self._job_id = 0
+        self._lock = threading.Lock()
+        for worker_id in range(self.num_workers):
+            self._start_worker(worker_id)
+
+    def _start_worker(self, worker_id):
+        task_queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.adapter_factory, self.threads_per_worker, task_queue, self._result_queue),
+            daemon=True,
+        )
+        process.start()
+        self._workers[worker_id] = (process, task_queue)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        return self.batch_generate([prompt], **kwargs)[0]
+
+    def batch_generate(self, prompts: list, **kwargs) -> list:
+        chunks = [prompts[i:i + self.chunk_size] for i in range(0, len(prompts), self.chunk_size)]
+        results = self._run([("batch_generate", (chunk,), kwargs) for chunk in chunks])
+        return [out for chunk_result in results for out in chunk_result]
+
+    def batch_generate_with_prefix(self, prefix: str, inputs: list, separator: str = " ", **kwargs) -> list:
+        # Shard the suffixes and keep the prefix, so workers can use their own prefix caches
+        chunks = [inputs[i:i + self.chunk_size] for i in range(0, len(inputs), self.chunk_size)]
+        tasks = [("batch_generate_with_prefix", (prefix, chunk, separator), kwargs) for chunk in chunks]
+        return [out for chunk_result in self._run(tasks) for out in chunk_result]
+
+    def generate_gradient(self, prompt: str, errors: list, **kwargs) -> list:
+        return self._run([("generate_gradient", (prompt, errors), kwargs)])[0]
+
+    def edit_prompt(self, prompt: str, gradient: str, **kwargs) -> list:
+        return self._run([("edit_prompt", (prompt, gradient), kwargs)])[0]
+
+    def _run(self, tasks):
+        """Run (method, args, kwargs) tasks on the workers; results come back in task order."""
+        with self._lock:
+            self._job_id += 1
+            job_id = self._job_id
+            pending = deque(range(len(tasks)))
+            assigned = {}  # worker_id -> chunk_id
+            attempts = [0] * len(tasks)
+            results = {}
+            while len(results) < len(tasks):
+                for worker_id, (_, task_queue) in self._workers.items():
+                    if worker_id not in assigned and pending:
+                        chunk_id = pending.popleft()
+                        method, args, kwargs = tasks[chunk_id]
+                        task_queue.put((job_id, chunk_id, method, args, kwargs))
+                        assigned[worker_id] = chunk_id
+                try:
+                    msg_job, chunk_id, worker_id, ok, payload = self._result_queue.get(timeout=0.1)
+                except queue.Empty:
+                    self._recover_crashed(assigned, pending, attempts)
+                    continue
+                if msg_job != job_id:
+                    # Late result from a job that was abandoned after an error
+                    continue
+                assigned.pop(worker_id, None)
+                if not ok:
+                    raise RuntimeError(f"Worker {worker_id} failed on chunk {chunk_id}: {payload}")
+                results[chunk_id] = payload
+            return [results[i] for i in range(len(tasks))]
+
+    def _recover_crashed(self, assigned, pending, attempts):
+        for worker_id, (process, _) in list(self._workers.items()):
+            if process.is_alive():
+                continue
+            self.restarts += 1
+            self._start_worker(worker_id)
+            chunk_id = assigned.pop(worker_id, None)
+            if chunk_id is None:
+                continue
+            attempts[chunk_id] += 1
+            if attempts[chunk_id] > self.max_chunk_retries:
+                raise RuntimeError(
+                    f"Chunk {chunk_id} crashed a worker {attempts[chunk_id]} times (exit code {process.exitcode})"
+                )
+            pending.appendleft(chunk_id)
+
+    def close(self):
+        for process, task_queue in self._workers.values():
+            if process.is_alive():
+                task_queue.put(None)
+        for process, _ in self._workers.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._workers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests-per-minute and tokens-per-minute budgets.
+    A budget of None disables that bucket. Both buckets start full. Thread-safe.
+    """
+
+    def __init__(self, rpm=None, tpm=None, clock=time.monotonic):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.clock = clock
+        self._requests = float(rpm) if rpm else 0.0
+        self._tokens = float(tpm) if tpm else 0.0
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = now - self._last
+        self._last = now
+        if self.rpm:
+            self._requests = min(float(self.rpm), self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(float(self.tpm), self._tokens + elapsed * self.tpm / 60.0)
+
+    def reserve(self, tokens=0):
+        """
+        Try to take one request and `tokens` tokens from the buckets.
+        Returns 0 on success, otherwise the number of seconds to wait before retrying.
+        """
+        with self._lock:
+            return self._reserve(tokens)
+
+    def _reserve(self, tokens):
+        self._refill()
+        # A single request larger than the whole minute budget would never fit
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        wait = 0.0
+        if self.rpm and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60.0 / self.rpm)
+        if self.tpm and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) * 60.0 / self.tpm)
+        if wait > 0:
+            return wait
+        if self.rpm:
+            self._requests -= 1
+        if self.tpm:
+            self._tokens -= tokens
+        return 0.0
+
+    async def acquire(self, tokens=0):
+        """Wait until one request with `tokens` tokens fits in the budgets."""
+        while True:
+            wait = self.reserve(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
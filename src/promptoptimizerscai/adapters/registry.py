@@ -0,0 +1,55 @@
+"""
+Adapter registry: resolve adapters by name and import their modules only when needed.
+
+Built-in adapters are registered as "module:Class" strings, so looking one up doesn't
+import transformers, torch or openai until that adapter is actually requested.
+Third-party packages can add adapters through the "promptoptimizerscai.adapters"
+entry-point group, e.g. in their pyproject.toml:
+
+    [project.entry-points."promptoptimizerscai.adapters"]
+    myllm = "my_package.adapters:MyLLMAdapter"
+"""
+
+import importlib
+from importlib.metadata import entry_points
+
+ENTRY_POINT_GROUP = "promptoptimizerscai.adapters"
+
+_ADAPTERS = {
+    "openai": "promptoptimizerscai.adapters.openai_adapter:OpenAIAdapter",
+    "huggingface": "promptoptimizerscai.adapters.hugging_face_adapter:HuggingFaceAdapter",
+    "hf": "promptoptimizerscai.adapters.hugging_face_adapter:HuggingFaceAdapter",
+    "caching": "promptoptimizerscai.adapters.caching_adapter:CachingAdapter",
+    "process_pool": "promptoptimizerscai.adapters.process_pool_adapter:ProcessPoolAdapter",
+    "scheduling": "promptoptimizerscai.adapters.scheduling_adapter:SchedulingAdapter",
+    "single_flight": "promptoptimizerscai.adapters.single_flight_adapter:SingleFlightAdapter",
+    "synthetic": "promptoptimizerscai.adapters.synthetic_adapter:SyntheticAdapter",
+}
+
+
+def register_adapter(name, target):
+    """Register an adapter class, or a lazy "module:Class" path, under `name`."""
+    _ADAPTERS[name] = target
+
+def _entry_points():
+    return {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+
+def available_adapters():
+    return sorted(set(_ADAPTERS) | set(_entry_points()))
+
+def get_adapter_class(name):
+    """Resolve an adapter name to its class, importing its module on first use."""
+    target = _ADAPTERS.get(name)
+    if target is None:
+        plugin = _entry_points().get(name)
+        if plugin is None:
+            raise ValueError(f"Unknown adapter: {name!r}. Available: {', '.join(available_adapters())}")
+        target = _ADAPTERS[name] = plugin.load()
+    if isinstance(target, str):
+        module_name, _, attr = target.partition(":")
+        target = _ADAPTERS[name] = getattr(importlib.import_module(module_name), attr)
+    return target
+
+def create_adapter(name, **kwargs):
+    """Build an adapter by name, e.g. create_adapter("huggingface", model_name="gpt2")."""
+    return get_adapter_class(name)(**kwargs)
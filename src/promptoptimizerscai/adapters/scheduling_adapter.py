@@ -0,0 +1,153 @@
+import math
+import threading
+
+from ..core.tokens import count_tokens
+from .base import ModelAdapter
+
+
+def pack_batches(token_counts, max_batch_tokens, max_batch_size=None):
+    """
+    Group request indices into batches of at most `max_batch_tokens` tokens (and
+    `max_batch_size` requests). Requests are packed shortest first, so each batch holds
+    similar lengths; a request larger than the limit gets a batch of its own.
+    """
+    batches, current, volume = [], [], 0
+    for i in sorted(range(len(token_counts)), key=lambda i: token_counts[i]):
+        full = max_batch_size is not None and len(current) >= max_batch_size
+        if current and (full or volume + token_counts[i] > max_batch_tokens):
+            batches.append(current)
+            current, volume = [], 0
+        current.append(i)
+        volume += token_counts[i]
+    if current:
+        batches.append(current)
+    return batches
+
+
+class SchedulingAdapter(ModelAdapter):
+    """
+    Wraps a ModelAdapter with token-aware batching and an optional TokenBudget.
+
+    Prompt tokens are counted locally (see core.tokens). batch_generate packs requests
+    by token volume (prompt plus output limit) instead of item count, and every request
+    gets a max_tokens limit from the expected output length: `expected_output_tokens`
+    if given, else the mean completion length observed so far, times `output_margin`.
+    Each batch reserves its worst case on the budget before it is sent (raising
+    BudgetExceededError once the budget is spent) and is charged its actual usage.
+    Outputs that echo their prompt (e.g. text-generation pipelines) are only charged
+    for the text after it.
+    """
+
+    def __init__(self, adapter, budget=None, max_batch_tokens: int = 8192, max_batch_size: int = 64,
+                 expected_output_tokens: int = None, output_margin: float = 1.5,
+                 min_output_tokens: int = 16, max_output_tokens: int = 512, model: str = None):
+        self.adapter = adapter
+        self.budget = budget
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.expected_output_tokens = expected_output_tokens
+        self.output_margin = output_margin
+        self.min_output_tokens = min_output_tokens
+        self.max_output_tokens = max_output_tokens
+        model = model or getattr(adapter, "model", None)
+        self.model = model if isinstance(model, str) else None
+        # Name of the output-length argument, e.g. max_new_tokens for HuggingFaceAdapter
+        # (None: the adapter takes no output limit, the budget still reserves one)
+        arg = getattr(adapter, "max_tokens_arg", "max_tokens")
+        self.max_tokens_arg = arg if arg is None or isinstance(arg, str) else "max_tokens"
+        self.stats = {"calls": 0, "batches": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name == "adapter":
+            raise AttributeError(name)
+        return getattr(self.adapter, name)
+
+    def count_tokens(self, text):
+        return count_tokens(text, self.model)
+
+    def completion_tokens(self, prompt, output):
+        """Tokens generated for `prompt`, leaving out the prompt when the output repeats it."""
+        if isinstance(output, str) and output.startswith(prompt):
+            output = output[len(prompt):]
+        return self.count_tokens(output)
+
+    def output_limit(self):
+        """max_tokens for the next request, from the expected output length."""
+        expected = self.expected_output_tokens
+        if expected is None:
+            if not self.stats["calls"]:
+                return self.max_output_tokens
+            expected = self.stats["completion_tokens"] / self.stats["calls"]
+        return min(self.max_output_tokens, max(self.min_output_tokens, math.ceil(expected * self.output_margin)))
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        return self._dispatch([prompt], kwargs, lambda owned, kw: [self.adapter.generate(prompt, **kw)])[0]
+
+    def batch_generate(self, prompts: list, **kwargs) -> list:
+        return self._dispatch(prompts, kwargs,
+                              lambda owned, kw: self.adapter.batch_generate([prompts[i] for i in owned], **kw))
+
+    def batch_generate_with_prefix(self, prefix: str, inputs: list, separator: str = " ", **kwargs) -> list:
+        return self._dispatch(
+            [prefix + separator + text for text in inputs], kwargs,
+            lambda owned, kw: self.adapter.batch_generate_with_prefix(
+                prefix, [inputs[i] for i in owned], separator=separator, **kw))
+
+    def generate_gradient(self, prompt: str, errors: list, **kwargs) -> list:
+        text = prompt + "".join(str(e) for e in errors)
+        return self._charged(text, lambda: self.adapter.generate_gradient(prompt, errors, **kwargs))
+
+    def edit_prompt(self, prompt: str, gradient: str, **kwargs) -> list:
+        return self._charged(prompt + gradient, lambda: self.adapter.edit_prompt(prompt, gradient, **kwargs))
+
+    def _dispatch(self, prompts, kwargs, call):
+        """Send the prompts in token-packed batches; `call(indices, kwargs)` returns their outputs."""
+        results = [None] * len(prompts)
+        counts = [self.count_tokens(p) for p in prompts]
+        limit = (kwargs.get(self.max_tokens_arg) if self.max_tokens_arg else None) or self.output_limit()
+        kw = dict(kwargs, **{self.max_tokens_arg: limit}) if self.max_tokens_arg else kwargs
+        for batch in pack_batches([c + limit for c in counts], self.max_batch_tokens, self.max_batch_size):
+            prompt_tokens = sum(counts[i] for i in batch)
+            reservation = self._reserve(prompt_tokens, limit * len(batch))
+            try:
+                outputs = call(batch, kw)
+            except BaseException:
+                self._release(reservation)
+                raise
+            completion_tokens = 0
+            for i, output in zip(batch, outputs):
+                results[i] = output
+                completion_tokens += self.completion_tokens(prompts[i], output)
+            self._record(len(batch), prompt_tokens, completion_tokens, reservation)
+        return results
+
+    def _charged(self, text, call):
+        """Gradient and edit calls aren't batched, but still count against the budget."""
+        prompt_tokens = self.count_tokens(text)
+        reservation = self._reserve(prompt_tokens, self.max_output_tokens)
+        try:
+            result = call()
+        except BaseException:
+            self._release(reservation)
+            raise
+        outputs = result if isinstance(result, (list, tuple)) else [result]
+        self._record(1, prompt_tokens, sum(self.count_tokens(o) for o in outputs), reservation, batched=False)
+        return result
+
+    def _reserve(self, prompt_tokens, completion_tokens):
+        return self.budget.reserve(prompt_tokens, completion_tokens) if self.budget is not None else None
+
+    def _release(self, reservation):
+        if self.budget is not None:
+            self.budget.release(reservation)
+
+    def _record(self, calls, prompt_tokens, completion_tokens, reservation, batched=True):
+        if batched:
+            with self._lock:
+                self.stats["calls"] += calls
+                self.stats["batches"] += 1
+                self.stats["prompt_tokens"] += prompt_tokens
+                self.stats["completion_tokens"] += completion_tokens
+        if self.budget is not None:
+            self.budget.charge(prompt_tokens, completion_tokens, calls=calls, reservation=reservation)
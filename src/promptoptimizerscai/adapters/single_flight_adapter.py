@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from .base import ModelAdapter
+
+
+class SingleFlightAdapter(ModelAdapter):
+    """
+    Wraps any ModelAdapter so identical concurrent calls share one upstream request.
+
+    The first caller for a (prompt, generation kwargs) pair sends the request; callers
+    arriving from other threads or coroutines while it is in flight wait for the same
+    result (or exception). Duplicate prompts inside one batch are collapsed before
+    dispatch. Unlike CachingAdapter nothing is kept once the request completes.
+
+    abatch_generate shares the in-flight map with the blocking methods: coroutines await
+    the same futures (through asyncio.wrap_future), and their upstream batch goes through
+    the wrapped adapter's own abatch_generate if it has one, else a worker thread.
+    """
+
+    def __init__(self, adapter):
+        self.adapter = adapter
+        self.stats = {"calls": 0, "upstream": 0, "merged_inflight": 0, "merged_batch": 0}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name == "adapter":
+            raise AttributeError(name)
+        return getattr(self.adapter, name)
+
+    @property
+    def merged(self):
+        return self.stats["merged_inflight"] + self.stats["merged_batch"]
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        return self._coalesce([prompt], kwargs, lambda owned: [self.adapter.generate(prompt, **kwargs)])[0]
+
+    def batch_generate(self, prompts: list, **kwargs) -> list:
+        return self._coalesce(prompts, kwargs,
+                              lambda owned: self.adapter.batch_generate([prompts[i] for i in owned], **kwargs))
+
+    def batch_generate_with_prefix(self, prefix: str, inputs: list, separator: str = " ", **kwargs) -> list:
+        # Keyed by the full prompt, so these merge with plain generate calls for the same text
+        return self._coalesce(
+            [prefix + separator + text for text in inputs], kwargs,
+            lambda owned: self.adapter.batch_generate_with_prefix(
+                prefix, [inputs[i] for i in owned], separator=separator, **kwargs))
+
+    def generate_gradient(self, prompt: str, errors: list, **kwargs) -> list:
+        return self.adapter.generate_gradient(prompt, errors, **kwargs)
+
+    def edit_prompt(self, prompt: str, gradient: str, **kwargs) -> list:
+        return self.adapter.edit_prompt(prompt, gradient, **kwargs)
+
+    async def abatch_generate(self, prompts: list, **kwargs) -> list:
+        positions, futures, owned = self._claim(prompts, kwargs)
+        if owned:
+            owned_prompts = [prompts[positions[key][0]] for key in owned]
+            try:
+                if asyncio.iscoroutinefunction(getattr(type(self.adapter), "abatch_generate", None)):
+                    outputs = await self.adapter.abatch_generate(owned_prompts, **kwargs)
+                else:
+                    outputs = await asyncio.to_thread(self.adapter.batch_generate, owned_prompts, **kwargs)
+                self._resolve(owned, futures, outputs)
+            except BaseException as exc:
+                self._fail(owned, futures, exc)
+                raise
+            finally:
+                self._release(owned)
+        values = {key: await asyncio.wrap_future(future) for key, future in futures.items()}
+        return self._results(len(prompts), positions, values)
+
+    def _coalesce(self, prompts, kwargs, call):
+        """
+        Resolve every prompt through a shared future. `call(owned)` sends the prompts at
+        the `owned` positions (first occurrences not already in flight) upstream.
+        """
+        positions, futures, owned = self._claim(prompts, kwargs)
+        if owned:
+            try:
+                self._resolve(owned, futures, call([positions[key][0] for key in owned]))
+            except BaseException as exc:
+                self._fail(owned, futures, exc)
+                raise
+            finally:
+                self._release(owned)
+        values = {key: future.result() for key, future in futures.items()}
+        return self._results(len(prompts), positions, values)
+
+    def _claim(self, prompts, kwargs):
+        """
+        Key the prompts and look them up in flight. Returns (positions, futures, owned):
+        positions of each key in `prompts`, its shared future, and the keys this caller
+        must send upstream.
+        """
+        encoded_kwargs = json.dumps(kwargs, sort_keys=True, default=repr)
+        positions = OrderedDict()
+        for i, prompt in enumerate(prompts):
+            positions.setdefault((prompt, encoded_kwargs), []).append(i)
+        futures, owned = {}, []
+        with self._lock:
+            self.stats["calls"] += len(prompts)
+            self.stats["merged_batch"] += len(prompts) - len(positions)
+            for key in positions:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = Future()
+                    owned.append(key)
+                else:
+                    self.stats["merged_inflight"] += 1
+                futures[key] = future
+            self.stats["upstream"] += len(owned)
+        return positions, futures, owned
+
+    @staticmethod
+    def _resolve(owned, futures, outputs):
+        outputs = list(outputs)
+        if len(outputs) != len(owned):
+            raise ValueError(f"Expected {len(owned)} outputs, got {len(outputs)}")
+        for key, output in zip(owned, outputs):
+            futures[key].set_result(output)
+
+    @staticmethod
+    def _fail(owned, futures, exc):
+        for key in owned:
+            if not futures[key].done():
+                futures[key].set_exception(exc)
+
+    def _release(self, owned):
+        with self._lock:
+            for key in owned:
+                del self._inflight[key]
+
+    @staticmethod
+    def _results(n, positions, values):
+        results = [None] * n
+        for key, indices in positions.items():
+            for i in indices:
+                results[i] = values[key]
+        return results
@@ -0,0 +1,137 @@
+import hashlib
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .base import ModelAdapter
+
+# Prompt features the synthetic model rewards; gradients point at the first one missing
+SKILLS = ["entities", "relations", "scientific", "precise"]
+# Prompts whose failed attempts are remembered (so retries can succeed), oldest dropped first
+MAX_TRACKED_FAILURES = 10000
+DOC_ID = re.compile(r"\[doc-(\d+)\]")
+# Vocabulary of make_scierc_dataset
+ENTITY_TYPES = ["PROTEIN", "GENE", "CHEMICAL", "PROCESS", "METHOD", "TASK", "MATERIAL"]
+FILLER = ("we propose a novel approach for the analysis of results show that the method "
+          "improves over prior work on this benchmark using").split()
+
+
+def make_scierc_dataset(n, seed=0):
+    """n synthetic (input, gold) pairs shaped like SciERC sentences, tagged "[doc-<i>]" for SyntheticAdapter."""
+    rng = random.Random(seed)
+    examples = []
+    for i in range(n):
+        entities = [(f"term{rng.randrange(10000)}", rng.choice(ENTITY_TYPES)) for _ in range(rng.randint(1, 4))]
+        words = rng.sample(FILLER, 12) + [name for name, _ in entities]
+        rng.shuffle(words)
+        gold = ";".join(f"{name}:{etype}" for name, etype in entities)
+        examples.append((f"[doc-{i}] " + " ".join(words) + " .", gold))
+    return examples
+
+
+class SyntheticAdapterError(RuntimeError):
+    """Simulated transient failure (rate limit, timeout, ...)."""
+
+
+def _unit(*parts):
+    """Deterministic pseudo-random number in [0, 1) from the given parts."""
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+
+class SyntheticAdapter(ModelAdapter):
+    """
+    Deterministic stand-in model for benchmarks and offline tests.
+
+    Inputs carry a "[doc-<i>]" tag; `golds[i]` is the right answer. The answer is returned
+    with a probability that grows with the number of SKILLS words in the prompt, decided by a
+    hash of (prompt, doc), so reruns give identical results. Each call sleeps for
+    `latency + latency_per_token * tokens`, at most `max_concurrency` calls run at once, and
+    `failure_rate` of calls raise SyntheticAdapterError. Token counts, cost and queue wait
+    are accumulated in `stats`.
+    """
+
+    def __init__(self, golds=(), latency: float = 0.001, latency_per_token: float = 0.0,
+                 cost_per_1k_tokens: float = 0.0, failure_rate: float = 0.0, max_concurrency: int = 8,
+                 base_accuracy: float = 0.3, skill_bonus: float = 0.15, completion_tokens: int = 16,
+                 seed: int = 0, model: str = "synthetic"):
+        self.golds = list(golds)
+        self.latency = latency
+        self.latency_per_token = latency_per_token
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+        self.failure_rate = failure_rate
+        self.max_concurrency = max_concurrency
+        self.base_accuracy = base_accuracy
+        self.skill_bonus = skill_bonus
+        self.completion_tokens = completion_tokens
+        self.seed = seed
+        self.model = model
+        self.stats = {"calls": 0, "failures": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                      "cost": 0.0, "queue_wait": 0.0}
+        self._slots = threading.Semaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        # prompt -> failed attempts so far; cleared once the prompt succeeds
+        self._attempts = {}
+
+    def accuracy(self, prompt):
+        skills = sum(1 for skill in SKILLS if skill in prompt.lower())
+        return min(1.0, self.base_accuracy + self.skill_bonus * skills)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        prompt_tokens = len(prompt.split())
+        completion_tokens = min(kwargs.get("max_tokens", self.completion_tokens), self.completion_tokens)
+        queued = time.perf_counter()
+        with self._slots:
+            waited = time.perf_counter() - queued
+            time.sleep(self.latency + self.latency_per_token * (prompt_tokens + completion_tokens))
+            with self._stats_lock:
+                attempt = self._attempts.pop(prompt, 0)
+                self._attempts[prompt] = attempt + 1
+                self.stats["calls"] += 1
+                self.stats["queue_wait"] += waited
+                self.stats["prompt_tokens"] += prompt_tokens
+                self.stats["completion_tokens"] += completion_tokens
+                self.stats["cost"] += (prompt_tokens + completion_tokens) * self.cost_per_1k_tokens / 1000
+                failed = _unit(self.seed, "fail", prompt, attempt) < self.failure_rate
+                if failed:
+                    self.stats["failures"] += 1
+                    if len(self._attempts) > MAX_TRACKED_FAILURES:
+                        del self._attempts[next(iter(self._attempts))]
+                else:
+                    self._attempts.pop(prompt, None)
+        if failed:
+            raise SyntheticAdapterError("simulated transient failure")
+        return self._answer(prompt)
+
+    def batch_generate(self, prompts: list, **kwargs) -> list:
+        """Concurrent like a remote API: up to max_concurrency calls overlap."""
+        if len(prompts) < 2:
+            return [self.generate(p, **kwargs) for p in prompts]
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            return list(pool.map(lambda p: self.generate(p, **kwargs), prompts))
+
+    def generate_gradient(self, prompt: str, errors: list, **kwargs) -> list:
+        missing = [skill for skill in SKILLS if skill not in prompt.lower()]
+        if not missing:
+            return ["The prompt should be more specific."]
+        return [f"The prompt does not mention {skill}." for skill in missing[:2]]
+
+    def edit_prompt(self, prompt: str, gradient: str, **kwargs) -> list:
+        skill = next((s for s in SKILLS if f"mention {s}" in gradient), None)
+        if skill is None:
+            return [prompt + " Be specific."]
+        return [f"{prompt} Focus on {skill}.", f"{prompt} Consider {skill} carefully."]
+
+    def _answer(self, prompt):
+        match = DOC_ID.search(prompt)
+        if match is None or int(match.group(1)) >= len(self.golds):
+            return ""
+        doc = int(match.group(1))
+        instruction = prompt[:match.start()]
+        gold = self.golds[doc]
+        if _unit(self.seed, "answer", instruction, doc) < self.accuracy(instruction):
+            return gold
+        # A plausible wrong answer: the gold with its last label swapped
+        return gold.rsplit(":", 1)[0] + ":OTHER" if ":" in gold else "OTHER"
@@ -0,0 +1,66 @@
+from ..core.tokens import count_tokens
+from ..core.tracing import get_tracer
+from .base import ModelAdapter
+
+# Counters read from the wrapped adapter's `stats` dict, if it has one
+_CACHE_HIT_STATS = ("memory_hits", "disk_hits")
+
+
+def _tokens(texts):
+    return sum(count_tokens(t) for t in texts if isinstance(t, str))
+
+
+class TracingAdapter(ModelAdapter):
+    """
+    Wraps a ModelAdapter and records one span per generate, batch_generate,
+    generate_gradient and edit_prompt call on the global tracer, with wall time,
+    estimated prompt/completion tokens, and the queue wait and cache hits reported
+    by the wrapped adapter's `stats` (if any). Calls pass straight through when
+    tracing is disabled.
+    """
+
+    def __init__(self, adapter):
+        self.adapter = adapter
+
+    def __getattr__(self, name):
+        if name == "adapter":
+            raise AttributeError(name)
+        return getattr(self.adapter, name)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        return self._traced("generate", [prompt], lambda: [self.adapter.generate(prompt, **kwargs)])[0]
+
+    def batch_generate(self, prompts: list, **kwargs) -> list:
+        return self._traced("batch_generate", prompts, lambda: self.adapter.batch_generate(prompts, **kwargs))
+
+    def batch_generate_with_prefix(self, prefix: str, inputs: list, separator: str = " ", **kwargs) -> list:
+        texts = [prefix + separator + x for x in inputs]
+        return self._traced("batch_generate", texts, lambda: self.adapter.batch_generate_with_prefix(
+            prefix, inputs, separator, **kwargs))
+
+    def generate_gradient(self, prompt: str, errors: list, **kwargs) -> list:
+        return self._traced("generate_gradient", [prompt] + [str(e) for e in errors],
+                            lambda: self.adapter.generate_gradient(prompt, errors, **kwargs))
+
+    def edit_prompt(self, prompt: str, gradient: str, **kwargs) -> list:
+        return self._traced("edit_prompt", [prompt, gradient],
+                            lambda: self.adapter.edit_prompt(prompt, gradient, **kwargs))
+
+    def _traced(self, method, inputs, call):
+        tracer = get_tracer()
+        if not tracer.enabled:
+            return call()
+        with tracer.span(f"adapter.{method}", adapter=type(self.adapter).__name__, n_inputs=len(inputs)) as span:
+            before = self._counters()
+            result = call()
+            after = self._counters()
+            outputs = result if isinstance(result, (list, tuple)) else [result]
+            span.set(prompt_tokens=_tokens(inputs), completion_tokens=_tokens(outputs),
+                     queue_wait_s=after[0] - before[0], cache_hits=after[1] - before[1])
+        return result
+
+    def _counters(self):
+        stats = getattr(self.adapter, "stats", None)
+        if not isinstance(stats, dict):
+            return 0.0, 0
+        return stats.get("queue_wait", 0.0), sum(stats.get(k, 0) for k in _CACHE_HIT_STATS)
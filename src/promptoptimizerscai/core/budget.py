@@ -0,0 +1,96 @@
+"""
+Token and cost budget shared by every model call of an optimization run.
+
+Callers reserve the worst case (prompt tokens plus the output limit) before a request
+and charge the actual usage afterwards, so concurrent batches can't overshoot the
+limits. `remaining_fraction` lets the optimizer shrink minibatches as the budget runs low.
+"""
+
+import math
+import threading
+
+
+class BudgetExceededError(RuntimeError):
+    pass
+
+
+class TokenBudget:
+    def __init__(self, max_tokens=None, max_cost=None, cost_per_1k_prompt_tokens=0.0,
+                 cost_per_1k_completion_tokens=0.0, low_water=0.5):
+        """
+        max_tokens, max_cost: limits for the whole run (None: unlimited).
+        low_water: below this remaining fraction, minibatches shrink proportionally.
+        """
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.cost_per_1k_prompt_tokens = cost_per_1k_prompt_tokens
+        self.cost_per_1k_completion_tokens = cost_per_1k_completion_tokens
+        self.low_water = low_water
+        self.spent = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0}
+        self._reserved_tokens = 0
+        self._reserved_cost = 0.0
+        self._lock = threading.Lock()
+
+    def cost(self, prompt_tokens, completion_tokens):
+        return (prompt_tokens * self.cost_per_1k_prompt_tokens
+                + completion_tokens * self.cost_per_1k_completion_tokens) / 1000
+
+    @property
+    def tokens_spent(self):
+        return self.spent["prompt_tokens"] + self.spent["completion_tokens"]
+
+    def remaining_fraction(self):
+        """Share of the tightest limit not yet spent or reserved (1.0 without limits)."""
+        with self._lock:
+            used = [(self.max_tokens, self.tokens_spent + self._reserved_tokens),
+                    (self.max_cost, self.spent["cost"] + self._reserved_cost)]
+            fractions = [1 - amount / limit if limit else 0.0 for limit, amount in used if limit is not None]
+        return max(0.0, min(fractions)) if fractions else 1.0
+
+    @property
+    def exhausted(self):
+        return self.remaining_fraction() <= 0.0
+
+    def reserve(self, prompt_tokens, max_completion_tokens):
+        """Hold the worst-case usage of a request; raises BudgetExceededError if it doesn't fit."""
+        tokens = prompt_tokens + max_completion_tokens
+        cost = self.cost(prompt_tokens, max_completion_tokens)
+        with self._lock:
+            if self.max_tokens is not None and self.tokens_spent + self._reserved_tokens + tokens > self.max_tokens:
+                raise BudgetExceededError(f"Token budget of {self.max_tokens} exhausted "
+                                          f"({self.tokens_spent} spent, {tokens} requested)")
+            if self.max_cost is not None and self.spent["cost"] + self._reserved_cost + cost > self.max_cost:
+                raise BudgetExceededError(f"Cost budget of {self.max_cost} exhausted "
+                                          f"({self.spent['cost']:.4f} spent, {cost:.4f} requested)")
+            self._reserved_tokens += tokens
+            self._reserved_cost += cost
+        return tokens, cost
+
+    def release(self, reservation):
+        with self._lock:
+            self._reserved_tokens -= reservation[0]
+            self._reserved_cost -= reservation[1]
+
+    def charge(self, prompt_tokens, completion_tokens, calls=1, reservation=None):
+        """Record actual usage, releasing `reservation` if given."""
+        with self._lock:
+            if reservation is not None:
+                self._reserved_tokens -= reservation[0]
+                self._reserved_cost -= reservation[1]
+            self.spent["calls"] += calls
+            self.spent["prompt_tokens"] += prompt_tokens
+            self.spent["completion_tokens"] += completion_tokens
+            self.spent["cost"] += self.cost(prompt_tokens, completion_tokens)
+
+    def minibatch_size(self, n, min_size=4):
+        """`n` while the budget is above low_water, then shrunk in proportion to what is left."""
+        fraction = self.remaining_fraction()
+        if fraction >= self.low_water:
+            return n
+        return min(n, max(min_size, math.ceil(n * fraction / self.low_water)))
+
+    def report(self):
+        report = dict(self.spent)
+        report.update(max_tokens=self.max_tokens, max_cost=self.max_cost,
+                      remaining_fraction=self.remaining_fraction())
+        return report
@@ -0,0 +1,99 @@
+"""
+Index of candidate prompts for spotting exact and near duplicates.
+
+Prompts are normalized (case, Unicode form, punctuation, whitespace), so trivial variants
+collide exactly. Near duplicates are found with MinHash signatures over character
+n-grams and locality-sensitive hashing: signatures are cut into bands and only prompts
+sharing a band bucket are compared, so lookups stay cheap with thousands of prompts.
+"""
+
+import hashlib
+import re
+import unicodedata
+
+import numpy as np
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt):
+    text = unicodedata.normalize("NFKC", prompt).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class CandidateIndex:
+    """
+    Maps prompts to their scores and finds the closest already-seen prompt.
+    threshold: minimum estimated Jaccard similarity of character shingles for a near duplicate.
+    """
+
+    def __init__(self, threshold=0.9, num_perm=64, bands=16, shingle_size=5, seed=0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._by_normalized = {}  # normalized text -> entry id
+        self._entries = []  # [prompt, signature, score]
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, prompt):
+        return normalize_prompt(prompt) in self._by_normalized
+
+    def _signature(self, normalized):
+        k = self.shingle_size
+        shingles = {normalized[i:i + k] for i in range(max(1, len(normalized) - k + 1))}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big") for s in shingles),
+            dtype=np.uint64, count=len(shingles),
+        ) % _MERSENNE_PRIME
+        # (a * x + b) mod p for every permutation and shingle; values stay below 2**62
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def add(self, prompt, score=None):
+        """Add a prompt (or update the score of an equivalent one); returns its entry id."""
+        normalized = normalize_prompt(prompt)
+        entry_id = self._by_normalized.get(normalized)
+        if entry_id is not None:
+            if score is not None:
+                self._entries[entry_id][2] = score
+            return entry_id
+        signature = self._signature(normalized)
+        entry_id = len(self._entries)
+        self._entries.append([prompt, signature, score])
+        self._by_normalized[normalized] = entry_id
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(entry_id)
+        return entry_id
+
+    def lookup(self, prompt):
+        """
+        (matched_prompt, similarity, score) for the closest indexed prompt at or above
+        the threshold, or None. Exact matches after normalization have similarity 1.0.
+        """
+        normalized = normalize_prompt(prompt)
+        entry_id = self._by_normalized.get(normalized)
+        if entry_id is not None:
+            matched, _, score = self._entries[entry_id]
+            return matched, 1.0, score
+        signature = self._signature(normalized)
+        candidates = {i for key in self._band_keys(signature) for i in self._buckets.get(key, ())}
+        best = None
+        for i in candidates:
+            similarity = float(np.mean(self._entries[i][1] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (self._entries[i][0], similarity, self._entries[i][2])
+        return best
@@ -0,0 +1,164 @@
+"""
+Memory-mapped JSONL datasets (SciERC/SciFact style, one JSON object per line).
+
+The file is memory-mapped and a byte-offset index of its lines is built once with
+NumPy and cached next to it, or in `index_dir` (<file>.idx.npz, invalidated when the
+file's size or mtime changes). Where the index can't be written it is kept in memory. Examples are parsed only when accessed, so iterating, sampling a
+minibatch or sharding across workers never holds the corpus as Python objects.
+"""
+
+import json
+import mmap
+import os
+
+import numpy as np
+
+_SCAN_CHUNK = 64 * 1024 * 1024
+
+
+def _line_offsets(buffer):
+    """Start and end byte offsets of every non-empty line, scanned in chunks."""
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    newlines = [np.flatnonzero(data[start:start + _SCAN_CHUNK] == ord("\n")) + start
+                for start in range(0, len(data), _SCAN_CHUNK)]
+    ends = np.concatenate(newlines) if newlines else np.empty(0, dtype=np.int64)
+    if len(data) and (len(ends) == 0 or ends[-1] != len(data) - 1):
+        ends = np.append(ends, len(data))
+    starts = np.concatenate([[0], ends[:-1] + 1]) if len(ends) else np.empty(0, dtype=np.int64)
+    keep = ends > starts
+    return starts[keep].astype(np.int64), ends[keep].astype(np.int64)
+
+
+class JsonlDataset:
+    """
+    Lazily parsed JSONL dataset yielding tuples of `fields`
+    (default ("text", "label"), i.e. the (input, gold) pairs PromptOptimizer expects).
+    For SciERC-style data use e.g. fields=("sentence", "entities", "relations").
+    index_dir: where to cache the line index (default: the dataset's directory);
+    cache_index=False only keeps it in memory.
+    """
+
+    def __init__(self, path, fields=("text", "label"), stratify_key=None, indices=None, index_dir=None,
+                 cache_index=True):
+        self.path = path
+        self.fields = tuple(fields)
+        # Field used for stratified sampling (default: the gold field)
+        self.stratify_key = stratify_key or self.fields[-1]
+        self._mmap = None
+        self._index_path = None
+        if cache_index:
+            index_dir = os.path.dirname(path) if index_dir is None else index_dir
+            self._index_path = os.path.join(index_dir, os.path.basename(path) + ".idx.npz")
+        self._index = self._load_index()
+        self._indices = np.arange(len(self._index["starts"])) if indices is None else np.asarray(indices)
+
+    def _open(self):
+        if self._mmap is None:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    self._mmap = b""
+                else:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _load_index(self):
+        stat = os.stat(self.path)
+        index_path = self._index_path
+        if index_path is not None and os.path.exists(index_path):
+            with np.load(index_path) as cached:
+                index = dict(cached)
+            if int(index["size"]) == stat.st_size and int(index["mtime_ns"]) == stat.st_mtime_ns:
+                return index
+        starts, ends = _line_offsets(self._open())
+        index = {"starts": starts, "ends": ends, "size": np.int64(stat.st_size),
+                 "mtime_ns": np.int64(stat.st_mtime_ns)}
+        self._save_index(index)
+        return index
+
+    def _save_index(self, index):
+        if self._index_path is None:
+            return
+        tmp_path = self._index_path + ".tmp.npz"
+        try:
+            np.savez(tmp_path, **index)
+            os.replace(tmp_path, self._index_path)
+        except OSError:
+            # e.g. a read-only dataset directory: keep the index in memory only
+            self._index_path = None
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def __getstate__(self):
+        # The mmap is reopened lazily in the receiving process (e.g. a pool worker)
+        state = self.__dict__.copy()
+        state["_mmap"] = None
+        return state
+
+    def __len__(self):
+        return len(self._indices)
+
+    def _record(self, line):
+        start, end = self._index["starts"][line], self._index["ends"][line]
+        return json.loads(self._open()[start:end])
+
+    def _example(self, line):
+        record = self._record(line)
+        return tuple(record.get(field) for field in self.fields)
+
+    def __getitem__(self, i):
+        return self._example(self._indices[i])
+
+    def __iter__(self):
+        """Stream examples in file order."""
+        for line in self._indices:
+            yield self._example(line)
+
+    def _labels(self):
+        """Label id of every line for the stratify key, computed once and cached in the index file."""
+        key = "labels__" + self.stratify_key
+        if key not in self._index:
+            vocab, ids = {}, np.empty(len(self._index["starts"]), dtype=np.int32)
+            for line in range(len(ids)):
+                value = self._record(line).get(self.stratify_key)
+                label = value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+                ids[line] = vocab.setdefault(label, len(vocab))
+            self._index[key] = ids
+            self._save_index(self._index)
+        return self._index[key][self._indices]
+
+    def sample(self, n, seed=0, stratify=False):
+        """
+        Random minibatch of n examples without replacement. With stratify=True each
+        label gets a share proportional to its frequency (largest remainder rounding).
+        """
+        rng = np.random.default_rng(seed)
+        n = min(n, len(self))
+        if not stratify:
+            positions = rng.choice(len(self), size=n, replace=False)
+        else:
+            labels = self._labels()
+            classes, counts = np.unique(labels, return_counts=True)
+            quotas = counts * n / len(labels)
+            take = np.floor(quotas).astype(int)
+            remainder_order = np.argsort(-(quotas - take), kind="stable")
+            take[remainder_order[:n - take.sum()]] += 1
+            positions = np.concatenate([
+                rng.choice(np.flatnonzero(labels == label), size=k, replace=False)
+                for label, k in zip(classes, take) if k > 0
+            ])
+            rng.shuffle(positions)
+        return [self[int(p)] for p in positions]
+
+    def minibatches(self, batch_size, seed=0, stratify=False):
+        """Endless stream of minibatches, a different seeded sample each step."""
+        step = 0
+        while True:
+            yield self.sample(batch_size, seed=seed + step, stratify=stratify)
+            step += 1
+
+    def shard(self, index, num_shards):
+        """Every num_shards-th example starting at `index`; shares the same file and index."""
+        shard = JsonlDataset.__new__(JsonlDataset)
+        shard.__dict__.update(self.__getstate__())
+        shard._indices = self._indices[index::num_shards]
+        return shard
@@ -0,0 +1,149 @@
+"""
+Error summarization before gradient generation.
+
+Errors (input, gold, prediction) are grouped by failure type and, within a type, into
+buckets of the same label confusion (e.g. every CHEMICAL tagged as MOLECULE). With
+method="kmeans" each failure type is instead clustered on character n-gram TF-IDF
+features (needs scikit-learn; much slower). Representatives are picked round-robin
+across the groups until a token budget is spent, so the gradient prompt covers every
+failure mode with a handful of examples instead of hundreds of near-identical ones.
+"""
+
+import warnings
+
+from .tokens import count_tokens
+
+FAILURE_TYPES = ("missing_entity", "spurious_entity", "wrong_label", "missing_relation",
+                 "spurious_relation", "other")
+
+
+def _estimate_tokens(text):
+    return max(1, count_tokens(text))
+
+def _parse_labeled(value):
+    """'Water:CHEMICAL;H2O:CHEMICAL' -> {'Water': 'CHEMICAL', 'H2O': 'CHEMICAL'}, else None."""
+    if not isinstance(value, str) or ":" not in value:
+        return None
+    pairs = [item.rsplit(":", 1) for item in value.split(";") if ":" in item]
+    return {name.strip(): label.strip() for name, label in pairs}
+
+def classify_failure(error):
+    """Coarse failure type of an (input, gold, prediction) error; one of FAILURE_TYPES."""
+    _, gold, pred = error
+    if isinstance(gold, (tuple, list)) and len(gold) == 2 and isinstance(pred, (tuple, list)) and len(pred) == 2:
+        # SciERC-style (entities, relations) pairs
+        gold_entities, gold_relations = set(gold[0]), {tuple(r) for r in gold[1]}
+        pred_entities, pred_relations = set(pred[0]), {tuple(r) for r in pred[1]}
+        if gold_entities - pred_entities:
+            return "missing_entity"
+        if pred_entities - gold_entities:
+            return "spurious_entity"
+        if gold_relations - pred_relations:
+            return "missing_relation"
+        if pred_relations - gold_relations:
+            return "spurious_relation"
+        return "other"
+    gold_labels, pred_labels = _parse_labeled(gold), _parse_labeled(pred)
+    if gold_labels is not None and pred_labels is not None:
+        if set(gold_labels) - set(pred_labels):
+            return "missing_entity"
+        if set(pred_labels) - set(gold_labels):
+            return "spurious_entity"
+        return "wrong_label"
+    if isinstance(gold, str) and isinstance(pred, str):
+        return "wrong_label"
+    return "other"
+
+def _error_text(error):
+    inp, gold, pred = error
+    return f"{inp} || gold: {gold} || prediction: {pred}"
+
+def _confusion(error):
+    """The label confusion of an error: (gold label, predicted label) pairs, entity names dropped."""
+    _, gold, pred = error
+    gold_labels, pred_labels = _parse_labeled(gold), _parse_labeled(pred)
+    if gold_labels is None or pred_labels is None:
+        return ()
+    names = set(gold_labels) | set(pred_labels)
+    return tuple(sorted({(gold_labels.get(n), pred_labels.get(n)) for n in names
+                         if gold_labels.get(n) != pred_labels.get(n)}, key=repr))
+
+def bucket_errors(errors):
+    """{failure_type: [bucket, ...]}, errors with the same label confusion in one bucket, in input order."""
+    groups = {}
+    for error in errors:
+        buckets = groups.setdefault(classify_failure(error), {})
+        buckets.setdefault(_confusion(error), []).append(error)
+    return {failure_type: list(buckets.values()) for failure_type, buckets in groups.items()}
+
+def cluster_errors(errors, clusters_per_type=3, seed=0):
+    """
+    {failure_type: [cluster, ...]}, each cluster a list of errors ordered from the
+    most to the least central.
+    """
+    groups = {}
+    for error in errors:
+        groups.setdefault(classify_failure(error), []).append(error)
+    clustered = {}
+    for failure_type, group in groups.items():
+        k = min(clusters_per_type, len(group))
+        if k <= 1:
+            clustered[failure_type] = [group]
+            continue
+        from sklearn.cluster import KMeans
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        features = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), max_features=4096).fit_transform(
+            [_error_text(e) for e in group])
+        with warnings.catch_warnings():
+            # Fewer distinct errors than clusters is fine here
+            warnings.simplefilter("ignore")
+            kmeans = KMeans(n_clusters=k, n_init=1, random_state=seed).fit(features)
+        distances = kmeans.transform(features).min(axis=1)
+        clusters = {}
+        for i in sorted(range(len(group)), key=lambda i: distances[i]):
+            clusters.setdefault(int(kmeans.labels_[i]), []).append(group[i])
+        clustered[failure_type] = list(clusters.values())
+    return clustered
+
+def _truncated(error, token_budget):
+    """The error with its input shortened until it fits the budget (or is empty)."""
+    inp, gold, pred = error
+    text = str(inp)
+    while text and _estimate_tokens(_error_text((text + "...", gold, pred))) > token_budget:
+        text = text[:len(text) // 2]
+    return (text + "...", gold, pred)
+
+def summarize_errors(errors, token_budget=2000, clusters_per_type=3, max_examples=None, seed=0,
+                     method="buckets"):
+    """
+    Pick representative errors under `token_budget` (and at most `max_examples`).
+    method: "buckets" (label confusion, cheap) or "kmeans" (TF-IDF clusters).
+    Groups are visited round-robin, largest first, so every failure mode gets an
+    example before any gets a second one. If not even one error fits the budget,
+    the first is returned with its input truncated.
+    """
+    if not errors:
+        return []
+    if method == "buckets":
+        grouped = bucket_errors(errors)
+    elif method == "kmeans":
+        grouped = cluster_errors(errors, clusters_per_type, seed)
+    else:
+        raise ValueError(f"Unknown summarization method: {method}")
+    clusters = [c for group in grouped.values() for c in group]
+    clusters.sort(key=len, reverse=True)
+    selected, remaining = [], token_budget
+    depth = 0
+    while any(depth < len(c) for c in clusters):
+        for cluster in clusters:
+            if depth >= len(cluster) or (max_examples is not None and len(selected) >= max_examples):
+                continue
+            cost = _estimate_tokens(_error_text(cluster[depth]))
+            if cost <= remaining:
+                selected.append(cluster[depth])
+                remaining -= cost
+        depth += 1
+    if not selected and max_examples != 0:
+        selected.append(_truncated(clusters[0][0], token_budget))
+    return selected
@@ -1,9 +1,36 @@
+import math
+from statistics import NormalDist
+
+from ..adapters.base import ModelAdapter
+
+
+def example_input(example):
+    return example[0] if isinstance(example, tuple) else example
+
+def example_gold(example):
+    # (input, gold) for classification-style data, (input, entities, relations) for SciERC
+    return example[1] if len(example) == 2 else tuple(example[1:])
+
+
+def generate_all(adapter, prompts):
+    """
+    Run every prompt through the adapter, in order.
+    ModelAdapter subclasses go through `batch_generate` so they can batch or run
+    requests concurrently; anything else (e.g. a bare mock) is called one prompt at a time.
+    """
+    if isinstance(adapter, ModelAdapter):
+        return adapter.batch_generate(prompts)
+    return [adapter.generate(p) for p in prompts]
+
 def evaluate_prompt(prompt, batch, adapter):
     """
     Given a prompt, batch of inputs, and an adapter, return predictions.
     batch: list of input strings (for SciERC, abstracts)
     """
-    return [adapter.generate(prompt + " " + x) for x in batch]
+    if isinstance(adapter, ModelAdapter):
+        # Every input shares the prompt as a prefix, which some adapters can cache
+        return adapter.batch_generate_with_prefix(prompt, list(batch))
+    return generate_all(adapter, [prompt + " " + x for x in batch])
 
 def collect_errors(predictions, golds, batch):
     errors = []
@@ -15,4 +42,66 @@ def collect_errors(predictions, golds, batch):
             inp_str = inp
         if pred != gold:
             errors.append((inp_str, gold, pred))
-    return errors
\ No newline at end of file
+    return errors
+
+def iter_evaluate(prompt, batch, adapter, chunk_size=16):
+    """
+    Stream the evaluation of a prompt over a batch of (input, gold) examples.
+    The batch is sent to the adapter `chunk_size` examples at a time and
+    (input, gold, prediction, correct) is yielded as each chunk comes back,
+    so a consumer that stops iterating stops paying for model calls.
+    """
+    for start in range(0, len(batch), chunk_size):
+        chunk = batch[start:start + chunk_size]
+        preds = evaluate_prompt(prompt, [example_input(x) for x in chunk], adapter)
+        for example, pred in zip(chunk, preds):
+            gold = example_gold(example)
+            yield example_input(example), gold, pred, pred == gold
+
+def wilson_interval(successes, n, confidence=0.95):
+    """Wilson score interval for a binomial proportion; (0, 1) when n == 0."""
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+def sequential_evaluate(prompt, batch, adapter, incumbent=None, max_errors=None,
+                        confidence=0.95, min_examples=10, chunk_size=16):
+    """
+    Evaluate a prompt with early stopping. Stops once the upper confidence bound of its
+    running accuracy falls below the lower bound of `incumbent` (the incumbent prompt's
+    sequential_evaluate result) after `min_examples`, i.e. once the intervals separate,
+    or once it has made `max_errors` errors.
+    Returns {"accuracy", "lower", "upper", "n_evaluated", "errors", "stopped_early", "calls_saved"};
+    stopped_early is None, "worse_than_incumbent" or "max_errors".
+    """
+    correct, n, errors, stopped_early = 0, 0, [], None
+    for inp, gold, pred, is_correct in iter_evaluate(prompt, batch, adapter, chunk_size):
+        n += 1
+        if is_correct:
+            correct += 1
+        else:
+            errors.append((inp, gold, pred))
+        if max_errors is not None and len(errors) >= max_errors:
+            stopped_early = "max_errors"
+            break
+        if incumbent is not None and n >= min_examples:
+            if wilson_interval(correct, n, confidence)[1] < incumbent["lower"]:
+                stopped_early = "worse_than_incumbent"
+                break
+    lower, upper = wilson_interval(correct, n, confidence)
+    # Calls are made a whole chunk at a time
+    calls_made = min(len(batch), math.ceil(n / chunk_size) * chunk_size)
+    return {
+        "accuracy": correct / n if n else 0.0,
+        "lower": lower,
+        "upper": upper,
+        "n_evaluated": n,
+        "errors": errors,
+        "stopped_early": stopped_early,
+        "calls_saved": len(batch) - calls_made,
+    }
@@ -0,0 +1,127 @@
+"""
+Incremental entity/relation metrics for SciERC-style predictions.
+
+Entities (strings) and relations (triples) are interned to integer IDs, and each
+minibatch is scored with NumPy set operations on (example, id) keys, so a whole
+batch costs a handful of vectorized calls. Only running counts are kept between
+updates, never the predictions themselves.
+"""
+
+import numpy as np
+
+# Keys pack (example index, item id) into one int64: example << 32 | id
+_ID_BITS = 32
+
+
+class Interner:
+    """Maps hashable items (entity strings, relation triples) to dense integer IDs."""
+
+    def __init__(self):
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def intern(self, item):
+        return self.ids.setdefault(item, len(self.ids))
+
+    def clear(self):
+        self.ids.clear()
+
+
+class SetOverlapCounter:
+    """Running micro and macro precision/recall/F1 for predicted vs. gold sets."""
+
+    def __init__(self, interner=None):
+        self.interner = interner or Interner()
+        self.tp = self.n_pred = self.n_gold = 0
+        self.n_examples = 0
+        self._macro = np.zeros(3)  # summed per-example precision, recall, F1
+
+    def _keys(self, item_sets):
+        examples, ids = [], []
+        for i, items in enumerate(item_sets):
+            for item in items:
+                examples.append(i)
+                ids.append(self.interner.intern(item))
+        keys = (np.asarray(examples, dtype=np.int64) << _ID_BITS) | np.asarray(ids, dtype=np.int64)
+        # Duplicates within one example count once
+        return np.unique(keys)
+
+    def update(self, predicted, gold):
+        """predicted, gold: one iterable of items per example."""
+        n = len(gold)
+        if n == 0:
+            return
+        pred_keys, gold_keys = self._keys(predicted), self._keys(gold)
+        # IDs are only compared within one update, so the table never outgrows a minibatch
+        self.interner.clear()
+        common = np.intersect1d(pred_keys, gold_keys, assume_unique=True)
+        tp = np.bincount(common >> _ID_BITS, minlength=n)
+        n_pred = np.bincount(pred_keys >> _ID_BITS, minlength=n)
+        n_gold = np.bincount(gold_keys >> _ID_BITS, minlength=n)
+        self.tp += int(tp.sum())
+        self.n_pred += int(n_pred.sum())
+        self.n_gold += int(n_gold.sum())
+        self.n_examples += n
+        # An example with nothing predicted and nothing to find is a perfect score
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(n_pred > 0, tp / n_pred, (n_gold == 0).astype(float))
+            recall = np.where(n_gold > 0, tp / n_gold, (n_pred == 0).astype(float))
+            f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        self._macro += [precision.sum(), recall.sum(), f1.sum()]
+
+    def micro(self):
+        precision = self.tp / self.n_pred if self.n_pred else 0.0
+        recall = self.tp / self.n_gold if self.n_gold else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return precision, recall, f1
+
+    def macro(self):
+        if not self.n_examples:
+            return 0.0, 0.0, 0.0
+        return tuple(float(v) for v in self._macro / self.n_examples)
+
+
+class EntityRelationMetrics:
+    """
+    Accumulates entity and relation P/R/F1 over streamed minibatches.
+    predictions/golds: one (entities, relations) pair per example.
+    """
+
+    def __init__(self):
+        self.entities = SetOverlapCounter()
+        self.relations = SetOverlapCounter()
+
+    def update(self, predictions, golds):
+        self.entities.update([p[0] for p in predictions], [g[0] for g in golds])
+        self.relations.update([tuple(map(tuple, p[1])) for p in predictions],
+                              [tuple(map(tuple, g[1])) for g in golds])
+        return self
+
+    def compute(self):
+        metrics = {"n_examples": self.entities.n_examples}
+        for name, counter in (("entity", self.entities), ("relation", self.relations)):
+            for prefix, values in (("", counter.micro()), ("macro_", counter.macro())):
+                precision, recall, f1 = values
+                metrics[f"{prefix}{name}_precision"] = precision
+                metrics[f"{prefix}{name}_recall"] = recall
+                metrics[f"{prefix}{name}_f1"] = f1
+        return metrics
+
+def _difference(items, other):
+    other = set(other)
+    # Keep the original order; [""] marks an example with nothing to report
+    return [item for item in dict.fromkeys(items) if item not in other] or [""]
+
+def entity_relation_errors(predictions, golds):
+    """Per-example missing and spurious entities/relations."""
+    report = {"missing_entities": [], "spurious_entities": [], "missing_relations": [], "spurious_relations": []}
+    for (pred_entities, pred_relations), (gold_entities, gold_relations) in zip(predictions, golds):
+        pred_relations = [tuple(r) for r in pred_relations]
+        gold_relations = [tuple(r) for r in gold_relations]
+        report["missing_entities"].append(_difference(gold_entities, pred_entities))
+        report["spurious_entities"].append(_difference(pred_entities, gold_entities))
+        report["missing_relations"].append(_difference(gold_relations, pred_relations))
+        report["spurious_relations"].append(_difference(pred_relations, gold_relations))
+    return report
@@ -1,31 +1,325 @@
+from ..adapters.scheduling_adapter import SchedulingAdapter
+from .budget import BudgetExceededError
+from .candidate_index import CandidateIndex
+from .error_clustering import summarize_errors
+from .evaluation import (evaluate_prompt, collect_errors, example_input, example_gold, sequential_evaluate,
+                         wilson_interval)
+from .metrics import EntityRelationMetrics, entity_relation_errors
+from .selection import successive_halving, ucb
+from .tracing import get_tracer
+
+
+def _str_list(value):
+    """Keep only the strings from an adapter result (a string, a list, or anything else)."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if isinstance(v, str)]
+    return []
+
 class PromptOptimizer:
-    def __init__(self, model_adapter):
+    def __init__(self, model_adapter, eval_budget=None, selection="successive_halving",
+                 num_candidates=4, seed=0, run_state=None, max_gradient_errors=16,
+                 gradient_token_budget=2000, dedup_threshold=0.9, budget=None, min_minibatch=4,
+                 cluster_errors=False):
+        """
+        eval_budget: max model calls spent scoring candidates in one beam_search_step
+            (default: the cost of scoring every candidate on the whole batch once).
+        selection: "successive_halving" or "ucb".
+        num_candidates: max edited prompts generated per beam prompt.
+        run_state: optional RunStateStore; recorded evaluations and feedback are reused
+            instead of calling the model again, `run` resumes after the last step, and the
+            scores of earlier candidates and the budget spent are restored from it.
+        max_gradient_errors, gradient_token_budget: when there are more errors than
+            max_gradient_errors, only representatives (one per label confusion first)
+            within the token budget are sent to generate_gradient.
+        cluster_errors: pick the representatives from TF-IDF + KMeans clusters instead
+            (needs scikit-learn, and is much slower than the label buckets).
+        dedup_threshold: candidates at least this similar (estimated character n-gram
+            Jaccard) to another candidate of the step, or to a prompt already scored in an
+            earlier step, are not evaluated again; None disables deduplication.
+        budget: optional TokenBudget for the whole run. The adapter is wrapped in a
+            SchedulingAdapter (unless it already is one) so every call is counted; `run`
+            shrinks minibatches (down to min_minibatch) as the budget runs low and stops
+            with the current beam once it is spent.
+        """
+        if selection not in ("successive_halving", "ucb"):
+            raise ValueError(f"Unknown selection strategy: {selection}")
+        if budget is not None and not isinstance(model_adapter, SchedulingAdapter):
+            model_adapter = SchedulingAdapter(model_adapter, budget=budget)
         self.adapter = model_adapter
+        self.budget = budget
+        self.min_minibatch = min_minibatch
+        self.eval_budget = eval_budget
+        self.selection = selection
+        self.num_candidates = num_candidates
+        self.seed = seed
+        self.run_state = run_state
+        self.max_gradient_errors = max_gradient_errors
+        self.gradient_token_budget = gradient_token_budget
+        self.cluster_errors = cluster_errors
+        self.dedup_threshold = dedup_threshold
+        # Every prompt scored during the run, with its mean score
+        self.candidate_index = CandidateIndex(dedup_threshold) if dedup_threshold is not None else None
+        self._step = None
+        # Predictions made in the current beam_search_step, per prompt and input
+        self._predictions = None
+        if run_state is not None:
+            self._restore(run_state)
+
+    def _restore(self, run_state):
+        """Resume the candidate scores and the budget spent from the recorded steps."""
+        steps = run_state.steps()
+        if self.candidate_index is not None:
+            for record in steps:
+                self._index_scores(record["ranking"])
+        if self.budget is not None and steps and "spend" in steps[-1]:
+            self.budget.spent.update(steps[-1]["spend"])
+
+    def _index_scores(self, ranking):
+        # Candidates the bandit never evaluated have no score yet and may come back later
+        if self.candidate_index is not None:
+            for candidate, mean, n_evaluations in ranking:
+                if n_evaluations:
+                    self.candidate_index.add(candidate, mean)
 
     def optimize_step(self, prompt, batch):
         """
         One optimization step: evaluate, collect errors, get feedback, edit prompt.
+        When the adapter suggests several edits, the most accurate on the batch is returned;
+        edits are evaluated with early stopping, so clearly worse ones cost fewer calls.
         batch: list of (input, gold_label)
         """
-        inputs = [x[0] for x in batch]
-        golds = [x[1] for x in batch]
-        # 1. Run prompt on batch
-        preds = [self.adapter.generate(prompt + " " + inp) for inp in inputs]
-        # 2. Collect errors
-        errors = []
-        for inp, gold, pred in zip(inputs, golds, preds):
-            if pred != gold:
-                errors.append((inp, gold, pred))
-        # 3. Get gradient feedback from adapter
-        if hasattr(self.adapter, "generate_gradient"):
-            feedback = self.adapter.generate_gradient(prompt, errors)
-        else:
-            feedback = ["Improve the prompt."]
-        # 4. Edit prompt using feedback
-        if hasattr(self.adapter, "edit_prompt"):
-            new_prompts = self.adapter.edit_prompt(prompt, feedback[0])
-        else:
-            # Fallback: just append feedback
-            new_prompts = [prompt + " " + feedback[0]]
-        # 5. Return first new prompt
-        return new_prompts[0]
\ No newline at end of file
+        tracer = get_tracer()
+        with tracer.span("optimize_step", batch_size=len(batch)):
+            inputs = [x[0] for x in batch]
+            golds = [x[1] for x in batch]
+            # 1. Run prompt on batch
+            with tracer.span("optimize_step.run"):
+                preds = evaluate_prompt(prompt, inputs, self.adapter)
+            # 2. Collect errors
+            with tracer.span("optimize_step.collect_errors") as span:
+                errors = []
+                for inp, gold, pred in zip(inputs, golds, preds):
+                    if pred != gold:
+                        errors.append((inp, gold, pred))
+                span.set(n_errors=len(errors))
+                n_correct = len(batch) - len(errors)
+            # 3. Get gradient feedback from adapter
+            with tracer.span("optimize_step.gradient") as span:
+                errors = self.summarize_errors(errors)
+                span.set(n_gradient_errors=len(errors))
+                if hasattr(self.adapter, "generate_gradient"):
+                    feedback = self.adapter.generate_gradient(prompt, errors)
+                else:
+                    feedback = ["Improve the prompt."]
+            # 4. Edit prompt using feedback
+            with tracer.span("optimize_step.edit"):
+                if not feedback:
+                    # No gradient (e.g. an empty model reply): nothing to edit
+                    return prompt
+                if hasattr(self.adapter, "edit_prompt"):
+                    new_prompts = self.adapter.edit_prompt(prompt, feedback[0])
+                else:
+                    # Fallback: just append feedback
+                    new_prompts = [prompt + " " + feedback[0]]
+            # 5. Return the edit that scores best on the batch (a single edit needs no scoring)
+            with tracer.span("optimize_step.select") as span:
+                if not new_prompts:
+                    return prompt
+                if len(new_prompts) == 1:
+                    return new_prompts[0]
+                # An edit stops being evaluated once it is clearly worse than the best
+                # prompt so far, starting with the current one
+                incumbent = {"lower": wilson_interval(n_correct, len(batch))[0]}
+                best, best_result, calls_saved = None, None, 0
+                for candidate in new_prompts:
+                    result = sequential_evaluate(candidate, batch, self.adapter, incumbent=incumbent)
+                    calls_saved += result["calls_saved"]
+                    if best_result is None or result["accuracy"] > best_result["accuracy"]:
+                        best, best_result = candidate, result
+                    if result["stopped_early"] is None and result["lower"] > incumbent["lower"]:
+                        incumbent = result
+                span.set(n_candidates=len(new_prompts), best_accuracy=best_result["accuracy"],
+                         calls_saved=calls_saved)
+                return best
+
+    def summarize_errors(self, errors):
+        """Representative errors for the gradient prompt (all of them if there are few)."""
+        if len(errors) <= self.max_gradient_errors:
+            return errors
+        return summarize_errors(errors, token_budget=self.gradient_token_budget,
+                                max_examples=self.max_gradient_errors, seed=self.seed,
+                                method="kmeans" if self.cluster_errors else "buckets")
+
+    def batch_inference(self, prompt, batch):
+        """
+        Run the prompt on every example of the batch and return the raw predictions.
+        Predictions already made in the current beam_search_step (e.g. when finding a
+        beam prompt's errors) or recorded in the run_state are reused.
+        """
+        known = self._predictions.setdefault(prompt, {}) if self._predictions is not None else {}
+        missing = [i for i, x in enumerate(batch) if example_input(x) not in known]
+        if self.run_state is not None:
+            records = [self.run_state.get_evaluation(prompt, batch[i]) for i in missing]
+            for i, record in zip(missing, records):
+                if record is not None:
+                    known[example_input(batch[i])] = record["prediction"]
+            missing = [i for i, record in zip(missing, records) if record is None]
+        if missing:
+            new_preds = evaluate_prompt(prompt, [example_input(batch[i]) for i in missing], self.adapter)
+            for i, pred in zip(missing, new_preds):
+                known[example_input(batch[i])] = pred
+                if self.run_state is not None:
+                    score = 1.0 if pred == example_gold(batch[i]) else 0.0
+                    self.run_state.record_evaluation(prompt, batch[i], pred, score, step=self._step)
+        return [known[example_input(x)] for x in batch]
+
+    def compute_gradient_feedback(self, prompt, batch):
+        """
+        Evaluate the prompt, ask the adapter for textual gradients on the errors and
+        turn each gradient into edited prompts.
+        Returns {"errors": [...], "gradients": [...], "suggested_edits": [...]}.
+        """
+        preds = self.batch_inference(prompt, batch)
+        errors = collect_errors(preds, [example_gold(x) for x in batch], batch)
+        recorded = self.run_state.get_feedback(prompt, batch) if self.run_state is not None else None
+        if recorded is not None:
+            return {"errors": errors, "gradients": recorded["gradients"],
+                    "suggested_edits": recorded["suggested_edits"]}
+        gradients = _str_list(self.adapter.generate_gradient(prompt, self.summarize_errors(errors))) if errors else []
+        suggested_edits = []
+        for gradient in gradients:
+            for edit in _str_list(self.adapter.edit_prompt(prompt, gradient)):
+                if edit not in suggested_edits:
+                    suggested_edits.append(edit)
+        if self.run_state is not None:
+            self.run_state.record_feedback(prompt, batch, gradients, suggested_edits, step=self._step)
+        return {"errors": errors, "gradients": gradients, "suggested_edits": suggested_edits}
+
+    def generate_prompt_candidates(self, prompt, batch=None):
+        """
+        Expand a prompt into candidates: the prompt itself plus up to `num_candidates`
+        edits suggested from its errors on `batch` (no batch, no errors to learn from).
+        """
+        candidates = [prompt]
+        if batch:
+            for edit in self.compute_gradient_feedback(prompt, batch)["suggested_edits"]:
+                if len(candidates) > self.num_candidates:
+                    break
+                if edit not in candidates:
+                    candidates.append(edit)
+        return candidates
+
+    def dedupe_candidates(self, candidates, beam=()):
+        """
+        Drop near-duplicate candidates: variants of an earlier candidate in the list, and
+        prompts close to one scored in an earlier step (its score is already known and
+        it did not make the beam). Prompts in `beam` are always kept.
+        """
+        if self.candidate_index is None:
+            return list(candidates)
+        seen = CandidateIndex(self.dedup_threshold)
+        kept = []
+        for candidate in candidates:
+            if candidate not in beam:
+                if seen.lookup(candidate) is not None:
+                    continue
+                match = self.candidate_index.lookup(candidate)
+                if match is not None and match[2] is not None:
+                    continue
+            seen.add(candidate)
+            kept.append(candidate)
+        return kept
+
+    def score_examples(self, prompt, examples):
+        """One model call per example; 1.0 for an exact match with the gold answer, else 0.0."""
+        preds = self.batch_inference(prompt, examples)
+        return [1.0 if pred == example_gold(x) else 0.0 for pred, x in zip(preds, examples)]
+
+    def select_candidates(self, candidates, batch, beam_width=3, budget=None):
+        """
+        Rank candidates with a best-arm-identification bandit instead of scoring
+        every candidate on every example. Returns [(candidate, mean_score, n_evaluations)].
+        """
+        if budget is None:
+            budget = self.eval_budget or len(candidates) * len(batch)
+        if self.selection == "ucb":
+            return ucb(candidates, batch, self.score_examples, budget, seed=self.seed)
+        return successive_halving(candidates, batch, self.score_examples, budget,
+                                  keep=beam_width, seed=self.seed)
+
+    def beam_search_step(self, prompt, batch, beam_width=3, budget=None, step=None):
+        """
+        One ProTeGi beam search step: expand the beam (a prompt or list of prompts)
+        into candidates, select among them and return the best `beam_width` prompts.
+        With a run_state, the step is recorded under `step` (default: the next step number)
+        once it completes.
+        """
+        if step is None and self.run_state is not None:
+            last = self.run_state.last_step()
+            step = last["step"] + 1 if last is not None else 0
+        self._step = step
+        self._predictions = {}
+        tracer = get_tracer()
+        with tracer.span("beam_search_step", step=step, batch_size=len(batch)) as span:
+            beam = [prompt] if isinstance(prompt, str) else list(prompt)
+            candidates = []
+            with tracer.span("beam_search_step.expand") as expand_span:
+                for p in beam:
+                    for candidate in self.generate_prompt_candidates(p, batch):
+                        if candidate not in candidates:
+                            candidates.append(candidate)
+                generated = len(candidates)
+                candidates = self.dedupe_candidates(candidates, beam)
+                expand_span.set(n_candidates=len(candidates), n_duplicates=generated - len(candidates))
+            with tracer.span("beam_search_step.select"):
+                ranking = self.select_candidates(candidates, batch, beam_width=beam_width, budget=budget)
+            self._index_scores(ranking)
+            if self.budget is not None:
+                span.set(**{"budget." + k: v for k, v in self.budget.report().items() if v is not None})
+        self._predictions = None
+        new_beam = [candidate for candidate, _, _ in ranking[:beam_width]]
+        if self.run_state is not None:
+            self.run_state.record_step(step, new_beam, candidates, ranking,
+                                       spend=self.budget.spent if self.budget is not None else None)
+        return new_beam
+
+    def run(self, prompt, batch, num_steps, beam_width=3, budget=None, start=0, on_step=None):
+        """
+        Multi-step beam search from `prompt` (a prompt or a beam) over steps start..num_steps-1.
+        `batch` is a list of examples or a callable step -> batch. on_step(step, beam) is
+        called after each completed step. With a run_state, resumes from the beam of the
+        last completed step. With a budget, stops early (returning the last completed beam)
+        once it is spent.
+        """
+        beam = [prompt] if isinstance(prompt, str) else list(prompt)
+        last = self.run_state.last_step() if self.run_state is not None else None
+        if last is not None:
+            beam, start = last["beam"], last["step"] + 1
+        for step in range(start, num_steps):
+            step_batch = batch(step) if callable(batch) else batch
+            if self.budget is not None:
+                if self.budget.exhausted:
+                    break
+                step_batch = step_batch[:self.budget.minibatch_size(len(step_batch), self.min_minibatch)]
+            try:
+                beam = self.beam_search_step(beam, step_batch, beam_width=beam_width, budget=budget, step=step)
+            except BudgetExceededError:
+                break
+            if on_step is not None:
+                on_step(step, beam)
+        return beam
+
+    def evaluate_entity_relation(self, predictions, golds):
+        """
+        Entity and relation precision/recall/F1 (micro, plus macro_ variants).
+        predictions/golds: one (entities, relations) pair per example.
+        """
+        return EntityRelationMetrics().update(predictions, golds).compute()
+
+    def analyze_errors(self, predictions, golds):
+        """Missing/spurious entities and relations per example, plus the overall metrics."""
+        report = entity_relation_errors(predictions, golds)
+        report["metrics"] = self.evaluate_entity_relation(predictions, golds)
+        return report
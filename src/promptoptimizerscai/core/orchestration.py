@@ -0,0 +1,149 @@
+"""
+LangGraph orchestration of prompt evaluation across tasks.
+
+    DetectContext -> RouteToOptimizer -> {SciERC, SciFact, GeneralNLP}_EvaluatePrompt -> OutputBestPrompt
+
+Evaluation nodes are async: each scores the prompt candidates on its task concurrently,
+through the adapter's own `abatch_generate` if its class defines one and otherwise on a
+worker thread.
+Modes:
+- "route":      only the evaluator matching the detected context runs
+- "parallel":   every evaluator runs in the same graph step (fan-out) and results merge
+- "sequential": evaluators run one after another (the baseline for benchmarks)
+Each evaluation node is bounded by `node_timeout` seconds; a node that times out reports
+{"timed_out": True} and OutputBestPrompt decides on the evaluators that finished.
+"""
+
+import asyncio
+import operator
+from typing import Annotated, TypedDict
+
+from .evaluation import evaluate_prompt, example_gold, example_input
+
+MODES = ("route", "parallel", "sequential")
+# Context keyword -> evaluator name, checked in order; anything else is GeneralNLP
+CONTEXT_KEYWORDS = (("entity", "SciERC"), ("relation", "SciERC"), ("fact", "SciFact"), ("claim", "SciFact"))
+DEFAULT_CONTEXT = "GeneralNLP"
+
+
+def _merge(left, right):
+    return {**(left or {}), **(right or {})}
+
+
+class OrchestrationState(TypedDict, total=False):
+    prompt: str
+    candidates: list
+    context: str
+    trace: Annotated[list, operator.add]
+    # evaluator name -> {"scores": {candidate: score}, ...}, merged across parallel nodes
+    results: Annotated[dict, _merge]
+    final_prompt: str
+    final_score: float
+
+
+class TaskEvaluator:
+    """Scores prompts on one task's (input, gold) examples; score_fn(pred, gold) defaults to exact match."""
+
+    def __init__(self, adapter, examples, score_fn=None):
+        self.adapter = adapter
+        self.examples = list(examples)
+        self.score_fn = score_fn or (lambda pred, gold: 1.0 if pred == gold else 0.0)
+
+    async def predict(self, prompt):
+        inputs = [example_input(x) for x in self.examples]
+        # Looked up on the class: wrappers (caching, budgets, tracing, ...) forward unknown
+        # attributes to the adapter they wrap, and calling its coroutine would bypass them
+        if asyncio.iscoroutinefunction(getattr(type(self.adapter), "abatch_generate", None)):
+            return await self.adapter.abatch_generate([prompt + " " + x for x in inputs])
+        return await asyncio.to_thread(evaluate_prompt, prompt, inputs, self.adapter)
+
+    async def score(self, prompt):
+        preds = await self.predict(prompt)
+        scores = [self.score_fn(pred, example_gold(x)) for pred, x in zip(preds, self.examples)]
+        return sum(scores) / len(scores) if scores else 0.0
+
+    async def evaluate(self, candidates):
+        """{candidate: score}, all candidates scored concurrently."""
+        scores = await asyncio.gather(*(self.score(c) for c in candidates))
+        return dict(zip(candidates, scores))
+
+
+def detect_context(prompt, evaluators):
+    lowered = prompt.lower()
+    for keyword, name in CONTEXT_KEYWORDS:
+        if keyword in lowered and name in evaluators:
+            return name
+    return DEFAULT_CONTEXT if DEFAULT_CONTEXT in evaluators else next(iter(evaluators))
+
+def _node_name(name):
+    return f"{name}_EvaluatePrompt"
+
+def _evaluate_node(name, evaluator, node_timeout):
+    async def node(state):
+        candidates = state.get("candidates") or [state["prompt"]]
+        try:
+            scores = await asyncio.wait_for(evaluator.evaluate(candidates), node_timeout)
+            result = {"scores": scores, "timed_out": False}
+        except asyncio.TimeoutError:
+            # A worker thread already running can't be interrupted; its result is dropped
+            result = {"scores": {}, "timed_out": True}
+        return {"trace": [_node_name(name)], "results": {name: result}}
+    return node
+
+def output_best_prompt(state):
+    """Pick the candidate with the best mean score over the evaluators that finished."""
+    candidates = state.get("candidates") or [state["prompt"]]
+    finished = [r["scores"] for r in state.get("results", {}).values() if not r["timed_out"]]
+    if not finished:
+        return {"trace": ["OutputBestPrompt"], "final_prompt": state["prompt"], "final_score": None}
+    means = {c: sum(s[c] for s in finished) / len(finished) for c in candidates}
+    best = max(candidates, key=lambda c: means[c])
+    return {"trace": ["OutputBestPrompt"], "final_prompt": best, "final_score": means[best]}
+
+def build_orchestration_graph(evaluators, mode="parallel", node_timeout=None):
+    """
+    Compile the orchestration graph.
+    evaluators: {name: TaskEvaluator}, e.g. {"SciERC": ..., "SciFact": ..., "GeneralNLP": ...}.
+    node_timeout: seconds per evaluation node (None: no limit).
+    """
+    from langgraph.graph import END, StateGraph
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown orchestration mode: {mode}")
+    if not evaluators:
+        raise ValueError("At least one evaluator is required")
+    names = list(evaluators)
+    builder = StateGraph(OrchestrationState)
+    builder.add_node("DetectContext", lambda state: {
+        "context": detect_context(state["prompt"], evaluators), "trace": ["DetectContext"]})
+    builder.add_node("RouteToOptimizer", lambda state: {"trace": ["RouteToOptimizer"]})
+    for name in names:
+        builder.add_node(_node_name(name), _evaluate_node(name, evaluators[name], node_timeout))
+    builder.add_node("OutputBestPrompt", output_best_prompt)
+
+    builder.set_entry_point("DetectContext")
+    builder.add_edge("DetectContext", "RouteToOptimizer")
+    if mode == "sequential":
+        chain = ["RouteToOptimizer"] + [_node_name(n) for n in names] + ["OutputBestPrompt"]
+        for source, target in zip(chain, chain[1:]):
+            builder.add_edge(source, target)
+    else:
+        if mode == "route":
+            router = lambda state: _node_name(state["context"])
+        else:
+            router = lambda state: [_node_name(n) for n in names]
+        builder.add_conditional_edges("RouteToOptimizer", router, [_node_name(n) for n in names])
+        for name in names:
+            builder.add_edge(_node_name(name), "OutputBestPrompt")
+    builder.add_edge("OutputBestPrompt", END)
+    return builder.compile()
+
+async def arun_orchestration(graph, prompt, candidates=None):
+    """Run the graph; returns the final state (final_prompt, final_score, results, trace)."""
+    state = {"prompt": prompt, "trace": [], "results": {}}
+    if candidates:
+        state["candidates"] = list(candidates)
+    return await graph.ainvoke(state)
+
+def run_orchestration(graph, prompt, candidates=None):
+    return asyncio.run(arun_orchestration(graph, prompt, candidates))
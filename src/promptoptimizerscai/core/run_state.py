@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+
+
+def content_key(value):
+    """Stable short hash of a JSON-serializable value (tuples hash like lists)."""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+
+class RunStateStore:
+    """
+    Append-only JSONL log of an optimization run, so a crashed or preempted run can resume.
+
+    Record types:
+      evaluation: one prompt's prediction and score on one example
+      feedback:   gradients and suggested edits computed for a prompt on a batch
+      step:       a completed beam search step (candidates, ranking, new beam, budget spent)
+    The whole log is replayed into in-memory indexes on open; a line cut short by a
+    crash is dropped from the file. Step records are fsynced, other records only flushed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._evaluations = {}
+        self._feedback = {}
+        self._steps = []
+        if os.path.exists(path):
+            self._replay()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _replay(self):
+        complete = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partial last line from an interrupted write
+                    break
+                complete += len(line)
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._index(record)
+        # Cut the partial line off so the next record starts on a line of its own
+        if complete < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(complete)
+
+    def _index(self, record):
+        kind = record.get("type")
+        if kind == "evaluation":
+            self._evaluations[(record["prompt_key"], record["example_key"])] = record
+        elif kind == "feedback":
+            self._feedback[(record["prompt_key"], record["batch_key"])] = record
+        elif kind == "step":
+            self._steps.append(record)
+
+    def _append(self, record, sync=False):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=repr) + "\n")
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+        self._index(record)
+
+    def get_evaluation(self, prompt, example):
+        """The recorded evaluation record for (prompt, example), or None."""
+        return self._evaluations.get((content_key(prompt), content_key(example)))
+
+    def record_evaluation(self, prompt, example, prediction, score=None, step=None):
+        self._append({
+            "type": "evaluation", "step": step,
+            "prompt_key": content_key(prompt), "example_key": content_key(example),
+            "prediction": prediction, "score": score,
+        })
+
+    def get_feedback(self, prompt, batch):
+        return self._feedback.get((content_key(prompt), content_key(batch)))
+
+    def record_feedback(self, prompt, batch, gradients, suggested_edits, step=None):
+        self._append({
+            "type": "feedback", "step": step, "prompt": prompt,
+            "prompt_key": content_key(prompt), "batch_key": content_key(batch),
+            "gradients": gradients, "suggested_edits": suggested_edits,
+        })
+
+    def record_step(self, step, beam, candidates, ranking, spend=None):
+        """
+        ranking: [(candidate, mean_score, n_evaluations)] as returned by the selectors.
+        spend: the run's TokenBudget.spent after the step, if it has a budget.
+        """
+        record = {
+            "type": "step", "step": step, "beam": beam, "candidates": candidates,
+            "ranking": [list(r) for r in ranking],
+        }
+        if spend is not None:
+            record["spend"] = dict(spend)
+        self._append(record, sync=True)
+
+    def last_step(self):
+        """The last completed step record, or None for a fresh run."""
+        return self._steps[-1] if self._steps else None
+
+    def steps(self):
+        """Every completed step record, oldest first."""
+        return list(self._steps)
+
+    def close(self):
+        self._file.close()
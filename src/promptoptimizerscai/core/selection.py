@@ -0,0 +1,85 @@
+"""
+Best-arm identification for choosing among candidate prompts (ProTeGi, Sec. 2.2).
+
+Each candidate is an arm; pulling it means scoring it on a few more examples.
+`score_fn(candidate, examples)` returns one score in [0, 1] per example, and both
+selectors take a `budget` of example evaluations (model calls) to spend in total.
+All arms see the examples in the same shuffled order, so they are compared on the
+same data. The result is a ranking of (candidate, mean_score, n_evaluations),
+best first.
+"""
+
+import math
+import random
+
+
+def _mean(totals, pulls, i):
+    return totals[i] / pulls[i] if pulls[i] else 0.0
+
+def _ranking(candidates, totals, pulls, order=None):
+    if order is None:
+        order = sorted(range(len(candidates)), key=lambda i: (_mean(totals, pulls, i), pulls[i]), reverse=True)
+    return [(candidates[i], _mean(totals, pulls, i), pulls[i]) for i in order]
+
+def successive_halving(candidates, examples, score_fn, budget, keep=1, seed=0):
+    """
+    Split the budget over ceil(log2(n)) rounds. Every surviving arm is scored on its
+    share of new examples, then the worse half is dropped, until `keep` arms remain.
+    """
+    n = len(candidates)
+    examples = list(examples)
+    random.Random(seed).shuffle(examples)
+    totals, pulls = [0.0] * n, [0] * n
+    alive, dropped = list(range(n)), []
+    rounds = max(1, math.ceil(math.log2(n))) if n > 1 else 1
+    remaining = budget
+    while alive and remaining > 0:
+        per_arm = max(1, budget // (len(alive) * rounds))
+        for i in alive:
+            take = min(per_arm, len(examples) - pulls[i], remaining)
+            if take <= 0:
+                continue
+            scores = score_fn(candidates[i], examples[pulls[i]:pulls[i] + take])
+            totals[i] += sum(scores)
+            pulls[i] += take
+            remaining -= take
+        if len(alive) <= keep:
+            if all(pulls[i] >= len(examples) for i in alive):
+                break
+            continue
+        alive.sort(key=lambda i: _mean(totals, pulls, i), reverse=True)
+        cut = max(keep, math.ceil(len(alive) / 2))
+        # Arms dropped in later rounds were scored on more data, so they rank higher
+        alive, dropped = alive[:cut], alive[cut:] + dropped
+    alive.sort(key=lambda i: _mean(totals, pulls, i), reverse=True)
+    return _ranking(candidates, totals, pulls, order=alive + dropped)
+
+def ucb(candidates, examples, score_fn, budget, exploration=2.0, min_pulls=1, seed=0):
+    """
+    UCB1: after `min_pulls` evaluations per arm, always score the arm with the highest
+    mean + sqrt(exploration * ln(t) / n_i) on its next example.
+    """
+    n = len(candidates)
+    examples = list(examples)
+    random.Random(seed).shuffle(examples)
+    totals, pulls = [0.0] * n, [0] * n
+    remaining = budget
+    for i in range(n):
+        take = min(min_pulls, len(examples), remaining)
+        if take <= 0:
+            break
+        totals[i] += sum(score_fn(candidates[i], examples[:take]))
+        pulls[i] += take
+        remaining -= take
+    t = sum(pulls)
+    while remaining > 0:
+        open_arms = [i for i in range(n) if 0 < pulls[i] < len(examples)]
+        if not open_arms:
+            break
+        best = max(open_arms, key=lambda i: _mean(totals, pulls, i)
+                   + math.sqrt(exploration * math.log(max(t, 1)) / pulls[i]))
+        totals[best] += score_fn(candidates[best], [examples[pulls[best]]])[0]
+        pulls[best] += 1
+        remaining -= 1
+        t += 1
+    return _ranking(candidates, totals, pulls)
@@ -0,0 +1,31 @@
+"""
+Local token counting.
+
+Uses tiktoken when it is installed (the encoding for `model`, or cl100k_base for
+models it doesn't know) and otherwise falls back to ~4 characters per token.
+"""
+
+from functools import lru_cache
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(DEFAULT_ENCODING)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+def count_tokens(text, model=None):
+    """Number of tokens in `text` (non-strings count as their str())."""
+    if not isinstance(text, str):
+        text = str(text)
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,160 @@
+"""
+Lightweight tracing for the optimizer loop and adapter calls.
+
+    tracer = Tracer([JsonlExporter("trace.jsonl")])
+    set_tracer(tracer)
+    with get_tracer().span("optimize_step.run", batch_size=32) as span:
+        ...
+        span.set(prompt_tokens=1200)
+
+Spans nest through a context variable and are exported when they end, as dicts shaped
+like OpenTelemetry span data (trace/span ids, unix-nano timestamps, attributes).
+By default the global tracer is a no-op whose span() returns a shared object, so
+instrumented code costs one function call per span when tracing is off.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NoopTracer:
+    enabled = False
+
+    def span(self, name, **attributes):
+        return _NOOP_SPAN
+
+
+class Span:
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        self.parent = None
+        self.trace_id = None
+        self.start_ns = self.end_ns = None
+        self.status = "OK"
+        self._token = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self.trace_id = self.parent.trace_id if self.parent is not None else os.urandom(16).hex()
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        self.end_ns = self.start_ns + int(duration * 1e9)
+        if exc_type is not None:
+            self.status = "ERROR"
+            self.attributes["exception.type"] = exc_type.__name__
+        _current_span.reset(self._token)
+        self.tracer._export(self)
+        return False
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent.span_id if self.parent is not None else None,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    enabled = True
+
+    def __init__(self, exporters=()):
+        self.exporters = list(exporters)
+
+    def span(self, name, **attributes):
+        return Span(self, name, attributes)
+
+    def _export(self, span):
+        for exporter in self.exporters:
+            exporter.export(span)
+
+
+class InMemoryExporter:
+    """Keeps finished spans as dicts, e.g. for tests or in-process analysis."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span.to_dict())
+
+    def by_name(self, name):
+        return [s for s in self.spans if s["name"] == name]
+
+
+class JsonlExporter:
+    """Appends one JSON line per finished span to a local file."""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=repr)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class OpenTelemetryExporter:
+    """Re-emits finished spans through an opentelemetry-api tracer (requires opentelemetry-api)."""
+
+    def __init__(self, otel_tracer=None):
+        if otel_tracer is None:
+            from opentelemetry import trace
+            otel_tracer = trace.get_tracer("promptoptimizerscai")
+        self.otel_tracer = otel_tracer
+
+    def export(self, span):
+        attributes = {k: v for k, v in span.attributes.items() if isinstance(v, (str, bool, int, float))}
+        otel_span = self.otel_tracer.start_span(span.name, start_time=span.start_ns, attributes=attributes)
+        otel_span.end(end_time=span.end_ns)
+
+
+_current_span = contextvars.ContextVar("promptoptimizerscai_span", default=None)
+_tracer = NoopTracer()
+
+def get_tracer():
+    return _tracer
+
+def set_tracer(tracer):
+    """Install a global tracer; None restores the no-op tracer. Returns the previous one."""
+    global _tracer
+    previous = _tracer
+    _tracer = tracer if tracer is not None else NoopTracer()
+    return previous
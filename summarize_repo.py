@@ -16,11 +16,26 @@ How to Use:
 4. To get just the directory tree:
     python summarize_repo.py . --mode TREE
 
+5. To fit the tree and as much content as possible into a token budget, most relevant
+   (and smallest) files first:
+    python summarize_repo.py . --mode BUDGET --token_budget 8000 --query optimizer adapter
+
 Arguments:
 ----------
 - root_dir: The root directory to summarize (e.g., . for current directory)
-- --mode: "EVERYTHING", "PARTIAL", or "TREE" (default: PARTIAL)
+- --mode: "EVERYTHING", "PARTIAL", "TREE" or "BUDGET" (default: PARTIAL)
 - --max_lines: Number of lines per file in PARTIAL mode (default: 10)
+- --token_budget: Target size of the summary in BUDGET mode (default: 8000)
+- --query: Keywords that make matching files more relevant in BUDGET mode
+- --workers: Files read in parallel (default: 8)
+- --no_cache: Don't read or write the per-file cache
+
+Files matched by .gitignore (at the root or in subdirectories) are skipped. The first
+lines of each file (plus its line count and token cost in BUDGET mode) are cached in
+.repo_summary_cache.jsonl keyed by mtime and size, so PARTIAL and BUDGET reruns only
+scan files that changed, and BUDGET mode only reads the lines it shows; each run
+appends just the changed entries.
+In BUDGET mode a tree that alone exceeds the budget is cut off with "... N more entries".
 
 Example:
 --------
@@ -29,8 +44,13 @@ python summarize_repo.py . --mode PARTIAL --max_lines 5
 """
 
 import os
+import re
+import json
+import math
 import datetime
 import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 IGNORE_DIRS = {
     ".git", ".venv", ".pdm-build", "__pycache__", ".idea", ".vscode",
@@ -43,6 +63,11 @@ IGNORE_FILE_EXTENSIONS = IGNORE_FILE_PATTERNS
 IGNORE_FILES = {
     "pdm.lock", "repo_summary.md"
 }
+CACHE_FILE = ".repo_summary_cache.jsonl"
+# Lines of each file kept in the cache (PARTIAL mode may keep more)
+CACHE_HEAD_LINES = 10
+# Files worth including first in BUDGET mode, whatever the query
+KEY_FILES = {"README.md", "pyproject.toml", "setup.py", "main.py", "__init__.py"}
 
 def should_ignore(name):
     # Ignore system/hidden files and folders
@@ -58,63 +83,360 @@ def should_ignore(name):
         return True
     return False
 
-def summarize_repo(root_dir, out, mode="PARTIAL", max_lines=10):
+def estimate_tokens(text):
+    # Rough estimate (~4 characters per token), like the package's fallback tokenizer
+    return max(1, len(text) // 4)
+
+
+def _gitignore_regex(pattern):
+    """Translate one .gitignore glob into a regex over '/'-separated relative paths."""
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.strip("/")
+    regex, i = "", 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(pattern[i])
+                i += 1
+            else:
+                regex += "[" + pattern[i + 1:end].replace("!", "^", 1) + "]"
+                i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    # Unanchored patterns match at any depth; a match on a directory covers its contents
+    return re.compile(("" if anchored else "(?:.*/)?") + regex + "(?P<rest>/.*)?$")
+
+class GitIgnore:
+    """Rules from .gitignore files; later rules (and deeper files) override earlier ones."""
+
+    def __init__(self):
+        self.rules = []  # (base_dir, regex, negate, dir_only)
+
+    def add_file(self, path, base=""):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            self.rules.append((base, _gitignore_regex(line), negate, line.endswith("/")))
+
+    def ignored(self, rel_path, is_dir=False):
+        result = False
+        for base, regex, negate, dir_only in self.rules:
+            if base:
+                if not rel_path.startswith(base + "/"):
+                    continue
+                path = rel_path[len(base) + 1:]
+            else:
+                path = rel_path
+            match = regex.match(path)
+            # Directory-only rules match a directory, or anything under one
+            if match and not (dir_only and not is_dir and match.group("rest") is None):
+                result = not negate
+        return result
+
+
+def collect_files(root_dir):
+    """[(rel_dir, [file names])] in walk order, skipping ignored names and .gitignore matches."""
+    gitignore = GitIgnore()
+    entries = []
+    for root, dirs, files in os.walk(root_dir):
+        rel_dir = os.path.relpath(root, root_dir).replace(os.sep, "/")
+        rel_dir = "" if rel_dir == "." else rel_dir
+        if ".gitignore" in files:
+            gitignore.add_file(os.path.join(root, ".gitignore"), rel_dir)
+        prefix = rel_dir + "/" if rel_dir else ""
+        # Filter out ignored directories in-place
+        dirs[:] = sorted(d for d in dirs if not should_ignore(d) and not gitignore.ignored(prefix + d, is_dir=True))
+        kept = sorted(f for f in files if not should_ignore(f) and not gitignore.ignored(prefix + f))
+        entries.append((rel_dir, kept))
+    return entries
+
+def read_file(path, max_lines=None, cached=None):
+    """
+    Lines of a file (at most max_lines + 1, to tell whether there are more), reusing
+    `cached` if the file's mtime and size are unchanged and it holds enough lines.
+    Returns a cache entry {"mtime_ns", "size", "lines", "complete"} or {..., "error"}.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        # Removed since the directory walk
+        return {"mtime_ns": None, "size": None, "error": str(e)}
+    if _unchanged(cached, stat):
+        if "error" in cached or cached["complete"] or (max_lines is not None and len(cached["lines"]) > max_lines):
+            return cached
+    entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            # Only read the lines that will be shown
+            lines = list(islice(file, max_lines + 1)) if max_lines is not None else file.readlines()
+        entry["lines"] = [line.rstrip("\n") for line in lines]
+        entry["complete"] = max_lines is None or len(lines) <= max_lines
+    except Exception as e:
+        entry["error"] = str(e)
+    return entry
+
+def scan_file(path, subindent="", cached=None):
+    """
+    Cache entry for planning a BUDGET summary: the first CACHE_HEAD_LINES + 1 lines plus
+    the whole file's "n_lines" and "tokens" (its cost rendered at `subindent`). The file
+    is only read if it changed since `cached`.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        return {"mtime_ns": None, "size": None, "error": str(e)}
+    if _unchanged(cached, stat) and ("error" in cached or "tokens" in cached):
+        return cached
+    entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    head, n_lines, tokens = [], 0, 0
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                line = line.rstrip("\n")
+                if n_lines <= CACHE_HEAD_LINES:
+                    head.append(line)
+                n_lines += 1
+                tokens += _line_cost(subindent, line)
+        entry.update(lines=head, complete=n_lines == len(head), n_lines=n_lines, tokens=tokens)
+    except Exception as e:
+        entry["error"] = str(e)
+    return entry
+
+def _unchanged(cached, stat):
+    return cached is not None and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size
+
+def load_cache(path):
+    """
+    ({rel_path: entry}, number of log lines). The cache is a log of {"path", ...entry}
+    lines, later lines replacing earlier ones and {"path", "deleted": true} removing them.
+    """
+    cache, n_lines = {}, 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                n_lines += 1
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn last line of an interrupted run
+                    continue
+                rel_path = record.pop("path")
+                if record.get("deleted"):
+                    cache.pop(rel_path, None)
+                else:
+                    cache[rel_path] = record
+    except OSError:
+        pass
+    return cache, n_lines
+
+def _cache_entry(entry, head_lines):
+    """What the cache keeps of an entry: its key and first head_lines + 1 lines, not the contents."""
+    if "error" in entry or len(entry["lines"]) <= head_lines + 1:
+        return entry
+    return {**entry, "lines": entry["lines"][:head_lines + 1], "complete": False}
+
+def save_cache(path, cache, n_lines, entries):
+    """
+    Append the entries that differ from `cache` and delete markers for files that are
+    gone. The log is rewritten instead once superseded lines outnumber live ones.
+    """
+    records = [{"path": p, **e} for p, e in entries.items() if cache.get(p) != e]
+    records += [{"path": p, "deleted": True} for p in cache if p not in entries]
+    if not records:
+        return
+    if n_lines + len(records) > 2 * max(len(entries), 1):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps({"path": p, **e}) + "\n" for p, e in entries.items())
+        os.replace(tmp_path, path)
+        return
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+def _content_line(subindent, line):
+    return f"{subindent}    {line.rstrip()}"
+
+def _line_cost(subindent, line):
+    return estimate_tokens(_content_line(subindent, line) + "\n")
+
+def _content_lines(entry, subindent, max_lines=None):
+    if "error" in entry:
+        return [f"{subindent}    [Could not read file: {entry['error']}]"]
+    lines = entry["lines"] if max_lines is None else entry["lines"][:max_lines]
+    rendered = [_content_line(subindent, line) for line in lines]
+    if max_lines is not None and (not entry["complete"] or len(entry["lines"]) > max_lines):
+        rendered.append(f"{subindent}    ...")
+    return rendered
+
+def relevance(rel_path, entry, query=()):
+    """Higher for key files and for query keywords in the path (strongly) or first lines."""
+    score = 1.0
+    name = rel_path.rsplit("/", 1)[-1]
+    if name in KEY_FILES:
+        score += 2.0
+    if rel_path.endswith(".py"):
+        score += 0.5
+    lowered_path = rel_path.lower()
+    text = "\n".join(entry.get("lines", ())).lower()
+    for term in query:
+        term = term.lower()
+        if term in lowered_path:
+            score += 3.0
+        score += min(2.0, 0.2 * text.count(term))
+    return score
+
+def _subindent(rel_path):
+    return ' ' * 4 * (rel_path.count("/") + 1)
+
+def _iter_lines(path, entry):
+    """The file's lines, from the cached head first; the file is only opened for more."""
+    yield from entry["lines"]
+    if not entry["complete"]:
+        with open(path, "r", encoding="utf-8") as file:
+            for line in islice(file, len(entry["lines"]), None):
+                yield line.rstrip("\n")
+
+def _budget_plan(root_dir, files, entries, token_budget, tree_tokens, query):
+    """
+    {rel_path: number of lines to show}, from scan_file entries. Files are taken by
+    relevance per token (smaller, more relevant files first): whole if they fit, else
+    the lines that do, which are the only ones read.
+    """
+    remaining = token_budget - tree_tokens
+    files = [p for p in files if "error" not in entries[p]]
+    order = sorted(files, key=lambda p: -relevance(p, entries[p], query) / math.log2(2 + entries[p]["tokens"]))
+    plan = {}
+    for p in order:
+        if entries[p]["tokens"] <= remaining:
+            shown, spent = entries[p]["n_lines"], entries[p]["tokens"]
+        else:
+            # Truncated files end with a "..." line
+            shown, spent = 0, estimate_tokens(_subindent(p) + "    ...\n")
+            for line in _iter_lines(os.path.join(root_dir, p), entries[p]):
+                cost = _line_cost(_subindent(p), line)
+                if spent + cost > remaining:
+                    break
+                spent += cost
+                shown += 1
+        if shown:
+            plan[p] = shown
+            remaining -= spent
+    return plan
+
+def summarize_repo(root_dir, out, mode="PARTIAL", max_lines=10, workers=8, cache_path=None,
+                   token_budget=8000, query=()):
     """
     Summarizes the directory structure and file contents.
-    mode: "EVERYTHING", "PARTIAL", "TREE"
+    mode: "EVERYTHING", "PARTIAL", "TREE", "BUDGET"
     max_lines: Number of lines per file in PARTIAL mode
+    cache_path: per-file cache (None: no caching)
+    token_budget, query: BUDGET mode target size and relevance keywords
     """
-    for root, dirs, files in os.walk(root_dir):
-        # Filter out ignored directories in-place
-        dirs[:] = [d for d in dirs if not should_ignore(d)]
-        level = root.replace(root_dir, '').count(os.sep)
+    tree = collect_files(root_dir)
+    if cache_path:
+        # Never summarize the cache itself
+        cache_rel = os.path.relpath(cache_path, root_dir).replace(os.sep, "/")
+        tree = [(d, [f for f in names if (f"{d}/{f}" if d else f) != cache_rel]) for d, names in tree]
+    files = [f"{d}/{f}" if d else f for d, names in tree for f in names]
+    if mode == "BUDGET":
+        tree_only = list(_tree_lines(root_dir, tree, {}, None, None))
+        tree_tokens = sum(estimate_tokens(line + "\n") for line in tree_only)
+        if tree_tokens >= token_budget:
+            # No room for any content
+            for line in _truncated_tree(tree_only, token_budget):
+                out.write(line + "\n")
+            return
+    entries, plan = {}, None
+    if mode != "TREE":
+        cache, n_lines = load_cache(cache_path) if cache_path else ({}, 0)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            if mode == "BUDGET":
+                # Plan from line counts and token costs, then read just the lines shown
+                results = pool.map(lambda p: scan_file(os.path.join(root_dir, p), _subindent(p), cache.get(p)), files)
+            else:
+                limit = max_lines if mode == "PARTIAL" else None
+                results = pool.map(lambda p: read_file(os.path.join(root_dir, p), limit, cache.get(p)), files)
+            entries = dict(zip(files, results))
+            if cache_path:
+                head_lines = max(CACHE_HEAD_LINES, max_lines if mode == "PARTIAL" else 0)
+                save_cache(cache_path, cache, n_lines, {p: _cache_entry(e, head_lines) for p, e in entries.items()})
+            if mode == "BUDGET":
+                plan = _budget_plan(root_dir, files, entries, token_budget, tree_tokens, query)
+                shown = pool.map(lambda p: read_file(os.path.join(root_dir, p), plan[p], entries[p]), plan)
+                entries.update(zip(plan, shown))
+
+    for line in _tree_lines(root_dir, tree, entries, mode, max_lines, plan):
+        out.write(line + "\n")
+
+def _truncated_tree(lines, token_budget):
+    """The tree lines that fit in token_budget, followed by how many were left out."""
+    spent = estimate_tokens(f"... {len(lines)} more entries\n")
+    kept = []
+    for line in lines:
+        spent += estimate_tokens(line + "\n")
+        if spent > token_budget:
+            break
+        kept.append(line)
+    return kept + [f"... {len(lines) - len(kept)} more entries"]
+
+def _tree_lines(root_dir, tree, entries, mode, max_lines, plan=None):
+    for rel_dir, names in tree:
+        level = rel_dir.count("/") + 1 if rel_dir else 0
         indent = ' ' * 4 * level
-        out.write(f"{indent}{os.path.basename(root)}/\n")
+        yield f"{indent}{os.path.basename(rel_dir) if rel_dir else os.path.basename(root_dir)}/"
         subindent = ' ' * 4 * (level + 1)
-        for f in files:
-            if should_ignore(f):
-                continue
-            file_path = os.path.join(root, f)
-            out.write(f"{subindent}{f}\n")
+        for f in names:
+            rel_path = f"{rel_dir}/{f}" if rel_dir else f
+            yield f"{subindent}{f}"
             if mode == "EVERYTHING":
-                print_full_content(file_path, out, subindent)
+                yield from _content_lines(entries[rel_path], subindent)
             elif mode == "PARTIAL":
-                print_partial_content(file_path, out, max_lines, subindent)
+                yield from _content_lines(entries[rel_path], subindent, max_lines)
+            elif mode == "BUDGET" and rel_path in plan:
+                yield from _content_lines(entries[rel_path], subindent, plan[rel_path])
             # If mode is TREE, skip file content
 
-def print_partial_content(file_path, out, max_lines=10, subindent=''):
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-            for line in lines[:max_lines]:
-                out.write(f"{subindent}    {line.rstrip()}\n")
-            if len(lines) > max_lines:
-                out.write(f"{subindent}    ...\n")
-    except Exception as e:
-        out.write(f"{subindent}    [Could not read file: {e}]\n")
-
-def print_full_content(file_path, out, subindent=''):
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-            for line in lines:
-                out.write(f"{subindent}    {line.rstrip()}\n")
-    except Exception as e:
-        out.write(f"{subindent}    [Could not read file: {e}]\n")
-
 
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Summarize project directory.")
     parser.add_argument("root_dir", help="Root directory to summarize")
-    parser.add_argument("--mode", choices=["EVERYTHING", "PARTIAL", "TREE"], default="PARTIAL")
+    parser.add_argument("--mode", choices=["EVERYTHING", "PARTIAL", "TREE", "BUDGET"], default="PARTIAL")
     parser.add_argument("--max_lines", type=int, default=10, help="Max lines per file in PARTIAL mode")
+    parser.add_argument("--token_budget", type=int, default=8000, help="Summary size in tokens in BUDGET mode")
+    parser.add_argument("--query", nargs="*", default=[], help="Relevance keywords for BUDGET mode")
+    parser.add_argument("--workers", type=int, default=8, help="Files read in parallel")
+    parser.add_argument("--no_cache", action="store_true", help="Don't use the per-file cache")
     args = parser.parse_args()
 
     # Generate a timestamped filename
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     out_filename = f"repo_summary_{timestamp}.md"
+    cache_path = None if args.no_cache else os.path.join(args.root_dir, CACHE_FILE)
 
     with open(out_filename, "w", encoding="utf-8") as out:
         out.write(f"# Repository Summary Report\n\n")
@@ -122,8 +444,12 @@ if __name__ == "__main__":
         out.write(f"**Parameters:**\n")
         out.write(f"- root_dir: `{args.root_dir}`\n")
         out.write(f"- mode: `{args.mode}`\n")
-        out.write(f"- max_lines: `{args.max_lines}`\n\n")
-        out.write("---\n\n")
-        summarize_repo(args.root_dir, out, mode=args.mode, max_lines=args.max_lines)
+        out.write(f"- max_lines: `{args.max_lines}`\n")
+        if args.mode == "BUDGET":
+            out.write(f"- token_budget: `{args.token_budget}`\n")
+            out.write(f"- query: `{' '.join(args.query)}`\n")
+        out.write("\n---\n\n")
+        summarize_repo(args.root_dir, out, mode=args.mode, max_lines=args.max_lines, workers=args.workers,
+                       cache_path=cache_path, token_budget=args.token_budget, query=args.query)
 
-    print(f"\nRepository summary written to: {out_filename}\n")
\ No newline at end of file
+    print(f"\nRepository summary written to: {out_filename}\n")
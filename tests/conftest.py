@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.fixture
+def tiny_gpt2():
+    """A randomly initialised two-layer GPT-2 with a word-level tokenizer, built offline."""
+    torch = pytest.importorskip("torch")
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+    torch.manual_seed(0)
+    words = ["<unk>", "<eos>"] + (
+        "extract all entities from : water is h2o protein binds dna p53 regulates cell cycle ."
+    ).split()
+    tokenizer_object = Tokenizer(models.WordLevel({w: i for i, w in enumerate(words)}, unk_token="<unk>"))
+    tokenizer_object.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer_object, unk_token="<unk>", eos_token="<eos>")
+    config = GPT2Config(vocab_size=len(words), n_positions=128, n_embd=16, n_layer=2, n_head=2,
+                        bos_token_id=1, eos_token_id=1)
+    model = GPT2LMHeadModel(config).eval()
+    return model, tokenizer
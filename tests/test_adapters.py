@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from promptoptimizerscai.adapters.hugging_face_adapter import HuggingFaceAdapter
 from promptoptimizerscai.adapters.openai_adapter import OpenAIAdapter
 
@@ -23,10 +23,39 @@ def test_huggingface_adapter_inference(model_name):
 
 def test_openai_adapter_inference():
     # Mock OpenAI API for reproducibility
-    with patch("openai.ChatCompletion.create") as mock_create:
-        mock_create.return_value = {
-            'choices': [{'message': {'content': 'mocked GPT output'}}]
-        }
+    response = MagicMock()
+    response.choices[0].message.content = 'mocked GPT output'
+    response.usage = None
+    with patch("openai.AsyncOpenAI") as mock_client:
+        mock_client.return_value.chat.completions.create = AsyncMock(return_value=response)
+        mock_client.return_value.close = AsyncMock()
         adapter = OpenAIAdapter(api_key="fake-key", model="gpt-4.1")
         out = adapter.generate("Extract entities from: Water is H2O.")
-        assert out == 'mocked GPT output'
\ No newline at end of file
+        assert out == 'mocked GPT output'
+        adapter.close()
+
+def test_gradient_and_edit_fall_back_to_generate():
+    from promptoptimizerscai.adapters.base import ModelAdapter
+    from promptoptimizerscai.core.optimizer import PromptOptimizer
+
+    class EchoingModel(ModelAdapter):
+        """A completion model: echoes the request, then answers."""
+
+        def __init__(self):
+            self.requests = []
+
+        def generate(self, prompt, **kwargs):
+            self.requests.append(prompt)
+            if "gets the following examples wrong" in prompt:
+                return prompt + " It never names the entity types."
+            if "Write an improved prompt" in prompt:
+                return prompt + ' "Extract entities with their types."'
+            return "Water"
+
+    model = EchoingModel()
+    assert model.generate_gradient("Extract.", [("Water is H2O.", "Water:CHEMICAL", "Water")]) == [
+        "It never names the entity types."]
+    assert "Expected: Water:CHEMICAL" in model.requests[-1]
+    assert model.edit_prompt("Extract.", "It never names the entity types.") == ["Extract entities with their types."]
+    beam = PromptOptimizer(model).run("Extract.", [("Water is H2O.", "Water:CHEMICAL")], num_steps=1)
+    assert "Extract entities with their types." in beam
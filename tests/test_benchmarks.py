@@ -0,0 +1,86 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
+import threading
+import time
+
+import pytest
+from bench_optimizer import compare_to_baseline, make_scierc_dataset, run_benchmarks
+from bench_orchestration import run_benchmark as run_orchestration_benchmark
+from promptoptimizerscai.adapters.synthetic_adapter import SyntheticAdapter, SyntheticAdapterError
+
+
+def test_synthetic_adapter_is_deterministic_and_rewards_better_prompts():
+    dataset = make_scierc_dataset(200, seed=1)
+    golds = [g for _, g in dataset]
+
+    def accuracy(prompt):
+        adapter = SyntheticAdapter(golds, latency=0)
+        preds = adapter.batch_generate([prompt + " " + x for x, _ in dataset])
+        return sum(p == g for p, g in zip(preds, golds)) / len(golds)
+
+    assert make_scierc_dataset(200, seed=1) == dataset
+    assert accuracy("Extract.") == accuracy("Extract.")
+    assert accuracy("Extract scientific entities and relations.") > accuracy("Extract.") + 0.2
+
+def test_synthetic_adapter_simulates_failures_cost_and_concurrency():
+    adapter = SyntheticAdapter(["A:X"], latency=0.02, max_concurrency=2, cost_per_1k_tokens=1.0, failure_rate=1.0)
+    with pytest.raises(SyntheticAdapterError):
+        adapter.generate("[doc-0]")
+    adapter = SyntheticAdapter(["A:X"], latency=0.02, max_concurrency=2)
+    start = time.perf_counter()
+    threads = [threading.Thread(target=adapter.generate, args=("[doc-0]",)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Four calls through two slots take at least two latency periods
+    assert time.perf_counter() - start >= 0.04
+    assert adapter.stats["calls"] == 4
+    assert adapter.stats["queue_wait"] > 0
+
+def test_synthetic_adapter_retries_succeed_and_are_forgotten():
+    adapter = SyntheticAdapter(["A:X"], latency=0, failure_rate=0.5)
+    for i in range(100):
+        for _ in range(50):
+            try:
+                adapter.generate(f"prompt {i} [doc-0]")
+                break
+            except SyntheticAdapterError:
+                pass
+    assert adapter.stats["failures"] > 0
+    assert adapter.stats["calls"] == 100 + adapter.stats["failures"]
+    assert adapter._attempts == {}
+
+def test_benchmark_report_and_baseline_comparison():
+    results = run_benchmarks([100], steps=2, minibatch=8, latency=0)
+    assert {r["benchmark"] for r in results} == {"evaluate_prompt", "collect_errors", "optimize_step", "beam_search_step"}
+    evaluate = next(r for r in results if r["benchmark"] == "evaluate_prompt")
+    assert evaluate["model_calls_per_step"] == 8
+    assert compare_to_baseline(results, {"results": results}) == []
+    slower = [dict(r, model_calls_per_step=r["model_calls_per_step"] * 2) for r in results]
+    assert any("model_calls_per_step" in line for line in compare_to_baseline(slower, {"results": results}))
+
+def test_orchestration_benchmark_reports_both_modes():
+    results = run_orchestration_benchmark(examples=8, candidates=2, latency=0, repeats=1)
+    assert [r["mode"] for r in results[:2]] == ["sequential", "parallel"]
+    # Both modes pick the same prompt
+    assert results[0]["final_prompt"] == results[1]["final_prompt"]
+    assert results[2]["speedup"] > 0
+
+def test_sub_millisecond_timings_are_not_compared():
+    fast = {"benchmark": "collect_errors", "dataset_size": 100, "throughput_examples_per_s": 1000000.0,
+            "latency_p50_ms": 0.1, "latency_p95_ms": 0.1, "model_calls_per_step": 0.0, "peak_memory_mb": 0.003}
+    slower = dict(fast, throughput_examples_per_s=600000.0, latency_p50_ms=0.16, latency_p95_ms=0.16)
+    assert compare_to_baseline([slower], {"results": [fast]}) == []
+    grown = dict(fast, peak_memory_mb=0.03)
+    assert len(compare_to_baseline([grown], {"results": [fast]})) == 1
+
+def test_p95_is_only_compared_over_enough_steps():
+    base = {"benchmark": "optimize_step", "dataset_size": 100, "steps": 5, "throughput_examples_per_s": 1000.0,
+            "latency_p50_ms": 30.0, "latency_p95_ms": 32.0, "model_calls_per_step": 96.0, "peak_memory_mb": 0.1}
+    spike = dict(base, latency_p95_ms=60.0)
+    assert compare_to_baseline([spike], {"results": [base]}) == []
+    long_base, long_spike = dict(base, steps=50), dict(spike, steps=50)
+    assert len(compare_to_baseline([long_spike], {"results": [long_base]})) == 1
+
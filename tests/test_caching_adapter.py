@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock
+from promptoptimizerscai.adapters.base import ModelAdapter
+from promptoptimizerscai.adapters.caching_adapter import CachingAdapter
+
+
+class EchoAdapter(ModelAdapter):
+    model = "echo"
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, prompt, **kwargs):
+        self.calls.append(prompt)
+        return prompt.upper()
+
+def test_cache_survives_restart(tmp_path):
+    inner = EchoAdapter()
+    cache = CachingAdapter(inner, cache_dir=str(tmp_path))
+    assert cache.batch_generate(["a", "b", "a"]) == ["A", "B", "A"]
+    assert inner.calls == ["a", "b"]
+    cache.close()
+
+    restarted = CachingAdapter(EchoAdapter(), cache_dir=str(tmp_path))
+    assert restarted.generate("a") == "A"
+    assert restarted.adapter.calls == []
+    assert restarted.stats["disk_hits"] == 1
+    assert restarted.generate("a") == "A"
+    assert restarted.stats["memory_hits"] == 1
+
+def test_generation_kwargs_are_part_of_the_key():
+    cache = CachingAdapter(EchoAdapter())
+    cache.generate("a", temperature=0)
+    cache.generate("a", temperature=0, max_tokens=5)
+    assert cache.adapter.calls == ["a", "a"]
+
+def test_deterministic_only_skips_sampled_calls():
+    inner = EchoAdapter()
+    cache = CachingAdapter(inner, deterministic_only=True)
+    cache.generate("a", temperature=0.7)
+    cache.generate("a", temperature=0.7)
+    cache.generate("a", temperature=0)
+    cache.generate("a", temperature=0)
+    assert len(inner.calls) == 3
+    assert cache.stats["uncached"] == 2
+    assert cache.hit_rate == 0.5
+
+def test_disk_store_evicts_least_recently_used(tmp_path):
+    cache = CachingAdapter(EchoAdapter(), cache_dir=str(tmp_path), max_memory_entries=1, max_disk_bytes=20)
+    for prompt in ["aaaaaa", "bbbbbb", "cccccc"]:
+        cache.generate(prompt)
+    assert cache.stats["evictions"] >= 1
+    assert cache._disk_bytes <= 20
+
+def test_gradient_and_edit_calls_pass_through():
+    inner = MagicMock()
+    inner.edit_prompt.return_value = ["better prompt"]
+    assert CachingAdapter(inner).edit_prompt("p", "g") == ["better prompt"]
+
+def test_cached_none_is_a_hit():
+    inner = MagicMock()
+    inner.generate.return_value = None
+    cache = CachingAdapter(inner)
+    assert cache.generate("a") is None
+    assert cache.generate("a") is None
+    assert cache.batch_generate(["a"]) == [None]
+    assert inner.generate.call_count == 1
+    assert inner.batch_generate.call_count == 0
+    assert cache.stats["memory_hits"] == 2
@@ -0,0 +1,80 @@
+import random
+import time
+
+from promptoptimizerscai.adapters.base import ModelAdapter
+from promptoptimizerscai.core.candidate_index import CandidateIndex, normalize_prompt
+from promptoptimizerscai.core.optimizer import PromptOptimizer
+
+BASE = "Extract all named entities from the sentence and label each one with its scientific type."
+
+def test_normalization_makes_trivial_variants_exact_duplicates():
+    assert normalize_prompt("  Extract ALL entities,  please!\n") == "extract all entities please"
+    index = CandidateIndex()
+    index.add(BASE, 0.5)
+    assert index.lookup(BASE.upper().replace(" ", "  ") + " !") == (BASE, 1.0, 0.5)
+    assert BASE.lower() in index
+
+def test_near_duplicates_match_and_unrelated_prompts_do_not():
+    index = CandidateIndex(threshold=0.6)
+    index.add(BASE, 0.7)
+    match = index.lookup(BASE.replace("label", "tag"))
+    assert match is not None and match[0] == BASE and match[2] == 0.7
+    assert index.lookup("Summarize the abstract in one sentence for a general audience.") is None
+
+def test_lookup_stays_fast_with_thousands_of_candidates():
+    rng = random.Random(0)
+    words = "extract label entity relation type chemical gene protein method task precise list all each".split()
+    index = CandidateIndex()
+    prompts = [" ".join(rng.choice(words) for _ in range(20)) for _ in range(5000)]
+    for i, prompt in enumerate(prompts):
+        index.add(prompt, i)
+    start = time.perf_counter()
+    for prompt in prompts[:500]:
+        assert index.lookup(prompt + ".")[0] == prompt
+    assert time.perf_counter() - start < 5.0
+
+
+class VariantAdapter(ModelAdapter):
+    """Edits that only differ in punctuation or whitespace from each other."""
+
+    def __init__(self):
+        self.prompts = set()
+
+    def generate(self, prompt, **kwargs):
+        self.prompts.add(prompt.rsplit(" ", 1)[0])
+        return "CHEMICAL" if "chemical" in prompt else "OTHER"
+
+    def generate_gradient(self, prompt, errors, **kwargs):
+        return ["Ask for chemical entities."]
+
+    def edit_prompt(self, prompt, gradient, **kwargs):
+        return [prompt + " Label chemical entities.", prompt + "  label chemical entities!",
+                prompt + " Label chemical entities"]
+
+def test_beam_search_skips_duplicate_candidates():
+    batch = [(f"x{i}", "CHEMICAL") for i in range(4)]
+    adapter = VariantAdapter()
+    optimizer = PromptOptimizer(adapter, num_candidates=3)
+    beam = optimizer.beam_search_step("Find entities.", batch, beam_width=2)
+    assert beam[0] == "Find entities. Label chemical entities."
+    # Only the original prompt and one of the three variants were evaluated
+    assert adapter.prompts == {"Find entities.", "Find entities. Label chemical entities."}
+    assert len(optimizer.candidate_index) == 2
+
+    without_dedup = VariantAdapter()
+    PromptOptimizer(without_dedup, num_candidates=3, dedup_threshold=None).beam_search_step(
+        "Find entities.", batch, beam_width=2)
+    assert len(without_dedup.prompts) == 4
+
+class DistinctEditsAdapter(VariantAdapter):
+    def edit_prompt(self, prompt, gradient, **kwargs):
+        return [prompt + " Label chemical entities.", prompt + " Focus on relations.", prompt + " Be brief."]
+
+def test_unevaluated_candidates_are_not_indexed():
+    batch = [(f"x{i}", "CHEMICAL") for i in range(4)]
+    optimizer = PromptOptimizer(DistinctEditsAdapter(), eval_budget=3)
+    optimizer.beam_search_step("Extract.", batch, beam_width=2)
+    # Four candidates, three evaluations: the last one was never scored
+    assert optimizer.dedupe_candidates(["Extract. Be brief."]) == ["Extract. Be brief."]
+    assert optimizer.candidate_index.lookup("Extract. Be brief.") is None
+    assert len(optimizer.candidate_index) == 3
@@ -0,0 +1,64 @@
+import json
+import pickle
+from collections import Counter
+
+from promptoptimizerscai.core.dataset import JsonlDataset
+
+
+def write_jsonl(path, n):
+    with open(path, "w") as f:
+        for i in range(n):
+            f.write(json.dumps({"text": f"claim {i}", "label": "SUPPORT" if i % 4 else "CONTRADICT"}) + "\n")
+        f.write("\n")  # trailing blank line is ignored
+
+def test_random_access_streaming_and_cached_index(tmp_path):
+    path = str(tmp_path / "dev.jsonl")
+    write_jsonl(path, 100)
+    dataset = JsonlDataset(path)
+    assert len(dataset) == 100
+    assert dataset[7] == ("claim 7", "SUPPORT")
+    assert list(dataset)[:2] == [("claim 0", "CONTRADICT"), ("claim 1", "SUPPORT")]
+    assert (tmp_path / "dev.jsonl.idx.npz").exists()
+    # Reopening reuses the index; rewriting the file invalidates it
+    assert JsonlDataset(path)[99] == ("claim 99", "SUPPORT")
+    write_jsonl(path, 10)
+    assert len(JsonlDataset(path)) == 10
+
+def test_index_location_and_unwritable_index_dir(tmp_path):
+    path = str(tmp_path / "dev.jsonl")
+    write_jsonl(path, 20)
+    index_dir = tmp_path / "cache"
+    index_dir.mkdir()
+    assert JsonlDataset(path, index_dir=str(index_dir))[3] == ("claim 3", "SUPPORT")
+    assert (index_dir / "dev.jsonl.idx.npz").exists()
+    assert len(JsonlDataset(path, cache_index=False)) == 20
+    # An index that can't be written (e.g. a read-only directory) is kept in memory
+    dataset = JsonlDataset(path, index_dir=str(tmp_path / "missing"))
+    assert dataset.sample(4, stratify=True) == dataset.sample(4, stratify=True)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cache", "dev.jsonl"]
+
+def test_seeded_and_stratified_sampling(tmp_path):
+    path = str(tmp_path / "dev.jsonl")
+    write_jsonl(path, 1000)
+    dataset = JsonlDataset(path)
+    batch = dataset.sample(40, seed=3, stratify=True)
+    assert batch == dataset.sample(40, seed=3, stratify=True)
+    assert len(set(batch)) == 40
+    assert Counter(label for _, label in batch) == {"SUPPORT": 30, "CONTRADICT": 10}
+    assert next(dataset.minibatches(8, seed=1)) == dataset.sample(8, seed=1)
+
+def test_shards_partition_the_dataset_and_pickle(tmp_path):
+    path = str(tmp_path / "dev.jsonl")
+    write_jsonl(path, 10)
+    dataset = JsonlDataset(path)
+    shards = [pickle.loads(pickle.dumps(dataset.shard(i, 3))) for i in range(3)]
+    assert sorted(x for shard in shards for x in shard) == sorted(dataset)
+    assert shards[1][0] == dataset[1]
+
+def test_scierc_fields(tmp_path):
+    path = tmp_path / "scierc.jsonl"
+    path.write_text(json.dumps({"sentence": "BRCA1 interacts with RAD51.", "entities": ["BRCA1", "RAD51"],
+                                "relations": [["BRCA1", "interacts_with", "RAD51"]]}) + "\n")
+    dataset = JsonlDataset(str(path), fields=("sentence", "entities", "relations"))
+    assert dataset[0] == ("BRCA1 interacts with RAD51.", ["BRCA1", "RAD51"], [["BRCA1", "interacts_with", "RAD51"]])
+    assert dataset.sample(1, stratify=True) == [dataset[0]]
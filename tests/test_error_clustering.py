@@ -0,0 +1,64 @@
+from unittest.mock import MagicMock
+
+from promptoptimizerscai.core.error_clustering import bucket_errors, classify_failure, summarize_errors
+from promptoptimizerscai.core.optimizer import PromptOptimizer
+
+
+def make_errors():
+    errors = []
+    for i in range(60):
+        errors.append((f"Water sample {i} is H2O.", "Water:CHEMICAL;H2O:CHEMICAL", "Water:CHEMICAL;H2O:MOLECULE"))
+    for i in range(30):
+        errors.append((f"Protein {i} binds DNA.", "Protein:PROTEIN;DNA:DNA", "Protein:PROTEIN"))
+    for i in range(10):
+        errors.append((f"Cells {i} divide.", "Cells:CELL", "Cells:CELL;divide:PROCESS"))
+    return errors
+
+def test_classify_failure():
+    assert classify_failure(("x", "A:X;B:Y", "A:X;B:Z")) == "wrong_label"
+    assert classify_failure(("x", "A:X;B:Y", "A:X")) == "missing_entity"
+    assert classify_failure(("x", "A:X", "A:X;C:Z")) == "spurious_entity"
+    gold = (["p53"], [("p53", "regulates", "cell cycle")])
+    assert classify_failure(("x", gold, (["p53"], []))) == "missing_relation"
+    assert classify_failure(("x", (["p53"], []), gold)) == "spurious_relation"
+
+def test_summary_covers_every_failure_mode_within_budget():
+    errors = make_errors()
+    selected = summarize_errors(errors, token_budget=200)
+    assert {classify_failure(e) for e in selected} == {"wrong_label", "missing_entity", "spurious_entity"}
+    assert sum(len(f"{i} || gold: {g} || prediction: {p}") // 4 for i, g, p in selected) <= 200
+    assert len(selected) < len(errors)
+    assert summarize_errors(errors, token_budget=10 ** 6, max_examples=5) == summarize_errors(
+        errors, token_budget=10 ** 6, max_examples=5)
+    assert len(summarize_errors(errors, token_budget=10 ** 6, max_examples=5)) == 5
+
+def test_label_confusions_are_bucketed():
+    errors = make_errors() + [("Salt is NaCl.", "NaCl:CHEMICAL", "NaCl:PROTEIN")]
+    buckets = bucket_errors(errors)
+    assert [len(b) for b in buckets["wrong_label"]] == [60, 1]
+    selected = summarize_errors(errors, token_budget=10 ** 6, max_examples=4)
+    # One example per confusion before any second example
+    assert sorted(e[2] for e in selected if classify_failure(e) == "wrong_label") == [
+        "NaCl:PROTEIN", "Water:CHEMICAL;H2O:MOLECULE"]
+
+def test_kmeans_summary_covers_every_failure_mode():
+    errors = make_errors()
+    selected = summarize_errors(errors, token_budget=200, method="kmeans")
+    assert {classify_failure(e) for e in selected} == {"wrong_label", "missing_entity", "spurious_entity"}
+
+def test_budget_smaller_than_one_error_keeps_a_truncated_error():
+    error = ("a very long input sentence " * 50, "Water:CHEMICAL", "Water:MOLECULE")
+    (kept,) = summarize_errors([error], token_budget=20)
+    assert kept[0].endswith("...") and len(kept[0]) < len(error[0])
+    assert kept[1:] == error[1:]
+
+def test_optimizer_sends_representatives_to_gradient():
+    adapter = MagicMock()
+    adapter.generate.return_value = "Water:CHEMICAL"
+    adapter.generate_gradient.return_value = ["Label every entity."]
+    adapter.edit_prompt.return_value = ["Label every chemical entity."]
+    batch = [(e[0], e[1]) for e in make_errors()]
+    optimizer = PromptOptimizer(adapter, max_gradient_errors=8)
+    assert optimizer.optimize_step("Extract entities.", batch) == "Label every chemical entity."
+    sent = adapter.generate_gradient.call_args[0][1]
+    assert 0 < len(sent) <= 8
@@ -0,0 +1,28 @@
+from unittest.mock import patch
+from promptoptimizerscai.adapters.hugging_face_adapter import HuggingFaceAdapter
+
+PROMPTS = [
+    "extract all entities from : p53 regulates cell cycle .",
+    "water",
+    "protein binds dna .",
+    "water is h2o",
+]
+
+def test_batch_generate_matches_generate_and_keeps_order(tiny_gpt2):
+    model, tokenizer = tiny_gpt2
+    adapter = HuggingFaceAdapter(model_name=model, tokenizer=tokenizer)
+    batched = adapter.batch_generate(PROMPTS, max_new_tokens=3, do_sample=False)
+    single = [adapter.generate(p, max_new_tokens=3, do_sample=False) for p in PROMPTS]
+    assert batched == single
+
+def test_length_buckets_respect_memory_budget():
+    with patch("promptoptimizerscai.adapters.hugging_face_adapter.pipeline"):
+        adapter = HuggingFaceAdapter(model_name="mocked", memory_budget_mb=1, max_batch_size=3)
+    # 1 MiB budget at 64 KiB per token -> at most 16 padded tokens per batch
+    lengths = [8, 1, 2, 4, 1, 3]
+    buckets = adapter._length_buckets(lengths)
+    assert sorted(i for b in buckets for i in b) == list(range(len(lengths)))
+    for bucket in buckets:
+        assert len(bucket) <= 3
+        assert len(bucket) * max(lengths[i] for i in bucket) <= 16
+    assert buckets[0] == [1, 4, 2]
@@ -1,97 +1,129 @@
+import asyncio
+import time
+
 import pytest
 from unittest.mock import MagicMock
-from langgraph.graph import StateGraph, END
-
-# --- Mock Node Functions ---
-
-def detect_context_node(state):
-    prompt = state["prompt"]
-    # Simple routing logic for test
-    if "entity" in prompt:
-        state["context"] = "scierc"
-    elif "fact" in prompt:
-        state["context"] = "scifact"
-    else:
-        state["context"] = "generalnlp"
-    state["trace"].append("DetectContext")
-    return state
-
-def route_to_optimizer_node(state):
-    state["trace"].append("RouteToOptimizer")
-    return state
-
-def scierc_evaluate_prompt_node(state):
-    state["trace"].append("SciERC_EvaluatePrompt")
-    state["result"] = "scierc_result"
-    return state
-
-def scifact_evaluate_prompt_node(state):
-    state["trace"].append("SciFact_EvaluatePrompt")
-    state["result"] = "scifact_result"
-    return state
-
-def generalnlp_evaluate_prompt_node(state):
-    state["trace"].append("GeneralNLP_EvaluatePrompt")
-    state["result"] = "generalnlp_result"
-    return state
-
-def output_best_prompt_node(state):
-    state["trace"].append("OutputBestPrompt")
-    state["final_prompt"] = "optimized_prompt"
-    return state
-
-# --- Router Function ---
-def optimizer_router(state):
-    if state["context"] == "scierc":
-        return "SciERC_EvaluatePrompt"
-    elif state["context"] == "scifact":
-        return "SciFact_EvaluatePrompt"
-    else:
-        return "GeneralNLP_EvaluatePrompt"
-
-# --- Build LangGraph ---
-def build_test_graph():
-    builder = StateGraph(state_keys=["prompt", "context", "trace", "result", "final_prompt"])
-
-    builder.add_node("DetectContext", detect_context_node)
-    builder.add_node("RouteToOptimizer", route_to_optimizer_node)
-    builder.add_node("SciERC_EvaluatePrompt", scierc_evaluate_prompt_node)
-    builder.add_node("SciFact_EvaluatePrompt", scifact_evaluate_prompt_node)
-    builder.add_node("GeneralNLP_EvaluatePrompt", generalnlp_evaluate_prompt_node)
-    builder.add_node("OutputBestPrompt", output_best_prompt_node)
-
-    builder.set_entry_point("DetectContext")
-    builder.add_edge("DetectContext", "RouteToOptimizer")
-    builder.add_router("RouteToOptimizer", optimizer_router)
-
-    # Each subgraph goes directly to OutputBestPrompt for simplicity
-    builder.add_edge("SciERC_EvaluatePrompt", "OutputBestPrompt")
-    builder.add_edge("SciFact_EvaluatePrompt", "OutputBestPrompt")
-    builder.add_edge("GeneralNLP_EvaluatePrompt", "OutputBestPrompt")
-    builder.add_edge("OutputBestPrompt", END)
-
-    return builder.compile()
-
-# --- Tests ---
+
+from promptoptimizerscai.adapters.base import ModelAdapter
+from promptoptimizerscai.adapters.caching_adapter import CachingAdapter
+from promptoptimizerscai.adapters.scheduling_adapter import SchedulingAdapter
+from promptoptimizerscai.adapters.single_flight_adapter import SingleFlightAdapter
+from promptoptimizerscai.core.budget import TokenBudget
+from promptoptimizerscai.core.orchestration import (
+    TaskEvaluator, build_orchestration_graph, run_orchestration,
+)
+
+
+class SlowAdapter(ModelAdapter):
+    """Answers `answer` when `keyword` is in the prompt; each call sleeps `latency` seconds."""
+
+    def __init__(self, keyword, answer, latency=0.0):
+        self.keyword = keyword
+        self.answer = answer
+        self.latency = latency
+
+    def generate(self, prompt, **kwargs):
+        time.sleep(self.latency)
+        return self.answer if self.keyword in prompt else "none"
+
+
+def build_evaluators(latency=0.0):
+    return {
+        "SciERC": TaskEvaluator(SlowAdapter("entity", "E", latency), [("s1", "E"), ("s2", "E")]),
+        "SciFact": TaskEvaluator(SlowAdapter("fact", "SUPPORTS", latency), [("c1", "SUPPORTS")]),
+        "GeneralNLP": TaskEvaluator(SlowAdapter("abstract", "summary", latency), [("a1", "summary")]),
+    }
 
 @pytest.mark.parametrize("prompt,expected_trace,expected_result", [
-    ("Extract entity and relation from text.", 
-     ["DetectContext", "RouteToOptimizer", "SciERC_EvaluatePrompt", "OutputBestPrompt"], 
-     "scierc_result"),
-    ("Verify scientific fact.", 
-     ["DetectContext", "RouteToOptimizer", "SciFact_EvaluatePrompt", "OutputBestPrompt"], 
-     "scifact_result"),
-    ("Summarize this abstract.", 
-     ["DetectContext", "RouteToOptimizer", "GeneralNLP_EvaluatePrompt", "OutputBestPrompt"], 
-     "generalnlp_result"),
+    ("Extract entity and relation from text.",
+     ["DetectContext", "RouteToOptimizer", "SciERC_EvaluatePrompt", "OutputBestPrompt"],
+     "SciERC"),
+    ("Verify scientific fact.",
+     ["DetectContext", "RouteToOptimizer", "SciFact_EvaluatePrompt", "OutputBestPrompt"],
+     "SciFact"),
+    ("Summarize this abstract.",
+     ["DetectContext", "RouteToOptimizer", "GeneralNLP_EvaluatePrompt", "OutputBestPrompt"],
+     "GeneralNLP"),
 ])
 def test_langgraph_routing_and_chaining(prompt, expected_trace, expected_result):
-    graph = build_test_graph()
-    initial_state = {"prompt": prompt, "trace": []}
-    final_state = graph.invoke(initial_state)
+    graph = build_orchestration_graph(build_evaluators(), mode="route")
+    final_state = run_orchestration(graph, prompt)
     # Check node execution order
     assert final_state["trace"] == expected_trace
     # Check routing result
-    assert final_state["result"] == expected_result
+    assert list(final_state["results"]) == [expected_result]
+    assert final_state["results"][expected_result]["scores"] == {prompt: 1.0}
     # Check final prompt output
-    assert final_state["final_prompt"] == "optimized_prompt"
\ No newline at end of file
+    assert final_state["final_prompt"] == prompt
+
+def test_parallel_fan_out_merges_results_and_picks_the_best_candidate():
+    graph = build_orchestration_graph(build_evaluators(), mode="parallel")
+    candidates = ["Find entity mentions.", "Find entity mentions and check each fact.", "Summarize."]
+    final_state = run_orchestration(graph, candidates[0], candidates)
+    assert set(final_state["results"]) == {"SciERC", "SciFact", "GeneralNLP"}
+    assert final_state["trace"][-1] == "OutputBestPrompt"
+    assert final_state["final_prompt"] == candidates[1]
+    assert final_state["final_score"] == pytest.approx(2 / 3)
+
+def test_parallel_is_faster_than_sequential():
+    evaluators = build_evaluators(latency=0.05)
+    elapsed = {}
+    for mode in ("sequential", "parallel"):
+        graph = build_orchestration_graph(evaluators, mode=mode)
+        start = time.perf_counter()
+        state = run_orchestration(graph, "entity fact abstract")
+        elapsed[mode] = time.perf_counter() - start
+        assert state["final_score"] == 1.0
+    assert elapsed["parallel"] < elapsed["sequential"] * 0.8
+
+def test_node_timeout_drops_the_slow_evaluator():
+    class AsyncAdapter:
+        async def abatch_generate(self, prompts):
+            await asyncio.sleep(5)
+            return ["x"] * len(prompts)
+
+    evaluators = build_evaluators()
+    evaluators["Slow"] = TaskEvaluator(AsyncAdapter(), [("q", "x")])
+    graph = build_orchestration_graph(evaluators, mode="parallel", node_timeout=0.2)
+    start = time.perf_counter()
+    state = run_orchestration(graph, "entity fact abstract")
+    assert time.perf_counter() - start < 2
+    assert state["results"]["Slow"]["timed_out"] is True
+    assert state["final_score"] == 1.0
+
+def test_unknown_mode_and_mock_adapters():
+    with pytest.raises(ValueError):
+        build_orchestration_graph(build_evaluators(), mode="broadcast")
+    adapter = MagicMock()
+    adapter.generate.return_value = "E"
+    graph = build_orchestration_graph({"SciERC": TaskEvaluator(adapter, [("s", "E")])}, mode="route")
+    assert run_orchestration(graph, "anything")["final_score"] == 1.0
+
+class AsyncAdapter(ModelAdapter):
+    def __init__(self):
+        self.sync_calls = self.async_calls = 0
+
+    def generate(self, prompt, **kwargs):
+        self.sync_calls += 1
+        return "E"
+
+    async def abatch_generate(self, prompts, **kwargs):
+        self.async_calls += len(prompts)
+        return ["E"] * len(prompts)
+
+def test_wrappers_are_not_bypassed_by_the_async_path():
+    inner = AsyncAdapter()
+    budget = TokenBudget(max_tokens=10 ** 6)
+    adapter = CachingAdapter(SchedulingAdapter(inner, budget=budget))
+    evaluator = TaskEvaluator(adapter, [("s1", "E"), ("s2", "E")])
+    assert asyncio.run(evaluator.evaluate(["p"])) == {"p": 1.0}
+    assert asyncio.run(evaluator.score("p")) == 1.0
+    # Went through the scheduler (budget charged) and the cache (second round served from it)
+    assert inner.async_calls == 0 and inner.sync_calls == 2
+    assert budget.spent["calls"] == 2
+    assert adapter.stats["memory_hits"] >= 2
+
+    # An adapter whose class implements abatch_generate is awaited directly
+    flight = SingleFlightAdapter(AsyncAdapter())
+    assert asyncio.run(TaskEvaluator(flight, [("s1", "E")]).score("p")) == 1.0
+    assert flight.adapter.async_calls == 1 and flight.adapter.sync_calls == 0
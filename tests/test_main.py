@@ -0,0 +1,139 @@
+import io
+import json
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from promptoptimizerscai.adapters.synthetic_adapter import make_scierc_dataset
+
+
+def write_jsonl(path, n=50):
+    dataset = make_scierc_dataset(n)
+    with open(path, "w", encoding="utf-8") as f:
+        for text, label in dataset:
+            f.write(json.dumps({"text": text, "label": label}) + "\n")
+    return dataset
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def synthetic_args(dataset):
+    return ["--adapter", "synthetic", "--adapter-arg", "golds=" + json.dumps([g for _, g in dataset]),
+            "--adapter-arg", "latency=0"]
+
+def test_evaluate_streams_results_in_order(tmp_path):
+    data = str(tmp_path / "data.jsonl")
+    dataset = write_jsonl(data)
+    out = str(tmp_path / "preds.jsonl")
+    summary = main.main(["evaluate", data, "--prompt", "Extract entities.", "--output", out,
+                         "--batch-size", "7", "--concurrency", "3"] + synthetic_args(dataset))
+    rows = read_jsonl(out)
+    assert [r["index"] for r in rows] == list(range(50))
+    assert [r["input"] for r in rows] == [text for text, _ in dataset]
+    assert summary["evaluated"] == 50
+    assert summary["accuracy"] == sum(r["correct"] for r in rows) / 50
+
+def test_evaluate_workers_get_their_own_adapter(tmp_path, monkeypatch):
+    data = str(tmp_path / "data.jsonl")
+    dataset = write_jsonl(data)
+    built, build_adapter = [], main.build_adapter
+
+    def counting_build_adapter(args):
+        built.append(build_adapter(args))
+        return built[-1]
+
+    monkeypatch.setattr(main, "build_adapter", counting_build_adapter)
+    main.main(["evaluate", data, "--prompt", "Extract entities.", "--output", str(tmp_path / "preds.jsonl"),
+               "--batch-size", "2", "--concurrency", "3"] + synthetic_args(dataset))
+    assert 1 <= len(built) <= 3
+    assert len({id(a) for a in built}) == len(built)
+    assert sum(a.stats["calls"] for a in built) == 50
+
+def test_evaluate_resumes_after_a_truncated_line(tmp_path):
+    data = str(tmp_path / "data.jsonl")
+    dataset = write_jsonl(data)
+    out = str(tmp_path / "preds.jsonl")
+    args = ["evaluate", data, "--prompt", "Extract entities.", "--output", out] + synthetic_args(dataset)
+    main.main(args)
+    reference = read_jsonl(out)
+    # Simulate a job killed mid-write after 20 results
+    with open(out, "r+", encoding="utf-8") as f:
+        lines = f.readlines()
+        f.seek(0)
+        f.truncate()
+        f.writelines(lines[:20])
+        f.write(lines[20][:10])
+    # Counting the results leaves the file alone; only resuming cuts the partial line
+    size = os.path.getsize(out)
+    assert main.completed_lines(out) == 20 and os.path.getsize(out) == size
+    summary = main.main(args + ["--resume"])
+    assert summary["skipped"] == 20 and summary["evaluated"] == 30
+    assert read_jsonl(out) == reference
+
+def test_evaluate_reads_stdin_and_uses_the_cache(tmp_path, monkeypatch, capsys):
+    dataset = make_scierc_dataset(10)
+    lines = "".join(json.dumps({"text": t}) + "\n" for t, _ in dataset)
+    cache_dir = str(tmp_path / "cache")
+    args = ["evaluate", "--prompt", "Extract.", "--cache-dir", cache_dir] + synthetic_args(dataset)
+    for _ in range(2):
+        monkeypatch.setattr(sys, "stdin", io.StringIO(lines))
+        main.main(args)
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(rows) == 20 and "gold" not in rows[0]
+    assert rows[:10] == rows[10:]
+    assert os.path.exists(os.path.join(cache_dir, "responses.sqlite"))
+
+def test_optimize_writes_each_step_and_resumes(tmp_path):
+    data = str(tmp_path / "train.jsonl")
+    dataset = write_jsonl(data, 40)
+    out = str(tmp_path / "beams.jsonl")
+    args = ["optimize", data, "--prompt", "Extract entities.", "--output", out,
+            "--batch-size", "8", "--beam-width", "2"] + synthetic_args(dataset)
+    main.main(args + ["--steps", "2"])
+    assert [r["step"] for r in read_jsonl(out)] == [0, 1]
+    summary = main.main(args + ["--steps", "3", "--resume"])
+    rows = read_jsonl(out)
+    assert [r["step"] for r in rows] == [0, 1, 2]
+    assert summary == {"steps": 1, "beam": rows[-1]["beam"]}
+    assert len(rows[-1]["beam"]) == 2
+    # The dataset index is not left next to the input
+    assert not any(name.endswith(".idx.npz") for name in os.listdir(tmp_path))
+
+def test_optimize_stops_when_the_budget_is_spent(tmp_path):
+    data = str(tmp_path / "train.jsonl")
+    dataset = write_jsonl(data, 40)
+    out = str(tmp_path / "beams.jsonl")
+    summary = main.main(["optimize", data, "--prompt", "Extract entities.", "--output", out, "--steps", "50",
+                         "--batch-size", "8", "--max-tokens", "40000"] + synthetic_args(dataset))
+    rows = read_jsonl(out)
+    assert 0 < summary["steps"] == len(rows) < 50
+    assert all(r["spend"]["prompt_tokens"] + r["spend"]["completion_tokens"] <= 40000 for r in rows)
+    assert rows[-1]["spend"]["remaining_fraction"] < 0.5
+
+def test_optimize_resume_keeps_the_budget_already_spent(tmp_path):
+    data = str(tmp_path / "train.jsonl")
+    dataset = write_jsonl(data, 40)
+    out = str(tmp_path / "beams.jsonl")
+    args = ["optimize", data, "--prompt", "Extract entities.", "--output", out, "--batch-size", "8",
+            "--max-tokens", "40000"] + synthetic_args(dataset)
+    main.main(args + ["--steps", "50"])
+    rows = read_jsonl(out)
+    # The first run stopped on the budget, so resuming has nothing left to spend
+    summary = main.main(args + ["--steps", "100", "--resume"])
+    assert summary["steps"] == 0 and read_jsonl(out) == rows
+
+def test_optimize_works_with_generate_only_adapters(tmp_path, monkeypatch):
+    from promptoptimizerscai.adapters.base import ModelAdapter
+
+    class GenerateOnly(ModelAdapter):
+        def generate(self, prompt, **kwargs):
+            return "Be precise." if "improved prompt" in prompt else "none"
+
+    data = str(tmp_path / "train.jsonl")
+    write_jsonl(data, 10)
+    monkeypatch.setattr(main, "build_adapter", lambda args: GenerateOnly())
+    summary = main.main(["optimize", data, "--adapter", "unused", "--prompt", "Extract entities.",
+                         "--output", str(tmp_path / "beams.jsonl"), "--steps", "1", "--batch-size", "4"])
+    assert summary["steps"] == 1 and "Be precise." in summary["beam"]
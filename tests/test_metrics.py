@@ -0,0 +1,42 @@
+import pytest
+from promptoptimizerscai.core.metrics import EntityRelationMetrics, entity_relation_errors
+
+GOLDS = [
+    (["p53", "cell cycle"], [("p53", "regulates", "cell cycle")]),
+    (["BRCA1", "RAD51"], [("BRCA1", "interacts_with", "RAD51")]),
+    ([], []),
+]
+PREDICTIONS = [
+    (["p53", "cell cycle", "p53"], [("p53", "regulates", "cell cycle")]),
+    (["BRCA1", "DNA"], [("BRCA1", "binds", "DNA")]),
+    ([], []),
+]
+
+def test_micro_and_macro_scores():
+    metrics = EntityRelationMetrics().update(PREDICTIONS, GOLDS).compute()
+    # Entities: 3 correct of 4 predicted (duplicate p53 counts once), 4 gold
+    assert metrics["entity_precision"] == pytest.approx(0.75)
+    assert metrics["entity_recall"] == pytest.approx(0.75)
+    assert metrics["relation_f1"] == pytest.approx(0.5)
+    # Per-example entity F1: 1.0, 0.5, 1.0 (nothing to find, nothing predicted)
+    assert metrics["macro_entity_f1"] == pytest.approx(2.5 / 3)
+    assert metrics["n_examples"] == 3
+
+def test_streamed_minibatches_match_one_pass():
+    streamed = EntityRelationMetrics()
+    for i in range(len(GOLDS)):
+        streamed.update(PREDICTIONS[i:i + 1], GOLDS[i:i + 1])
+    assert streamed.compute() == pytest.approx(EntityRelationMetrics().update(PREDICTIONS, GOLDS).compute())
+
+def test_error_report():
+    report = entity_relation_errors(PREDICTIONS, GOLDS)
+    assert report["missing_entities"] == [[""], ["RAD51"], [""]]
+    assert report["spurious_entities"] == [[""], ["DNA"], [""]]
+    assert report["missing_relations"][1] == [("BRCA1", "interacts_with", "RAD51")]
+
+def test_interned_ids_do_not_accumulate_across_updates():
+    metrics = EntityRelationMetrics()
+    for i in range(50):
+        metrics.update([([f"e{i}"], [])], [([f"e{i}"], [])])
+    assert len(metrics.entities.interner) == 0
+    assert metrics.compute()["entity_f1"] == pytest.approx(1.0)
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from promptoptimizerscai.adapters.openai_adapter import OpenAIAdapter
+from promptoptimizerscai.adapters.rate_limiter import RateLimiter
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible chat completions endpoint that echoes the prompt."""
+    seen = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][0]["content"]
+        with self.lock:
+            first_time = prompt not in self.seen
+            self.seen.add(prompt)
+        if prompt.startswith("flaky") and first_time:
+            self._send(429, {"error": {"message": "rate limited", "type": "rate_limit"}})
+            return
+        self._send(200, {
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "echo: " + prompt}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def standin_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
+
+def test_batch_generate_keeps_input_order_and_retries(standin_url):
+    adapter = OpenAIAdapter(api_key="fake-key", model="gpt-4.1", base_url=standin_url,
+                            max_concurrency=4, backoff_base=0.01)
+    prompts = [f"prompt {i}" for i in range(20)] + ["flaky 1", "flaky 2"]
+    outputs = adapter.batch_generate(prompts)
+    assert outputs == ["echo: " + p for p in prompts]
+
+def test_generate_and_batches_share_one_pooled_client(standin_url):
+    adapter = OpenAIAdapter(api_key="fake-key", model="gpt-4.1", base_url=standin_url)
+    assert adapter.generate("single") == "echo: single"
+    client = adapter._client
+    assert adapter.batch_generate(["a", "b"]) == ["echo: a", "echo: b"]
+
+    async def from_another_loop():
+        return await adapter.abatch_generate(["c"])
+
+    assert asyncio.run(from_another_loop()) == ["echo: c"]
+    assert adapter._client is client
+    adapter.close()
+
+def test_rate_limiter_is_thread_safe():
+    limiter = RateLimiter(rpm=1000, clock=lambda: 0.0)
+    granted = []
+    threads = [threading.Thread(target=lambda: granted.extend(
+        1 for _ in range(200) if limiter.reserve() == 0)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(granted) == 1000
+
+def test_rate_limiter_waits_when_budget_is_spent():
+    now = [0.0]
+    limiter = RateLimiter(rpm=60, tpm=600, clock=lambda: now[0])
+    assert limiter.reserve(tokens=500) == 0
+    # 100 tokens left, 300 needed: wait for 200 tokens at 10 tokens/s
+    assert limiter.reserve(tokens=300) == pytest.approx(20.0)
+    now[0] += 20.0
+    assert limiter.reserve(tokens=300) == 0
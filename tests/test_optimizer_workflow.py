@@ -1,4 +1,5 @@
 from unittest.mock import MagicMock
+from promptoptimizerscai.adapters.base import ModelAdapter
 from promptoptimizerscai.core.optimizer import PromptOptimizer
 
 def test_optimizer_loop_improves_prompt_for_scibert():
@@ -13,4 +14,42 @@ def test_optimizer_loop_improves_prompt_for_scibert():
     mock_adapter.edit_prompt.return_value = ["Extract all chemical entities."]
     optimizer = PromptOptimizer(model_adapter=mock_adapter)
     new_prompt = optimizer.optimize_step(prompt=initial_prompt, batch=batch)
-    assert new_prompt == "Extract all chemical entities."
\ No newline at end of file
+    assert new_prompt == "Extract all chemical entities."
+
+def test_optimize_step_returns_best_scoring_edit():
+    batch = [("Water is H2O.", "Water:CHEMICAL;H2O:CHEMICAL")]
+    mock_adapter = MagicMock()
+    mock_adapter.generate.side_effect = lambda text: (
+        "Water:CHEMICAL;H2O:CHEMICAL" if text.startswith("Extract all chemical") else "wrong")
+    mock_adapter.generate_gradient.return_value = ["Label 'MOLECULE' should be 'CHEMICAL'."]
+    mock_adapter.edit_prompt.return_value = ["Extract entities.", "Extract all chemical entities."]
+    new_prompt = PromptOptimizer(model_adapter=mock_adapter).optimize_step("Extract all entities.", batch)
+    assert new_prompt == "Extract all chemical entities."
+
+class SilentAdapter(ModelAdapter):
+    """Always replies with nothing, so the default gradient and edit are empty too."""
+
+    def generate(self, prompt, **kwargs):
+        return ""
+
+def test_optimize_step_keeps_the_prompt_without_feedback_or_edits():
+    batch = [("Water is H2O.", "Water:CHEMICAL;H2O:CHEMICAL")]
+    assert PromptOptimizer(SilentAdapter()).optimize_step("Extract all entities.", batch) == "Extract all entities."
+
+    class NoEdits(SilentAdapter):
+        def generate_gradient(self, prompt, errors, **kwargs):
+            return ["Mention chemicals."]
+
+    assert PromptOptimizer(NoEdits()).optimize_step("Extract all entities.", batch) == "Extract all entities."
+
+def test_optimize_step_stops_evaluating_clearly_worse_edits():
+    batch = [(f"sentence {i}", "CHEMICAL") for i in range(64)]
+    mock_adapter = MagicMock()
+    mock_adapter.generate.side_effect = lambda text: "CHEMICAL" if "chemical" in text else "OTHER"
+    mock_adapter.generate_gradient.return_value = ["Ask for chemical entities."]
+    mock_adapter.edit_prompt.return_value = ["Extract chemical entities.", "Extract entities briefly."]
+    new_prompt = PromptOptimizer(model_adapter=mock_adapter).optimize_step("Extract entities.", batch)
+    assert new_prompt == "Extract chemical entities."
+    # The batch for the prompt and the first edit, one chunk for the losing edit
+    assert mock_adapter.generate.call_count == 64 + 64 + 16
+
@@ -0,0 +1,45 @@
+from unittest.mock import patch
+
+from promptoptimizerscai.adapters.hugging_face_adapter import HuggingFaceAdapter
+from promptoptimizerscai.core.evaluation import evaluate_prompt
+
+PROMPT = "extract all entities from :"
+INPUTS = ["water is h2o .", "protein binds dna .", "p53 regulates cell cycle ."]
+# Same token length: one batch on the cached prefix, no padding
+SAME_LENGTH = INPUTS[:2]
+
+def test_prefix_cached_generation_matches_plain_generation(tiny_gpt2):
+    model, tokenizer = tiny_gpt2
+    adapter = HuggingFaceAdapter(model_name=model, tokenizer=tokenizer)
+    kwargs = {"max_new_tokens": 4, "do_sample": False}
+    with patch.object(model, "generate", wraps=model.generate) as model_generate:
+        cached = adapter.batch_generate_with_prefix(PROMPT, SAME_LENGTH, **kwargs)
+    assert model_generate.call_count == 1
+    plain = [adapter.generate(PROMPT + " " + x, **kwargs) for x in SAME_LENGTH]
+    assert cached == plain
+    assert list(adapter._prefix_cache) == [PROMPT]
+
+def test_prefix_cached_generation_uses_pipeline_generation_defaults(tiny_gpt2):
+    model, tokenizer = tiny_gpt2
+    # Generation settings given to the pipeline, none passed per call
+    adapter = HuggingFaceAdapter(model_name=model, tokenizer=tokenizer, max_new_tokens=3, do_sample=False)
+    cached = adapter.batch_generate_with_prefix(PROMPT, SAME_LENGTH)
+    assert cached == [adapter.generate(PROMPT + " " + x) for x in SAME_LENGTH]
+
+def test_prefix_path_falls_back_to_length_buckets(tiny_gpt2):
+    model, tokenizer = tiny_gpt2
+    adapter = HuggingFaceAdapter(model_name=model, tokenizer=tokenizer)
+    # Two token lengths would take two calls; batch_generate pads them into one bucket
+    with patch.object(adapter, "batch_generate", wraps=adapter.batch_generate) as batch_generate:
+        preds = adapter.batch_generate_with_prefix(PROMPT, INPUTS, max_new_tokens=2, do_sample=False)
+    batch_generate.assert_called_once()
+    assert len(preds) == len(INPUTS)
+    assert not adapter._prefix_cache
+
+def test_prefix_cache_is_lru_and_used_by_evaluate_prompt(tiny_gpt2):
+    model, tokenizer = tiny_gpt2
+    adapter = HuggingFaceAdapter(model_name=model, tokenizer=tokenizer, prefix_cache_size=2)
+    for prompt in ["extract all entities :", "extract entities :", "extract all :"]:
+        preds = evaluate_prompt(prompt, SAME_LENGTH, adapter)
+        assert len(preds) == len(SAME_LENGTH)
+    assert list(adapter._prefix_cache) == ["extract entities :", "extract all :"]
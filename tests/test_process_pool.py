@@ -0,0 +1,43 @@
+import os
+from functools import partial
+
+import pytest
+from promptoptimizerscai.adapters.base import ModelAdapter
+from promptoptimizerscai.adapters.process_pool_adapter import ProcessPoolAdapter
+from promptoptimizerscai.core.evaluation import evaluate_prompt
+
+
+class PidAdapter(ModelAdapter):
+    """Tags each output with the worker's pid; exits the process on 'crash' (once, if marker_path)."""
+
+    def __init__(self, marker_path=None):
+        self.marker_path = marker_path
+
+    def generate(self, prompt, **kwargs):
+        if prompt.endswith("crash"):
+            if self.marker_path is None or not os.path.exists(self.marker_path):
+                if self.marker_path is not None:
+                    open(self.marker_path, "w").close()
+                os._exit(1)
+        return f"{prompt}|{os.getpid()}"
+
+def test_pool_shards_inputs_and_keeps_order():
+    with ProcessPoolAdapter(PidAdapter, num_workers=2, chunk_size=3) as pool:
+        inputs = [f"sentence {i}" for i in range(20)]
+        preds = evaluate_prompt("Extract:", inputs, pool)
+    assert [p.split("|")[0] for p in preds] == [f"Extract: sentence {i}" for i in range(20)]
+    assert len({p.split("|")[1] for p in preds}) == 2
+
+def test_crashed_worker_is_restarted_and_chunk_retried(tmp_path):
+    factory = partial(PidAdapter, marker_path=str(tmp_path / "crashed"))
+    with ProcessPoolAdapter(factory, num_workers=2, chunk_size=2) as pool:
+        outputs = pool.batch_generate(["a", "b", "crash", "c", "d"])
+        assert [o.split("|")[0] for o in outputs] == ["a", "b", "crash", "c", "d"]
+        assert pool.restarts == 1
+
+def test_chunk_that_always_crashes_raises():
+    with ProcessPoolAdapter(PidAdapter, num_workers=1, max_chunk_retries=1) as pool:
+        with pytest.raises(RuntimeError, match="crashed a worker"):
+            pool.batch_generate(["crash"])
+        # The pool is still usable afterwards
+        assert pool.generate("ok").startswith("ok|")
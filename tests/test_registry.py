@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from promptoptimizerscai.adapters import registry
+from promptoptimizerscai.adapters.base import ModelAdapter
+from promptoptimizerscai.adapters.registry import available_adapters, create_adapter, get_adapter_class, register_adapter
+
+HEAVY_MODULES = ["torch", "transformers", "openai", "sklearn"]
+# Seconds allowed for a cold import; override for slow CI machines
+IMPORT_BUDGET = float(os.environ.get("PROMPTOPTIMIZER_IMPORT_BUDGET", "1.0"))
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import promptoptimizerscai
+import promptoptimizerscai.adapters.registry
+import promptoptimizerscai.adapters.hugging_face_adapter
+import promptoptimizerscai.adapters.openai_adapter
+import promptoptimizerscai.core.optimizer
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+# The openai module is only imported once the adapter sends its first request
+LAZY_OPENAI_SCRIPT = """
+import json, sys
+from promptoptimizerscai.adapters.registry import create_adapter
+adapter = create_adapter("openai", api_key="test", base_url="http://127.0.0.1:9", max_retries=0)
+before = "openai" in sys.modules
+try:
+    adapter.generate("hi")
+except Exception:
+    pass
+adapter.close()
+print(json.dumps([before, "openai" in sys.modules]))
+"""
+
+def test_cold_import_is_fast_and_skips_heavy_dependencies():
+    out = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT % HEAVY_MODULES],
+                         capture_output=True, text=True, check=True).stdout
+    result = json.loads(out)
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_BUDGET
+
+def test_openai_is_imported_only_when_the_adapter_is_used():
+    out = subprocess.run([sys.executable, "-c", LAZY_OPENAI_SCRIPT], capture_output=True, text=True, check=True).stdout
+    assert json.loads(out) == [False, True]
+
+@pytest.fixture
+def adapters(monkeypatch):
+    """A copy of the registry table for the test, restored afterwards."""
+    monkeypatch.setattr(registry, "_ADAPTERS", dict(registry._ADAPTERS))
+    return registry._ADAPTERS
+
+
+class EchoAdapter(ModelAdapter):
+    def __init__(self, suffix=""):
+        self.suffix = suffix
+
+    def generate(self, prompt, **kwargs):
+        return prompt + self.suffix
+
+def test_registry_resolves_registered_and_lazy_adapters(adapters):
+    register_adapter("echo", EchoAdapter)
+    assert create_adapter("echo", suffix="!").generate("hi") == "hi!"
+    register_adapter("echo_lazy", f"{__name__}:EchoAdapter")
+    assert get_adapter_class("echo_lazy") is EchoAdapter
+    assert {"openai", "huggingface", "echo"} <= set(available_adapters())
+    assert adapters["echo"] is EchoAdapter
+
+def test_registrations_do_not_leak_between_tests():
+    assert "echo" not in registry._ADAPTERS
+    assert "echo_lazy" not in registry._ADAPTERS
+
+def test_unknown_adapter_lists_available_names():
+    with pytest.raises(ValueError, match="huggingface"):
+        get_adapter_class("no-such-adapter")
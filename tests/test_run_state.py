@@ -0,0 +1,82 @@
+import json
+import pytest
+from promptoptimizerscai.adapters.base import ModelAdapter
+from promptoptimizerscai.core.budget import TokenBudget
+from promptoptimizerscai.core.optimizer import PromptOptimizer
+from promptoptimizerscai.core.run_state import RunStateStore
+
+BATCH = [(f"sentence {i}", "CHEMICAL") for i in range(8)]
+
+
+class RecordingAdapter(ModelAdapter):
+    def __init__(self, fail_after=None):
+        self.calls = 0
+        self.fail_after = fail_after
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise RuntimeError("preempted")
+        return "CHEMICAL" if "chemical" in prompt else "OTHER"
+
+    def generate_gradient(self, prompt, errors, **kwargs):
+        return ["Ask for chemical entities."]
+
+    def edit_prompt(self, prompt, gradient, **kwargs):
+        return [prompt + " Label chemical entities.", prompt + " Be brief."]
+
+def test_resume_skips_recorded_work(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    # Uninterrupted reference run
+    reference = PromptOptimizer(RecordingAdapter(), run_state=RunStateStore(str(tmp_path / "ref.jsonl")))
+    expected = reference.run("Extract entities.", BATCH, num_steps=2, beam_width=2)
+
+    crashing = PromptOptimizer(RecordingAdapter(fail_after=12), run_state=RunStateStore(path))
+    with pytest.raises(RuntimeError):
+        crashing.run("Extract entities.", BATCH, num_steps=2, beam_width=2)
+    crashing.run_state.close()
+
+    adapter = RecordingAdapter()
+    resumed = PromptOptimizer(adapter, run_state=RunStateStore(path))
+    assert resumed.run("Extract entities.", BATCH, num_steps=2, beam_width=2) == expected
+    # Evaluations recorded before the crash are not paid again
+    assert adapter.calls <= reference.adapter.calls - 8
+
+def test_completed_run_resumes_without_model_calls(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    first = PromptOptimizer(RecordingAdapter(), run_state=RunStateStore(path))
+    beam = first.run("Extract entities.", BATCH, num_steps=1)
+    first.run_state.close()
+    # Simulate a write cut off mid-line
+    with open(path, "a") as f:
+        f.write('{"type": "evaluation", "prom')
+
+    adapter = RecordingAdapter()
+    store = RunStateStore(path)
+    assert PromptOptimizer(adapter, run_state=store).run("Extract entities.", BATCH, num_steps=1) == beam
+    assert adapter.calls == 0
+    assert store.last_step()["step"] == 0
+    with open(path) as f:
+        assert json.loads(f.readline())["type"] == "evaluation"
+    # A record written after the torn line survives the next replay
+    store.record_step(1, beam, beam, [(p, 1.0, len(BATCH)) for p in beam])
+    store.close()
+    assert RunStateStore(path).last_step()["step"] == 1
+    with open(path) as f:
+        assert all(json.loads(line) for line in f)
+
+def test_resume_restores_candidate_scores_and_budget_spent(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    budget = TokenBudget(max_tokens=10 ** 6)
+    first = PromptOptimizer(RecordingAdapter(), run_state=RunStateStore(path), budget=budget)
+    first.run("Extract entities.", BATCH, num_steps=1)
+    first.run_state.close()
+
+    resumed_budget = TokenBudget(max_tokens=10 ** 6)
+    resumed = PromptOptimizer(RecordingAdapter(), run_state=RunStateStore(path), budget=resumed_budget)
+    assert budget.spent["calls"] > 0
+    assert resumed_budget.spent == budget.spent
+    for candidate, mean, n_evaluations in resumed.run_state.last_step()["ranking"]:
+        assert n_evaluations and resumed.candidate_index.lookup(candidate)[2] == mean
+    # Candidates already scored (and not in the beam) are not evaluated again
+    assert resumed.dedupe_candidates(first.run_state.last_step()["candidates"], beam=()) == []
@@ -0,0 +1,86 @@
+import pytest
+from promptoptimizerscai.adapters.base import ModelAdapter
+from promptoptimizerscai.adapters.scheduling_adapter import SchedulingAdapter, pack_batches
+from promptoptimizerscai.adapters.synthetic_adapter import SyntheticAdapter, make_scierc_dataset
+from promptoptimizerscai.core.budget import BudgetExceededError, TokenBudget
+from promptoptimizerscai.core.optimizer import PromptOptimizer
+from promptoptimizerscai.core.tokens import count_tokens
+
+
+class RecordingAdapter(ModelAdapter):
+    def __init__(self, answer="ok ok"):
+        self.answer = answer
+        self.batches = []
+
+    def generate(self, prompt, **kwargs):
+        return self.answer
+
+    def batch_generate(self, prompts, **kwargs):
+        self.batches.append((list(prompts), kwargs))
+        return [self.answer] * len(prompts)
+
+def test_pack_batches_by_token_volume():
+    batches = pack_batches([10, 50, 10, 200, 30], max_batch_tokens=60)
+    assert batches == [[0, 2, 4], [1], [3]]
+    assert pack_batches([1] * 5, max_batch_tokens=100, max_batch_size=2) == [[0, 1], [2, 3], [4]]
+
+def test_batches_are_packed_and_max_tokens_follows_observed_output():
+    inner = RecordingAdapter(answer="x" * 40)
+    adapter = SchedulingAdapter(inner, max_batch_tokens=600, max_output_tokens=256, min_output_tokens=8)
+    prompts = ["short"] * 4 + ["long " * 200]
+    assert adapter.batch_generate(prompts) == ["x" * 40] * 5
+    # The long prompt doesn't fit with the others; nothing observed yet, so the full output limit
+    assert [len(p) for p, _ in inner.batches] == [2, 2, 1]
+    assert inner.batches[0][1]["max_tokens"] == 256
+    adapter.batch_generate(["short"])
+    expected = count_tokens("x" * 40) * 1.5
+    assert inner.batches[-1][1]["max_tokens"] == max(8, int(-(-expected // 1)))
+    # An explicit limit wins
+    adapter.batch_generate(["short"], max_tokens=3)
+    assert inner.batches[-1][1]["max_tokens"] == 3
+
+class EchoingAdapter(ModelAdapter):
+    """Returns the prompt followed by the completion, like a text-generation pipeline."""
+
+    def generate(self, prompt, **kwargs):
+        return prompt + " A:X"
+
+def test_echoed_prompts_are_not_charged_as_completion_tokens():
+    budget = TokenBudget(max_tokens=10 ** 6)
+    adapter = SchedulingAdapter(EchoingAdapter(), budget=budget, min_output_tokens=1)
+    adapter.batch_generate(["long " * 200, "short"])
+    assert budget.spent["completion_tokens"] == 2 * count_tokens(" A:X")
+    # The output limit follows the generated text, not the prompt length
+    assert adapter.output_limit() == max(1, -(-count_tokens(" A:X") * 3 // 2))
+
+def test_budget_is_enforced_and_reported():
+    budget = TokenBudget(max_tokens=100, cost_per_1k_prompt_tokens=1.0)
+    adapter = SchedulingAdapter(RecordingAdapter(), budget=budget, expected_output_tokens=10)
+    adapter.batch_generate(["a" * 80, "b" * 80])
+    report = budget.report()
+    assert report["calls"] == 2 and report["prompt_tokens"] == 2 * count_tokens("a" * 80)
+    assert report["cost"] == pytest.approx(report["prompt_tokens"] / 1000)
+    with pytest.raises(BudgetExceededError):
+        adapter.batch_generate(["c" * 400])
+    # A refused request reserves nothing
+    assert budget.remaining_fraction() == pytest.approx(1 - budget.tokens_spent / 100)
+
+def test_minibatches_shrink_as_the_budget_runs_low():
+    budget = TokenBudget(max_tokens=1000, low_water=0.5)
+    assert budget.minibatch_size(32) == 32
+    budget.charge(750, 0)
+    assert budget.minibatch_size(32) == 16
+    budget.charge(240, 0)
+    assert budget.minibatch_size(32) == 4
+
+def test_optimizer_run_stays_within_budget():
+    dataset = make_scierc_dataset(64)
+    golds = [g for _, g in dataset]
+    inner = SyntheticAdapter(golds, latency=0)
+    budget = TokenBudget(max_tokens=60000)
+    optimizer = PromptOptimizer(inner, budget=budget, seed=0)
+    assert isinstance(optimizer.adapter, SchedulingAdapter)
+    beam = optimizer.run("Extract entities.", dataset[:32], num_steps=50, beam_width=2)
+    assert beam and all(isinstance(p, str) for p in beam)
+    assert budget.tokens_spent <= 60000
+    assert budget.remaining_fraction() < budget.low_water
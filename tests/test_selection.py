@@ -0,0 +1,69 @@
+from promptoptimizerscai.adapters.base import ModelAdapter
+from promptoptimizerscai.core.optimizer import PromptOptimizer
+from promptoptimizerscai.core.selection import successive_halving, ucb
+
+# Arm i answers example j correctly when j % 10 < accuracy[i] * 10
+ACCURACY = {"a": 0.2, "b": 0.9, "c": 0.5, "d": 0.3, "e": 0.7, "f": 0.1}
+EXAMPLES = list(range(100))
+
+def make_score_fn(calls):
+    def score_fn(arm, examples):
+        calls.append(len(examples))
+        return [1.0 if j % 10 < ACCURACY[arm] * 10 else 0.0 for j in examples]
+    return score_fn
+
+def test_successive_halving_finds_best_arm_within_budget():
+    calls = []
+    ranking = successive_halving(list(ACCURACY), EXAMPLES, make_score_fn(calls), budget=120, keep=1)
+    assert ranking[0][0] == "b"
+    assert sum(calls) <= 120
+    # Weak arms were dropped after a few samples
+    pulls = {arm: n for arm, _, n in ranking}
+    assert pulls["f"] < pulls["b"]
+
+def test_ucb_spends_most_calls_on_the_best_arm():
+    calls = []
+    ranking = ucb(list(ACCURACY), EXAMPLES, make_score_fn(calls), budget=200)
+    assert ranking[0][0] == "b"
+    assert sum(calls) == 200
+    pulls = {arm: n for arm, _, n in ranking}
+    assert pulls["b"] == max(pulls.values())
+
+
+class RuleAdapter(ModelAdapter):
+    """Answers correctly only when the prompt asks for chemical entities."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompts = []
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        self.prompts.append(prompt)
+        return "CHEMICAL" if "chemical" in prompt else "OTHER"
+
+    def generate_gradient(self, prompt, errors, **kwargs):
+        return ["The prompt should ask for chemical entities."]
+
+    def edit_prompt(self, prompt, gradient, **kwargs):
+        return [prompt + " Be brief.", prompt + " Label chemical entities.", prompt + " Be precise."]
+
+def test_beam_search_step_ranks_the_fixing_edit_first():
+    adapter = RuleAdapter()
+    optimizer = PromptOptimizer(adapter, eval_budget=40)
+    batch = [(f"sentence {i}", "CHEMICAL") for i in range(20)]
+    best = optimizer.beam_search_step("Extract entities.", batch, beam_width=2)
+    assert best[0] == "Extract entities. Label chemical entities."
+    assert len(best) == 2
+    # 20 calls to find errors + at most the scoring budget
+    assert adapter.calls <= 20 + 40
+
+def test_beam_prompts_are_evaluated_once_per_step():
+    adapter = RuleAdapter()
+    optimizer = PromptOptimizer(adapter)
+    batch = [(f"sentence {i}", "CHEMICAL") for i in range(20)]
+    optimizer.beam_search_step("Extract entities.", batch, beam_width=2)
+    # Finding its errors already ran the beam prompt on the batch; scoring reuses that
+    assert sum(p.rsplit(" ", 2)[0] == "Extract entities." for p in adapter.prompts) == len(batch)
+    assert len(adapter.prompts) == len(set(adapter.prompts))
+
@@ -0,0 +1,55 @@
+import pytest
+from promptoptimizerscai.adapters.base import ModelAdapter
+from promptoptimizerscai.core.evaluation import sequential_evaluate, wilson_interval
+
+BATCH = [(f"sentence {i}", "CHEMICAL") for i in range(200)]
+
+
+class CountingAdapter(ModelAdapter):
+    """Correct on every `period`-th input only."""
+
+    def __init__(self, period):
+        self.period = period
+        self.calls = 0
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return "CHEMICAL" if int(prompt.rsplit(" ", 1)[1]) % self.period == 0 else "OTHER"
+
+INCUMBENT = {"accuracy": 0.85, "lower": 0.8, "upper": 0.9}
+
+def test_losing_candidate_stops_early_and_reports_savings():
+    adapter = CountingAdapter(period=4)  # 25% accurate
+    result = sequential_evaluate("p", BATCH, adapter, incumbent=INCUMBENT, chunk_size=10)
+    assert result["stopped_early"] == "worse_than_incumbent"
+    assert result["upper"] < INCUMBENT["lower"]
+    assert adapter.calls == len(BATCH) - result["calls_saved"]
+    assert result["calls_saved"] > 150
+
+def test_strong_candidate_is_scored_on_the_full_batch():
+    adapter = CountingAdapter(period=1)
+    result = sequential_evaluate("p", BATCH, adapter, incumbent=INCUMBENT)
+    assert result["stopped_early"] is None
+    assert result["n_evaluated"] == len(BATCH)
+    assert result["accuracy"] == 1.0
+    assert result["calls_saved"] == 0
+
+def test_candidate_is_kept_while_intervals_overlap():
+    # 50% accurate: below the incumbent's estimate, never below its lower bound
+    incumbent = {"accuracy": 0.6, "lower": 0.5, "upper": 0.7}
+    result = sequential_evaluate("p", BATCH, CountingAdapter(period=2), incumbent=incumbent)
+    assert result["upper"] < incumbent["accuracy"]
+    assert result["stopped_early"] is None
+    assert result["n_evaluated"] == len(BATCH)
+
+def test_max_errors_limit():
+    result = sequential_evaluate("p", BATCH, CountingAdapter(period=2), max_errors=5, chunk_size=4)
+    assert result["stopped_early"] == "max_errors"
+    assert len(result["errors"]) == 5
+    assert result["n_evaluated"] == 10
+
+def test_wilson_interval_contains_the_estimate():
+    lower, upper = wilson_interval(30, 100)
+    assert lower < 0.3 < upper
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    assert wilson_interval(10, 10)[1] == pytest.approx(1.0)
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from promptoptimizerscai.adapters.base import ModelAdapter
+from promptoptimizerscai.adapters.single_flight_adapter import SingleFlightAdapter
+
+
+class GatedAdapter(ModelAdapter):
+    """Blocks every call until `release` is set, so concurrent callers overlap."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def generate(self, prompt, **kwargs):
+        self.calls.append(prompt)
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("upstream error")
+        return prompt.upper()
+
+def _run_concurrently(fn, n):
+    results, threads = [None] * n, []
+    def worker(i):
+        try:
+            results[i] = fn()
+        except Exception as exc:
+            results[i] = exc
+    for i in range(n):
+        threads.append(threading.Thread(target=worker, args=(i,)))
+        threads[-1].start()
+    return threads, results
+
+def test_concurrent_identical_calls_share_one_request():
+    inner = GatedAdapter()
+    adapter = SingleFlightAdapter(inner)
+    leader, leader_result = _run_concurrently(lambda: adapter.generate("a"), 1)
+    inner.started.wait(5)
+    followers, results = _run_concurrently(lambda: adapter.generate("a"), 4)
+    while adapter.stats["merged_inflight"] < 4:
+        time.sleep(0.001)
+    inner.release.set()
+    for t in leader + followers:
+        t.join(5)
+    assert leader_result == ["A"] and results == ["A"] * 4
+    assert inner.calls == ["a"]
+    assert adapter.stats["upstream"] == 1 and adapter.merged == 4
+    # Nothing is kept once the request completes
+    assert adapter.generate("a") == "A" and len(inner.calls) == 2
+
+def test_waiters_receive_the_upstream_exception():
+    inner = GatedAdapter(fail=True)
+    adapter = SingleFlightAdapter(inner)
+    threads, results = _run_concurrently(lambda: adapter.generate("a"), 1)
+    inner.started.wait(5)
+    followers, follower_results = _run_concurrently(lambda: adapter.generate("a"), 2)
+    while adapter.stats["merged_inflight"] < 2:
+        time.sleep(0.001)
+    inner.release.set()
+    for t in threads + followers:
+        t.join(5)
+    assert all(isinstance(r, RuntimeError) for r in results + follower_results)
+    assert len(inner.calls) == 1
+
+def test_batch_duplicates_are_collapsed_before_dispatch():
+    inner = GatedAdapter()
+    inner.release.set()
+    adapter = SingleFlightAdapter(inner)
+    assert adapter.batch_generate(["a", "b", "a", "a"]) == ["A", "B", "A", "A"]
+    assert inner.calls == ["a", "b"]
+    assert adapter.stats["merged_batch"] == 2
+    assert adapter.batch_generate_with_prefix("p", ["x", "x"]) == ["P X", "P X"]
+    # Different generation kwargs are different requests
+    adapter.batch_generate(["a", "a"], temperature=0.7)
+    assert inner.calls == ["a", "b", "p x", "a"]
+
+def test_short_upstream_batch_raises():
+    class ShortAdapter(ModelAdapter):
+        def generate(self, prompt, **kwargs):
+            return prompt
+
+        def batch_generate(self, prompts, **kwargs):
+            return prompts[:1]
+
+    adapter = SingleFlightAdapter(ShortAdapter())
+    with pytest.raises(ValueError):
+        adapter.batch_generate(["a", "b"])
+    assert adapter._inflight == {}
+
+class AsyncGatedAdapter(ModelAdapter):
+    def __init__(self):
+        self.calls = []
+        self.release = None
+
+    def generate(self, prompt, **kwargs):
+        raise AssertionError("the async path should not call generate")
+
+    async def abatch_generate(self, prompts, **kwargs):
+        self.calls.extend(prompts)
+        await self.release.wait()
+        return [p.upper() for p in prompts]
+
+def test_concurrent_coroutines_share_one_request():
+    inner = AsyncGatedAdapter()
+    adapter = SingleFlightAdapter(inner)
+
+    async def main():
+        inner.release = asyncio.Event()
+        tasks = [asyncio.create_task(adapter.abatch_generate(["a", "b"])) for _ in range(3)]
+        tasks.append(asyncio.create_task(adapter.abatch_generate(["b", "c", "c"])))
+        while adapter.stats["calls"] < 9:
+            await asyncio.sleep(0)
+        inner.release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(main()) == [["A", "B"]] * 3 + [["B", "C", "C"]]
+    assert sorted(inner.calls) == ["a", "b", "c"]
+    assert adapter.stats["upstream"] == 3 and adapter.merged == 6
+    assert adapter._inflight == {}
+
+def test_coroutines_join_requests_in_flight_on_other_threads():
+    inner = GatedAdapter()
+    adapter = SingleFlightAdapter(inner)
+    threads, results = _run_concurrently(lambda: adapter.generate("a"), 1)
+    inner.started.wait(5)
+
+    async def main():
+        task = asyncio.create_task(adapter.abatch_generate(["a"]))
+        while adapter.stats["merged_inflight"] < 1:
+            await asyncio.sleep(0.001)
+        inner.release.set()
+        return await task
+
+    assert asyncio.run(main()) == ["A"]
+    threads[0].join(5)
+    assert results == ["A"] and inner.calls == ["a"]
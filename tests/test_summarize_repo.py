@@ -0,0 +1,130 @@
+import io
+import json
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from summarize_repo import (GitIgnore, _gitignore_regex, collect_files, estimate_tokens, load_cache, read_file,
+                            summarize_repo)
+
+
+def make_repo(root):
+    files = {
+        ".gitignore": "*.log\nbuild_output/\n/secret.txt\n!keep.log\n",
+        "secret.txt": "token",
+        "keep.log": "kept",
+        "debug.log": "noise",
+        "README.md": "# Demo\n",
+        "pkg/optimizer.py": "".join(f"optimizer line {i}\n" for i in range(200)),
+        "pkg/utils.py": "".join(f"helper line {i}\n" for i in range(200)),
+        "pkg/secret.txt": "not anchored, so kept",
+        "pkg/build_output/out.txt": "generated",
+        "pkg/data/.gitignore": "*.csv\n",
+        "pkg/data/table.csv": "a,b",
+        "pkg/data/notes.txt": "notes",
+    }
+    for rel, text in files.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+def test_gitignore_rules():
+    gitignore = GitIgnore()
+    gitignore.rules = [("", _gitignore_regex(p), False, p.endswith("/")) for p in ["docs/**/*.md", "tmp/"]]
+    assert gitignore.ignored("docs/a/b/c.md") and gitignore.ignored("docs/c.md")
+    assert not gitignore.ignored("src/docs/c.md")
+    assert gitignore.ignored("src/tmp", is_dir=True) and gitignore.ignored("tmp/x.py")
+    assert not gitignore.ignored("src/tmp")
+
+def test_collect_files_respects_gitignore(tmp_path):
+    make_repo(str(tmp_path))
+    files = {f"{d}/{f}" if d else f for d, names in collect_files(str(tmp_path)) for f in names}
+    assert files == {".gitignore", "keep.log", "README.md", "pkg/optimizer.py", "pkg/utils.py",
+                     "pkg/secret.txt", "pkg/data/.gitignore", "pkg/data/notes.txt"}
+
+def test_partial_reads_only_needed_lines_and_cache_tracks_changes(tmp_path):
+    make_repo(str(tmp_path))
+    path = str(tmp_path / "pkg" / "optimizer.py")
+    entry = read_file(path, max_lines=5)
+    assert len(entry["lines"]) == 6 and not entry["complete"]
+    assert read_file(path, max_lines=5, cached=entry) is entry
+    # Cached head is too short for more lines, or the file changed: read again
+    assert read_file(path, max_lines=50, cached=entry) is not entry
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("changed\n")
+    assert read_file(path, max_lines=5, cached=entry)["size"] != entry["size"]
+
+    cache_path = str(tmp_path / "cache.json")
+    first, second = io.StringIO(), io.StringIO()
+    summarize_repo(str(tmp_path), first, mode="PARTIAL", max_lines=3, cache_path=cache_path)
+    summarize_repo(str(tmp_path), second, mode="PARTIAL", max_lines=3, cache_path=cache_path)
+    assert first.getvalue() == second.getvalue()
+    assert "optimizer line 2" in first.getvalue() and "optimizer line 3" not in first.getvalue()
+
+def test_budget_mode_fits_and_prefers_relevant_files(tmp_path):
+    make_repo(str(tmp_path))
+    out = io.StringIO()
+    summarize_repo(str(tmp_path), out, mode="BUDGET", token_budget=300, query=["optimizer"])
+    text = out.getvalue()
+    assert sum(estimate_tokens(line + "\n") for line in text.splitlines()) <= 300
+    assert "optimizer line 0" in text and "helper line 0" not in text
+    # Every file still appears in the tree
+    assert "utils.py" in text and "notes.txt" in text
+
+def test_cache_keeps_heads_and_appends_only_changes(tmp_path):
+    make_repo(str(tmp_path))
+    cache_path = str(tmp_path / "cache.jsonl")
+    summarize_repo(str(tmp_path), io.StringIO(), mode="EVERYTHING", cache_path=cache_path)
+    with open(cache_path, encoding="utf-8") as f:
+        text = f.read()
+    assert "optimizer line 10" in text and "optimizer line 11" not in text
+    size = os.path.getsize(cache_path)
+    summarize_repo(str(tmp_path), io.StringIO(), mode="EVERYTHING", cache_path=cache_path)
+    assert os.path.getsize(cache_path) == size
+
+    with open(tmp_path / "README.md", "a", encoding="utf-8") as f:
+        f.write("More.\n")
+    os.remove(tmp_path / "pkg" / "data" / "notes.txt")
+    out = io.StringIO()
+    summarize_repo(str(tmp_path), out, mode="PARTIAL", max_lines=3, cache_path=cache_path)
+    with open(cache_path, encoding="utf-8") as f:
+        appended = [json.loads(line) for line in f.read()[size:].splitlines()]
+    assert appended == [{"path": "README.md", **read_file(str(tmp_path / "README.md"), 3)},
+                        {"path": "pkg/data/notes.txt", "deleted": True}]
+    cache, _ = load_cache(cache_path)
+    assert "pkg/data/notes.txt" not in cache and cache["README.md"]["lines"] == ["# Demo", "More."]
+    assert "More." in out.getvalue()
+
+def test_budget_mode_truncates_a_tree_larger_than_the_budget(tmp_path):
+    make_repo(str(tmp_path))
+    for i in range(100):
+        (tmp_path / f"module_{i}.py").write_text("x = 1\n")
+    out = io.StringIO()
+    summarize_repo(str(tmp_path), out, mode="BUDGET", token_budget=100)
+    lines = out.getvalue().splitlines()
+    assert sum(estimate_tokens(line + "\n") for line in lines) <= 100
+    assert lines[-1].startswith("... ") and lines[-1].endswith(" more entries")
+    entries = sum(1 + len(names) for _, names in collect_files(str(tmp_path)))
+    assert int(lines[-1].split()[1]) == entries - (len(lines) - 1)
+
+def test_budget_rerun_only_reads_the_lines_it_shows(tmp_path, monkeypatch):
+    import summarize_repo as module
+    make_repo(str(tmp_path))
+    cache_path = str(tmp_path / "cache.jsonl")
+    first = io.StringIO()
+    summarize_repo(str(tmp_path), first, mode="BUDGET", token_budget=300, query=["optimizer"], cache_path=cache_path)
+    size = os.path.getsize(cache_path)
+
+    opened = []
+    def recording_open(path, *args, **kwargs):
+        opened.append(os.path.relpath(path, str(tmp_path)).replace(os.sep, "/"))
+        return open(path, *args, **kwargs)
+    monkeypatch.setattr(module, "open", recording_open, raising=False)
+    second = io.StringIO()
+    summarize_repo(str(tmp_path), second, mode="BUDGET", token_budget=300, query=["optimizer"], cache_path=cache_path)
+    assert second.getvalue() == first.getvalue()
+    assert os.path.getsize(cache_path) == size
+    # Besides the cache and .gitignore rules, only the file shown past its cached head is opened
+    assert set(opened) == {"cache.jsonl", ".gitignore", "pkg/data/.gitignore", "pkg/optimizer.py"}
+    assert "optimizer line 12" in second.getvalue()
@@ -0,0 +1,79 @@
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from promptoptimizerscai.adapters.caching_adapter import CachingAdapter
+from promptoptimizerscai.adapters.synthetic_adapter import SyntheticAdapter
+from promptoptimizerscai.adapters.tracing_adapter import TracingAdapter
+from promptoptimizerscai.core.budget import TokenBudget
+from promptoptimizerscai.core.optimizer import PromptOptimizer
+from promptoptimizerscai.core.tracing import InMemoryExporter, JsonlExporter, Tracer, get_tracer, set_tracer
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemoryExporter()
+    previous = set_tracer(Tracer([exporter]))
+    yield exporter
+    set_tracer(previous)
+
+def test_optimize_step_phases_and_adapter_calls_are_traced(exporter):
+    adapter = TracingAdapter(CachingAdapter(SyntheticAdapter(["A:X", "B:Y"], latency=0)))
+    batch = [("[doc-0] a", "A:X"), ("[doc-1] b", "B:Y"), ("[doc-0] a", "A:X")]
+    PromptOptimizer(adapter).optimize_step("Extract.", batch)
+
+    step = exporter.by_name("optimize_step")[0]
+    phases = ["run", "collect_errors", "gradient", "edit", "select"]
+    for phase in phases:
+        span = exporter.by_name(f"optimize_step.{phase}")[0]
+        assert span["parent_span_id"] == step["span_id"]
+        assert span["trace_id"] == step["trace_id"]
+    # The batch is sent in one call, the repeated input is sent upstream once
+    run_phase = exporter.by_name("optimize_step.run")[0]
+    (run,) = [s for s in exporter.by_name("adapter.batch_generate") if s["parent_span_id"] == run_phase["span_id"]]
+    assert run["attributes"]["n_inputs"] == 3
+    assert run["attributes"]["prompt_tokens"] > 0
+    # Too few examples to stop early: every suggested edit is scored on the whole batch
+    n_edits = exporter.by_name("optimize_step.select")[0]["attributes"]["n_candidates"]
+    assert adapter.adapter.adapter.stats["calls"] == 2 * (1 + n_edits)
+    assert exporter.by_name("adapter.edit_prompt")[0]["parent_span_id"] == \
+        exporter.by_name("optimize_step.edit")[0]["span_id"]
+
+def test_beam_search_step_span_reports_budget_spend(exporter):
+    batch = [(f"[doc-{i}] sentence", "A:X") for i in range(8)]
+    budget = TokenBudget(max_tokens=10 ** 6)
+    PromptOptimizer(SyntheticAdapter(["A:X"] * 8, latency=0), budget=budget).beam_search_step("Extract.", batch)
+
+    step = exporter.by_name("beam_search_step")[0]
+    assert step["attributes"]["budget.calls"] == budget.spent["calls"] > 0
+    assert step["attributes"]["budget.max_tokens"] == 10 ** 6
+    assert "n_candidates" not in step["attributes"]
+    expand = exporter.by_name("beam_search_step.expand")[0]
+    assert expand["attributes"]["n_candidates"] > 0
+    assert not any(k.startswith("budget.") for k in expand["attributes"])
+
+def test_jsonl_exporter_writes_one_line_per_span(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    exporter = JsonlExporter(str(path))
+    tracer = Tracer([exporter])
+    with tracer.span("outer"):
+        with tracer.span("inner", model="m") as span:
+            span.set(prompt_tokens=3)
+    exporter.close()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["name"] for r in records] == ["inner", "outer"]
+    assert records[0]["attributes"] == {"model": "m", "prompt_tokens": 3}
+    assert records[0]["end_time_unix_nano"] >= records[0]["start_time_unix_nano"]
+
+def test_disabled_tracing_is_cheap():
+    tracer = get_tracer()
+    assert not tracer.enabled
+    adapter = TracingAdapter(MagicMock())
+    start = time.perf_counter()
+    for _ in range(100000):
+        with tracer.span("phase") as span:
+            span.set(n=1)
+    assert time.perf_counter() - start < 0.5
+    adapter.generate("x")
+    adapter.adapter.generate.assert_called_once_with("x")